@@ -3,8 +3,9 @@
 Design notes:
 
 * Simulation results live in an HDF5 file on Pyodide's virtual filesystem
-  (``/tmp/zoomy_sim/sim.h5`` by convention). Nothing else. The browser is a
-  regular filesystem as far as Python is concerned.
+  (``sim_path()``: ``/tmp/zoomy_sim/sim.h5`` for the default session).
+  Nothing else. The browser is a regular filesystem as far as Python is
+  concerned.
 * ``store`` is a :class:`zoomy_plotting.SimulationStore` built via
   ``zoomy_plotting.read_hdf5(path)``. Lazy field reads, no in-memory
   arrays outside the open h5py handle.
@@ -16,10 +17,14 @@ Design notes:
 """
 
 import base64
+import hashlib
+import importlib.util
 import io
 import json
+import linecache
 import os
 import sys
+import time
 
 import numpy as np
 
@@ -61,6 +66,18 @@ class NumpyEncoder(json.JSONEncoder):
 
 
 # --- Rich display funnel (Jupyter-like output cells). ---
+def _is_plotly_dict(obj):
+    """A raw Plotly figure dict: a ``data`` list of trace dicts, with a
+    ``layout`` or with a ``type`` on every trace. ``{"data": [1, 2, 3]}``
+    is ordinary data and falls through to repr."""
+    if not isinstance(obj, dict):
+        return False
+    data = obj.get("data")
+    if not isinstance(data, (list, tuple)) or not all(isinstance(t, dict) for t in data):
+        return False
+    return "layout" in obj or (bool(data) and all("type" in t for t in data))
+
+
 class ZoomyDisplay:
     def __call__(self, obj=None, *, mermaid=None, latex=None, html=None):
         if mermaid is not None:
@@ -71,6 +88,12 @@ class ZoomyDisplay:
             self._emit({"mime": "text/html", "content": str(html)})
         elif obj is None:
             return
+        elif _is_plotly_dict(obj):
+            # Raw plotly figure dict (plotly_figure): no validators, no to_dict.
+            self._emit({"mime": "application/vnd.plotly+json",
+                        "content": json.dumps(obj, cls=NumpyEncoder)})
+        elif _is_frame(obj):  # pandas DataFrame / Series: paginated table
+            _emit_table(obj)
         elif hasattr(obj, "to_dict"):  # plotly figure
             self._emit({"mime": "application/vnd.plotly+json",
                         "content": json.dumps(obj.to_dict(), cls=NumpyEncoder)})
@@ -80,10 +103,10 @@ class ZoomyDisplay:
             buf.seek(0)
             self._emit({"mime": "image/svg+xml",
                         "content": buf.read().decode("utf-8")})
-        elif hasattr(obj, "to_html"):  # pandas DataFrame
+        elif hasattr(obj, "to_html"):  # e.g. a pandas Styler
             self._emit({"mime": "text/html", "content": obj.to_html()})
         elif isinstance(obj, np.ndarray):
-            self._emit({"mime": "text/plain", "content": repr(obj)})
+            _emit_array(obj)
         elif self._emit_ipython_repr(obj):
             # Handled via Jupyter-style _repr_mimebundle_ / _repr_*_.
             pass
@@ -133,9 +156,13 @@ class ZoomyDisplay:
                     continue
         return False
 
-    def _emit(self, cell):
+    def _emit(self, cell, buffers=None):
+        mime = cell.get("mime", "")
+        _stats.incr("display.cells." + mime)
+        _stats.incr("display.bytes." + mime, len(cell.get("content", ""))
+                    + sum(memoryview(b).nbytes for b in buffers or ()))
         if hasattr(sys, "_zoomy_display_callback"):
-            sys._zoomy_display_callback(cell)
+            _send(cell, buffers)
         else:
             content = cell.get("content", "")
             if cell.get("mime") == "text/x-mermaid":
@@ -146,6 +173,58 @@ class ZoomyDisplay:
                 print(content[:500] if len(content) > 500 else content)
 
 
+# Payloads above ``_CHUNK_CHARS`` (and any cell with binary buffers) go out
+# as a begin / part... / end stream instead of one string: no single
+# crossing of the Python→JS boundary (or postMessage) is larger than a
+# chunk, and the frontend can show progress while a huge render arrives.
+# Binary parts travel as raw bytes (transferable ArrayBuffers in the
+# worker), never base64. The worker flags stream cells on the message
+# (``chunk``) and the adapter reassembles them before ``onDisplay``.
+_CHUNK_CHARS = 1 << 20
+_stream_ids = [0]
+
+
+def _send(cell, buffers=None):
+    """Hand one output cell to the worker's display callback, tagged with the
+    session that produced it so the frontend routes it to the right view
+    (the default session stays untagged — the single-session protocol).
+
+    ``buffers`` are optional binary attachments (bytes / ndarray / anything
+    exposing the buffer protocol) delivered alongside the cell."""
+    if _active_session != _DEFAULT_SESSION:
+        cell = dict(cell, session=_active_session)
+    content = cell.get("content", "")
+    if not buffers and len(content) <= _CHUNK_CHARS:
+        sys._zoomy_display_callback(cell)
+        return
+    views = [memoryview(np.ascontiguousarray(b) if isinstance(b, np.ndarray)
+                        else b).cast("B") for b in buffers or ()]
+    _stream_ids[0] += 1
+    sid = "s%d" % _stream_ids[0]
+    tag = {"session": cell["session"]} if "session" in cell else {}
+    head = {k: v for k, v in cell.items() if k != "content"}
+    sys._zoomy_display_callback({
+        "chunk": "begin", "stream": sid, **head, "chars": len(content),
+        "buffers": [v.nbytes for v in views],
+        "total": len(content) + sum(v.nbytes for v in views)})
+    seq = 0
+    for i in range(0, len(content), _CHUNK_CHARS):
+        sys._zoomy_display_callback({
+            "chunk": "part", "stream": sid, **tag, "seq": seq,
+            "content": content[i:i + _CHUNK_CHARS]})
+        seq += 1
+    for k, v in enumerate(views):
+        for i in range(0, v.nbytes, _CHUNK_CHARS):
+            sys._zoomy_display_callback({
+                "chunk": "part", "stream": sid, **tag, "seq": seq,
+                "buffer": k, "offset": i}, v[i:i + _CHUNK_CHARS])
+            seq += 1
+    sys._zoomy_display_callback({"chunk": "end", "stream": sid, **tag,
+                                 "parts": seq})
+    _stats.incr("display.streams")
+    _stats.incr("display.chunks", seq)
+
+
 display = ZoomyDisplay()
 
 
@@ -158,6 +237,90 @@ sys._shallowflow_scope["display"] = display
 sys._shallowflow_scope.setdefault("store", None)
 
 
+# --- Performance counters (``zoomy_stats``). ---
+# One registry every subsystem reports into: counters (``incr``) and
+# histograms (``observe`` — count / sum / min / max plus power-of-two
+# buckets). Each session owns one (``use_session`` swaps ``_stats``), so a
+# reset is per session. Snapshots are streamed as a metrics display cell
+# every ``_stats_stream["interval"]`` seconds at the end of a run, so a
+# performance regression shows up as a number in the dashboard.
+METRICS_MIME = "application/vnd.zoomy.metrics+json"
+
+
+class _Stats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counters = {}
+        self.hists = {}
+        self.since = time.time()
+
+    def incr(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        h = self.hists.get(name)
+        if h is None:
+            h = self.hists[name] = {"count": 0, "sum": 0.0, "min": value,
+                                    "max": value, "buckets": {}}
+        h["count"] += 1
+        h["sum"] += value
+        h["min"] = min(h["min"], value)
+        h["max"] = max(h["max"], value)
+        b = str(2 ** max(0, int(value).bit_length())) if value > 0 else "0"
+        h["buckets"][b] = h["buckets"].get(b, 0) + 1
+
+    def snapshot(self):
+        hists = {k: dict(v, mean=v["sum"] / v["count"], buckets=dict(v["buckets"]))
+                 for k, v in self.hists.items()}
+        return {"since": self.since, "uptime_s": time.time() - self.since,
+                "counters": dict(self.counters), "histograms": hists}
+
+
+_stats = _Stats()
+_stats_stream = {"interval": 15.0, "last": 0.0}
+
+
+def stat_incr(name, n=1):
+    """Bump counter ``name`` in the active session (worker-callable)."""
+    _stats.incr(name, n)
+
+
+def stat_observe(name, value):
+    """Record ``value`` in histogram ``name`` (worker-callable; ms for
+    durations, bytes for sizes)."""
+    _stats.observe(name, float(value))
+
+
+def zoomy_stats(reset=False, stream=None):
+    """Snapshot of the active session's counters and histograms.
+
+    ``reset=True`` clears them after taking the snapshot; ``stream`` sets the
+    metrics display-cell interval in seconds (0 turns streaming off)."""
+    snap = _stats.snapshot()
+    if reset:
+        _stats.reset()
+    if stream is not None:
+        _stats_stream["interval"] = float(stream)
+    return snap
+
+
+def _stream_stats(force=False):
+    """Emit a metrics cell if the stream interval has elapsed."""
+    interval = _stats_stream["interval"]
+    now = time.time()
+    if not hasattr(sys, "_zoomy_display_callback") or (not force and (
+            not interval or now - _stats_stream["last"] < interval)):
+        return
+    _stats_stream["last"] = now
+    _send({"mime": METRICS_MIME,
+           "content": json.dumps(_stats.snapshot(), cls=NumpyEncoder)})
+
+
+sys._shallowflow_scope["zoomy_stats"] = zoomy_stats
+
+
 # --- Live stdout streaming to the GUI dashboard log. ---
 class _LiveStdout(io.StringIO):
     def __init__(self):
@@ -172,7 +335,7 @@ class _LiveStdout(io.StringIO):
                 line, self._buf = self._buf.split("\n", 1)
                 if line.strip():
                     try:
-                        sys._zoomy_display_callback({
+                        _send({
                             "mime": "text/x-log",
                             "content": line,
                         })
@@ -197,7 +360,11 @@ def open_hdf5(path):
     # run's h5py handle first so re-opens never leak file handles.
     close_store()
 
+    t0 = time.perf_counter()
     store = zp.read_hdf5(path)    # validates schema internally
+    _stats.observe("hdf5.open_ms", (time.perf_counter() - t0) * 1000.0)
+    _stats.incr("hdf5.opens")
+    _stats.incr("hdf5.bytes_opened", os.path.getsize(path))
 
     # Sanity: the mesh we loaded must match the fields we loaded.
     # zoomy_plotting's SimulationStore already asserts vertices.shape[1]==dim
@@ -214,6 +381,11 @@ def open_hdf5(path):
     sys._shallowflow_scope["store"] = store
     print(f"[store] opened {path}  dim={store.dim} cell_type={store.cell_type} "
           f"n_cells={store.n_cells} n_snapshots={store.n_snapshots}")
+    # Field ranges are precomputed in idle time, one field of one snapshot
+    # per slice; a large 2-D result also gets its multi-resolution pyramid.
+    schedule(_field_stats_task, store, name=f"field-stats:{os.path.basename(path)}",
+             priority=20, owner=store)
+    _schedule_pyramid(store)
     return store
 
 
@@ -285,6 +457,7 @@ def save_result_local(name):
     dest = result_path(name)
     if os.path.abspath(src) != os.path.abspath(dest):
         shutil.copyfile(src, dest)
+        _copy_pyramid(src, dest)
     return _result_slug(name)
 
 
@@ -306,6 +479,24 @@ sys._shallowflow_scope["save_result_local"] = save_result_local
 sys._shallowflow_scope["store_source_path"] = store_source_path
 
 
+def _release_store(scope):
+    """Close the store installed in ``scope`` (a session's exec scope) and
+    drop the card figures drawn from it."""
+    s = scope.get("store")
+    if s is None:
+        return
+    # Idle tasks still reading it (field stats, pyramid) stop here.
+    cancel_owned_tasks(s)
+    # Card figures drawn from this store would otherwise pin its mesh.
+    for key in [k for k, (_, r) in _figures.items() if r.store is s]:
+        _drop_figure(key)
+    try:
+        s.close()
+    except Exception:
+        pass
+    scope["store"] = None
+
+
 def close_store():
     """Close any store currently installed in scope and release its file handle.
 
@@ -315,14 +506,33 @@ def close_store():
     this automatically at the start of every store-producing (solver) run, so
     card code NEVER needs it — it is kept as a public no-op-compatible shim
     for backward compatibility with older cards that still call it."""
-    s = sys._shallowflow_scope.get("store")
-    if s is None:
-        return
+    _release_store(sys._shallowflow_scope)
+
+
+def _release_stores_on(paths):
+    """Close the store of every session whose file is one of ``paths`` —
+    a producer run is about to truncate it under them."""
+    paths = {os.path.abspath(p) for p in paths}
+    for sid, state in _sessions.items():
+        src = getattr(state["scope"].get("store"), "source_path", None)
+        if src and os.path.abspath(src) in paths:
+            _release_store(state["scope"])
+            print(f"[store] closed the store of session {sid!r}: {src} is being rewritten")
+
+
+def _producer_paths(code):
+    """``.h5`` paths a producer run names as string literals, plus the
+    active session's ``sim_path()``."""
+    import ast
+    paths = {sim_path()}
     try:
-        s.close()
-    except Exception:
-        pass
-    sys._shallowflow_scope["store"] = None
+        tree = ast.parse(code)
+    except SyntaxError:
+        return paths
+    paths.update(n.value for n in ast.walk(tree)
+                 if isinstance(n, ast.Constant) and isinstance(n.value, str)
+                 and n.value.endswith(".h5"))
+    return paths
 
 
 sys._shallowflow_scope["close_store"] = close_store
@@ -336,6 +546,295 @@ def _is_store_producer(code):
     return ("write_to_hdf5" in code) or ("open_hdf5" in code)
 
 
+# --- In-memory module store for card sibling modules. ---------------------
+# Cards whose case ships helper modules (e.g. the Bingham analytics
+# ``hb_closure`` / ``hb_visc_analytic`` / ``hb_dispersion``) used to write
+# them to disk and push the directory onto ``sys.path`` on every run, and
+# each fresh import re-parsed them. ``register_module(name, source)`` keeps
+# the source in memory instead; a ``sys.meta_path`` finder serves imports from
+# it, and compiled code objects are cached by content hash so re-registering
+# an unchanged module (every card run does) costs a dict lookup.
+_module_sources = {}   # module name -> (source, sha256 hex, is package)
+_code_cache = {}       # sha256 hex -> code object
+
+
+def _compile_cached(source, filename):
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    code = _code_cache.get(digest)
+    if code is None:
+        _stats.incr("modules.code_cache.miss")
+        code = _code_cache[digest] = compile(source, filename, "exec")
+    else:
+        _stats.incr("modules.code_cache.hit")
+    # Tracebacks through a registered module show its source lines.
+    linecache.cache[filename] = (len(source), None,
+                                 source.splitlines(True), filename)
+    return code
+
+
+class _MemoryModuleFinder:
+    """``sys.meta_path`` finder + loader for ``register_module`` sources."""
+
+    _zoomy_memory_finder = True
+
+    def find_spec(self, fullname, path=None, target=None):
+        # Module-level imports only: a lazy import here would recurse
+        # straight back into this finder.
+        entry = _module_sources.get(fullname)
+        if entry is None:
+            return None
+        return importlib.util.spec_from_loader(
+            fullname, self, origin=f"<zoomy-module {fullname}>",
+            is_package=entry[2])
+
+    def create_module(self, spec):
+        return None   # default module creation
+
+    def exec_module(self, module):
+        source, _, _ = _module_sources[module.__name__]
+        module.__file__ = module.__spec__.origin
+        exec(_compile_cached(source, module.__file__), module.__dict__)
+
+
+if not any(getattr(f, "_zoomy_memory_finder", False) for f in sys.meta_path):
+    sys.meta_path.insert(0, _MemoryModuleFinder())
+
+
+def register_module(name, source, package=False):
+    """Make ``import <name>`` resolve to ``source`` without touching the
+    filesystem. Re-registering identical source is a no-op (the imported
+    module stays in ``sys.modules``); changed source evicts the stale module
+    so the next import re-executes it. Returns the source's content hash."""
+    digest = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    prev = _module_sources.get(name)
+    if prev is not None and prev[1] == digest:
+        return digest
+    _module_sources[name] = (source, digest, bool(package))
+    if prev is not None or name in sys.modules:
+        sys.modules.pop(name, None)
+    return digest
+
+
+def registered_modules():
+    """Names served by the in-memory module store (sorted)."""
+    return sorted(_module_sources)
+
+
+sys._shallowflow_scope["register_module"] = register_module
+sys._shallowflow_scope["registered_modules"] = registered_modules
+
+
+# --- Scope memory inspector + eviction of stale large objects. ------------
+# The exec scope persists across runs, so the previous run's ``Q``, ``Qaux``,
+# ``solver``, ``nsm``, meshes and figures stay referenced and pin WASM memory
+# until the tab dies. ``scope_memory()`` reports what each variable retains;
+# before a store-producing run, large variables the new code never mentions
+# are dropped (see ``_evict_stale``) and the reclaimed bytes are logged.
+_evict_policy = {"enabled": True, "min_bytes": 8 * 2**20}
+
+_WALK_MAX_DEPTH = 8
+_WALK_MAX_NODES = 200_000
+
+
+def _fmt_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def _retained(obj, seen, acc, depth=0):
+    """Accumulate the bytes reachable from ``obj`` into ``acc`` (a dict of
+    kind -> bytes). ``seen`` holds ids already counted, so a buffer shared by
+    two views (or two variables walked with one ``seen``) counts once.
+    Bounded by depth and node budget — an estimate, not an exact census."""
+    import types
+    if depth > _WALK_MAX_DEPTH or len(seen) > _WALK_MAX_NODES:
+        return
+    if isinstance(obj, (types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                        types.MethodType, type)):
+        return
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Charge the owning buffer once; views walk down to their base.
+        if obj.base is None:
+            acc["ndarray"] = acc.get("ndarray", 0) + obj.nbytes
+        elif isinstance(obj.base, np.ndarray):
+            _retained(obj.base, seen, acc, depth + 1)
+        elif id(obj.base) not in seen:
+            seen.add(id(obj.base))
+            acc["ndarray"] = acc.get("ndarray", 0) + obj.nbytes
+        return
+
+    module = type(obj).__module__ or ""
+    if module.startswith("h5py"):
+        # An open handle: charge its file once as ``h5py`` (in Pyodide the
+        # bytes sit in MEMFS, JS memory outside the WASM heap, and stay there
+        # until the file is deleted) and its raw-data chunk cache as
+        # ``h5py_cache`` (its configured size, at most that much heap).
+        try:
+            fid = obj.file.id
+            fname = obj.file.filename
+        except Exception:
+            return
+        if ("h5", fname) in seen:
+            return
+        seen.add(("h5", fname))
+        try:
+            acc["h5py"] = acc.get("h5py", 0) + os.path.getsize(fname)
+        except OSError:
+            pass
+        try:
+            cache = int(fid.get_access_plist().get_cache()[2])
+            acc["h5py_cache"] = acc.get("h5py_cache", 0) + cache
+        except Exception:
+            pass
+        return
+
+    kind = "sympy" if module.startswith("sympy") else "other"
+    acc[kind] = acc.get(kind, 0) + sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, memoryview, int, float, complex)):
+        return
+    if kind == "sympy" and hasattr(obj, "args"):
+        children = obj.args
+    elif isinstance(obj, dict):
+        children = list(obj.keys()) + list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = obj
+    else:
+        children = list(getattr(obj, "__dict__", {}).values())
+    for child in children:
+        _retained(child, seen, acc, depth + 1)
+
+
+def _scope_candidates(scope):
+    """Scope variables that can hold run data: everything except dunders,
+    modules, functions and classes (the engine helpers, imports, defs)."""
+    import types
+    return {k: v for k, v in scope.items()
+            if not k.startswith("__") and v is not None
+            and not isinstance(v, (types.ModuleType, types.FunctionType,
+                                   types.BuiltinFunctionType, type, ZoomyDisplay))}
+
+
+def scope_memory(min_bytes=0):
+    """Per-variable retained size of the exec scope, largest first.
+
+    Each entry is ``{"name", "type", "bytes", "breakdown"}`` where
+    ``breakdown`` splits the total into ``ndarray`` buffers, ``sympy``
+    expression trees, ``other`` Python objects, and for open h5py handles
+    the file size (``h5py``) and raw-data chunk-cache size (``h5py_cache``).
+    Sizes are independent: a buffer shared by two variables is charged to
+    both."""
+    out = []
+    for name, value in _scope_candidates(sys._shallowflow_scope).items():
+        acc = {}
+        _retained(value, set(), acc)
+        total = sum(acc.values())
+        if total >= min_bytes:
+            out.append({"name": name, "type": type(value).__name__,
+                        "bytes": total, "breakdown": acc})
+    out.sort(key=lambda e: e["bytes"], reverse=True)
+    return out
+
+
+def set_eviction_policy(enabled=None, min_bytes=None):
+    """Configure stale-variable eviction before store-producing runs.
+    Returns the active policy."""
+    if enabled is not None:
+        _evict_policy["enabled"] = bool(enabled)
+    if min_bytes is not None:
+        _evict_policy["min_bytes"] = int(min_bytes)
+    return dict(_evict_policy)
+
+
+def _referenced_names(code, scope):
+    """Identifiers in ``code`` plus every global name the functions and
+    classes defined in ``scope`` use (their code objects' ``co_names``,
+    nested code included): a ``def f(): return big.sum()`` from an earlier
+    cell keeps ``big`` alive."""
+    import re
+    import types
+    names = set(re.findall(r"[A-Za-z_][A-Za-z0-9_]*", code))
+    codes = []
+    for value in scope.values():
+        if isinstance(value, types.MethodType):
+            value = value.__func__
+        if isinstance(value, types.FunctionType) and value.__globals__ is scope:
+            codes.append(value.__code__)
+        elif isinstance(value, type):
+            codes.extend(v.__code__ for v in vars(value).values()
+                         if isinstance(v, types.FunctionType) and v.__globals__ is scope)
+    while codes:
+        co = codes.pop()
+        names.update(co.co_names)
+        codes.extend(c for c in co.co_consts if isinstance(c, types.CodeType))
+    return names
+
+
+def _freed_bytes(acc):
+    """What dropping the walked objects is known to free: everything but
+    open h5py handles, whose file bytes outlive the handle and whose chunk
+    cache size is a capacity, not what it holds."""
+    return sum(v for k, v in acc.items() if not k.startswith("h5py"))
+
+
+def _evict_stale(code):
+    """Drop large scope variables the upcoming run's ``code`` never names
+    and no function or class in the scope uses.
+
+    A solver run re-creates its data, so the previous ``Q`` / ``solver`` /
+    figures it does not reference are dead weight while it allocates the new
+    ones. Reclaimed bytes are only those no kept variable, shown table or
+    shown array still reaches. Returns the evicted names."""
+    import gc
+    if not _evict_policy["enabled"]:
+        return []
+    scope = sys._shallowflow_scope
+    referenced = _referenced_names(code, scope)
+    candidates = _scope_candidates(scope)
+    stale = {}
+    for name, value in candidates.items():
+        if name in referenced or name == "store":
+            continue
+        acc = {}
+        _retained(value, set(), acc)
+        if _freed_bytes(acc) >= _evict_policy["min_bytes"]:
+            stale[name] = value
+    if not stale:
+        return []
+    # Walk the kept variables and the display LRUs (paged tables, sliced
+    # arrays) first so buffers they share with an evicted one are not
+    # reported as reclaimed.
+    seen = set()
+    for name, value in candidates.items():
+        if name not in stale:
+            _retained(value, seen, {})
+    for value in list(_tables.values()) + list(_arrays.values()):
+        _retained(value, seen, {})
+    acc = {}
+    for value in stale.values():
+        _retained(value, seen, acc)
+    evicted = sorted(stale)
+    for name in evicted:
+        del scope[name]
+    stale.clear()
+    _invalidate_cells(set(evicted))
+    gc.collect()
+    _stats.incr("scope.evicted_vars", len(evicted))
+    _stats.incr("scope.evicted_bytes", _freed_bytes(acc))
+    print(f"[scope] evicted {', '.join(evicted)} — reclaimed "
+          f"{_fmt_bytes(_freed_bytes(acc))}")
+    return evicted
+
+
+sys._shallowflow_scope["scope_memory"] = scope_memory
+sys._shallowflow_scope["set_eviction_policy"] = set_eviction_policy
+
+
 # --- Autocomplete via jedi ------------------------------------------------
 # jedi is installed by the worker on first 'complete_code' call via
 # micropip (the worker owns async install — doing it from sync Python
@@ -440,29 +939,47 @@ def complete_code(code: str, row: int, col: int, limit: int = 80) -> dict:
 sys._shallowflow_scope["complete_code"] = complete_code
 
 
-# --- Main entry point for run_code messages from the worker. ---
-def process_code(code_string):
-    new_stdout = _LiveStdout()
-    old_stdout = sys.stdout
-    sys.stdout = new_stdout
+def _store_meta(scope):
+    """Store metadata for the GUI's slider / field selector. Read off the
+    zoomy_plotting.SimulationStore currently in scope, if one is installed."""
+    s = scope.get("store")
+    if s is None or not hasattr(s, "field") or not hasattr(s, "n_snapshots"):
+        return None
+    try:
+        meta = {
+            "fields": list(s.field.keys()),
+            "n_snapshots": int(s.n_snapshots),
+            "dim": int(s.dim),
+            "n_cells": int(s.n_cells),
+        }
+    except Exception:
+        return None
+    # Per-field value ranges, once the idle-time stats task has finished.
+    ranges = field_stats(s, compute=False)
+    if ranges is not None:
+        meta["ranges"] = ranges
+    return meta
 
-    # Single output convention: the only way a script produces a card-level
-    # output is by calling ``display(obj)``. No more fig-sniffing from the
-    # exec scope — keeps snippets uniform and makes the "one plot replaces
-    # the previous one" behaviour in the GUI a simple clear-then-append.
-    res = {"status": "success", "output": "", "store_meta": None}
-    scope = sys._shallowflow_scope
 
+def _exec_block(code_string, scope, res, context=None):
+    """Execute one source block in ``scope``; record a failure in ``res``.
+
+    Shared by ``process_code`` (one block) and ``run_cells`` (one block per
+    case cell, ``context`` = the whole case, whose names must survive
+    eviction). Returns True on success, False on error / cancel."""
     # Auto-close the previous run's store before a solver run truncates the
     # same HDF5 path. Card code never needs close_store(); pure viz runs (no
     # write_to_hdf5/open_hdf5) keep the installed store so plots still resolve.
-    if _is_store_producer(code_string):
-        close_store()
-
     try:
-        if _plt is not None:
-            _plt.close("all")   # tidy up any stray mpl figures from the prior run
+        if _is_store_producer(code_string):
+            close_store()
+            _release_stores_on(_producer_paths(code_string))
+            _evict_stale(context or code_string)
+            # Refuse the run up front rather than crash the worker mid-solve.
+            _memory_check(heavy=True, what="store-producing run")
+        _close_stray_figures()   # tidy up mpl figures from the prior run
         exec(code_string, scope)
+        return True
 
     except KeyboardInterrupt:
         # Cooperative cancel: the main thread wrote SIGINT into the shared
@@ -482,22 +999,2395 @@ def process_code(code_string):
         import traceback
         res["status"] = "error"
         res["output"] = traceback.format_exc()
+    return False
+
+
+# --- Main entry point for run_code messages from the worker. ---
+def process_code(code_string, session=None):
+    preempt()
+    use_session(session)
+    new_stdout = _LiveStdout()
+    old_stdout = sys.stdout
+    sys.stdout = new_stdout
+
+    # Single output convention: the only way a script produces a card-level
+    # output is by calling ``display(obj)``. No more fig-sniffing from the
+    # exec scope — keeps snippets uniform and makes the "one plot replaces
+    # the previous one" behaviour in the GUI a simple clear-then-append.
+    res = {"status": "success", "output": "", "store_meta": None}
+    scope = sys._shallowflow_scope
+    t0 = time.perf_counter()
+
+    # Ad-hoc code may rebind names a cached case cell defined; those cells
+    # must re-execute on the next run_cells instead of trusting the scope.
+    defines, _ = _cell_names(code_string, scope)
+    _invalidate_cells(defines)
+
+    try:
+        _exec_block(code_string, scope, res)
+        _memory_check()
     finally:
         sys.stdout = old_stdout
         res["output"] = new_stdout.getvalue() + res["output"]
 
-    # Store metadata for the GUI's slider / field selector. Read off the
-    # zoomy_plotting.SimulationStore currently in scope, if one is installed.
-    s = scope.get("store")
-    if s is not None and hasattr(s, "field") and hasattr(s, "n_snapshots"):
+    res["store_meta"] = _store_meta(scope)
+    _stats.observe("exec.process_code_ms", (time.perf_counter() - t0) * 1000.0)
+    _stats.incr("exec.runs." + res["status"])
+    _stream_stats()
+    return json.dumps(res, cls=NumpyEncoder)
+
+
+# --- Cell-level incremental execution of composed cases. ------------------
+# A composed case is an ordered list of role cells (model / mesh / settings /
+# run / postproc / visualization — zoomy_cli ``_caseCells``, or the
+# ``# %% zoomy={"role":...}`` markers of a case .py). ``run_cells`` hashes
+# each cell's source and records the scope names it defines and reads. A
+# re-run executes only the cells whose source changed plus every later cell
+# that reads a name a re-executed cell (re)defined, so changing a plot option
+# re-runs the visualization cell alone instead of rebuilding model and mesh.
+# Data handed on through files or the results store is invisible to that
+# name check, so once a ``run`` cell or a store-producing cell re-executes,
+# every later cell re-executes too.
+_cell_cache = {}   # cell id -> {"hash": str, "defines": set}
+
+
+# Method calls that change their receiver in place (list / dict / set /
+# ndarray). Any other call on a name is a read: ``settings.get("dt")`` or
+# ``store.get_cell(0, "h")`` must not make the cells that bound it stale.
+_MUTATING_METHODS = frozenset({
+    "append", "extend", "insert", "pop", "popitem", "remove", "clear",
+    "update", "setdefault", "add", "discard", "difference_update",
+    "intersection_update", "symmetric_difference_update", "sort", "reverse",
+    "fill", "resize", "put", "itemset", "setfield", "setflags"})
+
+
+def _cell_names(code, scope=None):
+    """``(defines, reads)`` — the module-level scope names a block binds or
+    mutates and the free names it loads. ``(None, None)`` when the source
+    does not parse: the cell is then always re-run and treated as
+    redefining everything.
+
+    Mutation counts as a definition: the base name of an attribute or
+    subscript target (``cfg.dt = 0.1``, ``params["x"] = 1``) and the
+    receiver of a known in-place method (``lst.append(v)``,
+    ``_MUTATING_METHODS``). Receivers that are modules in ``scope`` are
+    left out. Names bound inside ``def`` / ``class`` bodies, lambdas and
+    comprehensions are local to them; only ``global`` declarations there
+    define a scope name."""
+    import ast
+    import types
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None, None
+    scope = scope if scope is not None else {}
+
+    def base(node):
+        while isinstance(node, (ast.Attribute, ast.Subscript)):
+            node = node.value
+        return node.id if isinstance(node, ast.Name) else None
+
+    def scan(nodes):
+        """``(binds, mutates, loads, declared_global)`` of one scope."""
+        binds, mutates, loads, declared = set(), set(), set(), set()
+        stack = list(nodes)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef,
+                                 ast.Lambda, ast.ClassDef)):
+                # Decorators, defaults and bases run in the enclosing scope.
+                stack.extend(getattr(node, "decorator_list", []))
+                if isinstance(node, ast.ClassDef):
+                    stack.extend(node.bases + [k.value for k in node.keywords])
+                    local = set()
+                else:
+                    stack.extend(node.args.defaults
+                                 + [d for d in node.args.kw_defaults if d is not None])
+                    local = {a.arg for a in ast.walk(node.args) if isinstance(a, ast.arg)}
+                if not isinstance(node, ast.Lambda):
+                    binds.add(node.name)
+                body = node.body if isinstance(node.body, list) else [node.body]
+                b, _, l, d = scan(body)
+                loads |= l - (b | local)
+                declared |= d
+                continue
+            if isinstance(node, (ast.ListComp, ast.SetComp, ast.DictComp,
+                                 ast.GeneratorExp)):
+                b, m, l, d = scan(list(ast.iter_child_nodes(node)))
+                mutates |= m - b
+                loads |= l - b
+                declared |= d
+                continue
+            if isinstance(node, ast.Name):
+                (loads if isinstance(node.ctx, ast.Load) else binds).add(node.id)
+            elif isinstance(node, (ast.Attribute, ast.Subscript)) \
+                    and not isinstance(node.ctx, ast.Load):
+                mutates.add(base(node))
+            elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) \
+                    and node.func.attr in _MUTATING_METHODS:
+                name = base(node.func.value)
+                if not isinstance(scope.get(name), types.ModuleType):
+                    mutates.add(name)
+            elif isinstance(node, ast.alias):
+                binds.add((node.asname or node.name).split(".")[0])
+            elif isinstance(node, ast.Global):
+                declared.update(node.names)
+            stack.extend(ast.iter_child_nodes(node))
+        mutates.discard(None)
+        return binds, mutates, loads, declared
+
+    binds, mutates, loads, declared = scan(tree.body)
+    binds |= declared
+    # A name the block binds and loads is local to it unless an earlier
+    # cell provides it; keeping only the free loads avoids spurious edges
+    # (every viz cell binds and reads its own ``fig``). A mutated name is
+    # still read: the cell changes what an earlier cell made.
+    return binds | mutates, loads - binds
+
+
+def _invalidate_cells(names):
+    """Drop cached cells that define any of ``names`` (all cells for None)."""
+    if names is None:
+        _cell_cache.clear()
+        return
+    for cid in [c for c, e in _cell_cache.items() if e["defines"] is None
+                or e["defines"] & names]:
+        del _cell_cache[cid]
+
+
+def invalidate_cells(ids=None):
+    """Forget cached case cells so the next ``run_cells`` re-executes them
+    (all cells when ``ids`` is None)."""
+    if ids is None:
+        _cell_cache.clear()
+    else:
+        for cid in ids:
+            _cell_cache.pop(cid, None)
+
+
+def _parse_case_cells(text):
+    """Split a percent-format case .py into ``[{id, role, source}]`` code
+    cells (markdown cells dropped). Mirrors zoomy_cli ``parseCase``."""
+    import re
+    marker = re.compile(r"^# %%( \[markdown\])?(?: zoomy=(.*))?\s*$")
+    cells, cur = [], None
+    for line in text.split("\n"):
+        m = marker.match(line)
+        if m:
+            if cur is not None:
+                cells.append(cur)
+            try:
+                meta = json.loads(m.group(2)) if m.group(2) else {}
+            except ValueError:
+                meta = {}
+            cur = {"markdown": bool(m.group(1)), "role": meta.get("role"),
+                   "lines": []}
+        elif cur is not None:
+            cur["lines"].append(line)
+    if cur is not None:
+        cells.append(cur)
+    return [{"role": c["role"], "source": "\n".join(c["lines"]).strip("\n")}
+            for c in cells if not c["markdown"]]
+
+
+def _cell_ids(cells):
+    """Stable ids: an explicit ``id``, else the role (suffixed by position
+    when a role repeats), else ``cell-<index>``."""
+    out, seen = [], {}
+    for i, c in enumerate(cells):
+        cid = c.get("id") or c.get("role") or f"cell-{i}"
+        if cid in seen:
+            seen[cid] += 1
+            cid = f"{cid}-{seen[cid]}"
+        else:
+            seen[cid] = 0
+        out.append(str(cid))
+    return out
+
+
+def run_cells(cells, force=False, session=None):
+    """Run a composed case cell by cell, skipping cells that are cache hits.
+
+    ``cells`` is a list of ``{"id"?, "role"?, "source"}`` dicts, its JSON
+    encoding, or the text of a percent-format case .py. Returns the
+    ``process_code`` JSON result plus ``cells`` — one ``{id, role, status}``
+    per cell, status ``ran`` / ``cached`` / ``error`` / ``skipped`` (not
+    reached after an error) — and ``cached``, the ids skipped as cache hits.
+    The cache is per session (``session`` as in ``process_code``)."""
+    preempt()
+    use_session(session)
+    if isinstance(cells, str):
+        text = cells.lstrip()
+        cells = json.loads(text) if text.startswith("[") else _parse_case_cells(cells)
+
+    new_stdout = _LiveStdout()
+    old_stdout = sys.stdout
+    sys.stdout = new_stdout
+
+    res = {"status": "success", "output": "", "store_meta": None,
+           "cells": [], "cached": []}
+    scope = sys._shallowflow_scope
+    dirty = set()        # names (re)bound by the cells executed so far
+    dirty_all = False    # an executed cell's bindings are unknown
+    rerun_rest = False   # a run / store-producing cell re-executed
+    failed = False
+    case_source = "\n".join(c.get("source") or "" for c in cells)
+    t0 = time.perf_counter()
+
+    try:
+        for cid, cell in zip(_cell_ids(cells), cells):
+            source = cell.get("source") or ""
+            entry = {"id": cid, "role": cell.get("role")}
+            res["cells"].append(entry)
+            if failed:
+                entry["status"] = "skipped"
+                continue
+            digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+            defines, reads = _cell_names(source, scope)
+            prev = _cell_cache.get(cid)
+            stale = (force or rerun_rest or prev is None or prev["hash"] != digest
+                     or reads is None
+                     or (reads and (dirty_all or reads & dirty)))
+            if not stale:
+                _stats.incr("cells.cached")
+                entry["status"] = "cached"
+                res["cached"].append(cid)
+                continue
+            _cell_cache.pop(cid, None)
+            if not _exec_block(source, scope, res, context=case_source):
+                entry["status"] = "error"
+                failed = True
+                continue
+            entry["status"] = "ran"
+            _stats.incr("cells.ran")
+            _cell_cache[cid] = {"hash": digest, "defines": defines}
+            if cell.get("role") == "run" or _is_store_producer(source):
+                rerun_rest = True
+            if defines is None:
+                dirty_all = True
+            else:
+                dirty |= defines
+        if res["cached"]:
+            print(f"[cells] {len(res['cached'])} cached: {', '.join(res['cached'])}")
+        _memory_check()
+    finally:
+        sys.stdout = old_stdout
+        res["output"] = new_stdout.getvalue() + res["output"]
+
+    res["store_meta"] = _store_meta(scope)
+    _stats.observe("exec.run_cells_ms", (time.perf_counter() - t0) * 1000.0)
+    _stats.incr("exec.runs." + res["status"])
+    _stream_stats()
+    return json.dumps(res, cls=NumpyEncoder)
+
+
+sys._shallowflow_scope["run_cells"] = run_cells
+sys._shallowflow_scope["invalidate_cells"] = invalidate_cells
+
+
+# --- Named sessions sharing one interpreter. --------------------------------
+# Every GUI session used to boot its own worker: a full Pyodide start, the
+# zoomy-core import and hundreds of MB of WASM heap each. A session is now a
+# named exec scope inside the one interpreter — its own ``store``, cell cache
+# and display routing (``_send`` tags its cells) — while ``sys.modules`` is
+# shared, so opening one costs a dict and the engine helpers, not a boot.
+# ``sys._shallowflow_scope`` always points at the ACTIVE session's scope, so
+# every helper above (close_store, open_hdf5, scope_memory, ...) is
+# session-aware without taking a session argument. Solver templates write to
+# ``sim_path()``, a directory per session; a producer run still closes any
+# session's store on a path it names before truncating it.
+_DEFAULT_SESSION = "default"
+_active_session = _DEFAULT_SESSION
+_sessions = {_DEFAULT_SESSION: {"scope": sys._shallowflow_scope,
+                                "cells": _cell_cache, "stats": _stats}}
+
+
+def _engine_exports():
+    """The engine-provided scope entries (helpers, ``display``, ``np``) — the
+    default scope's values that are still this module's own objects."""
+    g = globals()
+    default = _sessions[_DEFAULT_SESSION]["scope"]
+    return {k: v for k, v in default.items() if g.get(k) is v}
+
+
+def use_session(session=None):
+    """Make ``session`` (created on first use; None -> the default session)
+    the active one. Returns its id."""
+    global _active_session, _cell_cache, _stats
+    sid = str(session) if session else _DEFAULT_SESSION
+    state = _sessions.get(sid)
+    if state is None:
+        scope = _engine_exports()
+        scope["store"] = None
+        state = _sessions[sid] = {"scope": scope, "cells": {}, "stats": _Stats()}
+    _active_session = sid
+    _cell_cache = state["cells"]
+    _stats = state["stats"]
+    sys._shallowflow_scope = state["scope"]
+    return sid
+
+
+def close_session(session):
+    """Close a session's store and drop its scope. The default session is
+    reset to a fresh scope instead of removed."""
+    sid = str(session) if session else _DEFAULT_SESSION
+    if sid not in _sessions:
+        return False
+    previous = _active_session
+    use_session(sid)
+    close_store()
+    if sid == _DEFAULT_SESSION:
+        scope = _engine_exports()
+        scope["store"] = None
+        sys._shallowflow_scope.clear()
+        sys._shallowflow_scope.update(scope)
+        _cell_cache.clear()
+    else:
+        del _sessions[sid]
+    _cancel_session_tasks(sid)
+    for key in [k for k in _figures if k[0] == sid]:
+        _drop_figure(key)
+    _mesh_sent.difference_update([k for k in _mesh_sent if k[0] == sid])
+    use_session(previous if previous in _sessions else None)
+    return True
+
+
+def sim_path(filename="sim.h5"):
+    """Where a solver run of the active session writes its results:
+    ``/tmp/zoomy_sim/<filename>`` for the default session,
+    ``/tmp/zoomy_sim/<session>/<filename>`` for any other, so two sessions
+    never truncate each other's open store."""
+    root = "/tmp/zoomy_sim"
+    if _active_session == _DEFAULT_SESSION:
+        return os.path.join(root, filename)
+    return os.path.join(root, _result_slug(_active_session), filename)
+
+
+def list_sessions():
+    """``[{"id", "active", "store"}]`` for every open session."""
+    return [{"id": sid, "active": sid == _active_session,
+             "store": state["scope"].get("store") is not None}
+            for sid, state in _sessions.items()]
+
+
+sys._shallowflow_scope["list_sessions"] = list_sessions
+sys._shallowflow_scope["sim_path"] = sim_path
+
+
+# --- Idle-time background task scheduler. -----------------------------------
+# Precomputation (field statistics, geometry caches, ...) must not sit on
+# the latency-critical path of a user command. ``schedule`` queues a task;
+# the worker's idle pump calls ``run_idle(budget_ms)`` between messages and
+# it runs task slices — one ``next()`` of a generator task, or one call of a
+# plain callable — in priority order until the budget is spent. A running
+# slice is never interrupted (the worker is single-threaded: a message is
+# only dispatched once the slice returns), so tasks keep each slice to one
+# small unit of work — one field of one snapshot — and a command that
+# arrives mid-slice waits at most that long. Every user command calls
+# ``preempt()`` first, so no further slice starts until the worker is idle
+# again. A task is cancellable between slices; a task that reads a store is
+# scheduled with ``owner=store`` and cancelled when that store closes.
+_tasks = {}          # task id -> task dict
+_task_seq = [0]
+_preempted = [False]
+
+
+def schedule(fn, *args, name=None, priority=10, owner=None, **kwargs):
+    """Queue ``fn(*args, **kwargs)`` for idle time; lower ``priority`` runs
+    first. A generator function is run one ``yield`` per slice. ``owner``
+    (e.g. the store the task reads) ties the task to an object:
+    ``cancel_owned_tasks(owner)`` cancels it. Returns the task id."""
+    import inspect
+    _task_seq[0] += 1
+    tid = _task_seq[0]
+    if inspect.isgeneratorfunction(fn):
+        work = fn(*args, **kwargs)
+    else:
+        def work():
+            fn(*args, **kwargs)
+            yield
+        work = work()
+    _tasks[tid] = {"id": tid, "name": name or getattr(fn, "__name__", "task"),
+                   "priority": priority, "session": _active_session, "owner": owner,
+                   "state": "queued", "slices": 0, "ms": 0.0,
+                   "error": None, "work": work}
+    return tid
+
+
+def cancel_task(task_id):
+    """Cancel a queued or running task. Returns False if it already ended."""
+    t = _tasks.get(task_id)
+    if t is None or t["state"] not in ("queued", "running"):
+        return False
+    t["work"].close()
+    t["state"] = "cancelled"
+    return True
+
+
+def _cancel_session_tasks(session):
+    for t in list(_tasks.values()):
+        if t["session"] == session:
+            cancel_task(t["id"])
+
+
+def cancel_owned_tasks(owner):
+    """Cancel every queued or running task scheduled with ``owner``.
+    Returns how many were cancelled."""
+    return sum(cancel_task(t["id"]) for t in list(_tasks.values()) if t["owner"] is owner)
+
+
+def preempt():
+    """Stop handing out slices until the next ``run_idle`` call — called on
+    entry by every user-visible command. A slice already running finishes
+    first (tasks keep slices small; see above)."""
+    _preempted[0] = True
+
+
+def run_idle(budget_ms=8.0):
+    """Run task slices for up to ``budget_ms``. Returns True while queued
+    work remains (the worker then re-arms its idle pump)."""
+    _preempted[0] = False
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    previous = _active_session
+    try:
+        while not _preempted[0] and time.perf_counter() < deadline:
+            live = [t for t in _tasks.values() if t["state"] in ("queued", "running")]
+            if not live:
+                break
+            t = min(live, key=lambda t: (t["priority"], t["id"]))
+            if t["session"] in _sessions:
+                use_session(t["session"])
+            t["state"] = "running"
+            t0 = time.perf_counter()
+            try:
+                next(t["work"])
+            except StopIteration:
+                t["state"] = "done"
+            except Exception as e:
+                t["state"] = "error"
+                t["error"] = f"{type(e).__name__}: {e}"
+            t["slices"] += 1
+            t["ms"] += (time.perf_counter() - t0) * 1000.0
+            _stats.incr("idle.slices")
+            _stats.observe("idle.slice_ms", (time.perf_counter() - t0) * 1000.0)
+    finally:
+        use_session(previous)
+    # Forget finished tasks beyond a short history.
+    ended = [tid for tid, t in _tasks.items() if t["state"] not in ("queued", "running")]
+    for tid in ended[:-32]:
+        del _tasks[tid]
+    return any(t["state"] in ("queued", "running") for t in _tasks.values())
+
+
+def scheduler_state():
+    """Queue snapshot: ``{"pending", "preempted", "tasks": [...]}`` with each
+    task's id, name, priority, session, state, slices, ms and error."""
+    tasks = [{k: v for k, v in t.items() if k not in ("work", "owner")}
+             for t in _tasks.values()]
+    tasks.sort(key=lambda t: (t["state"] not in ("running", "queued"),
+                              t["priority"], t["id"]))
+    return {"pending": sum(t["state"] in ("queued", "running") for t in tasks),
+            "preempted": _preempted[0], "tasks": tasks}
+
+
+# Field statistics: per-field min / max over all snapshots, filled in by an
+# idle task when a store opens so colour limits never need a full pass on
+# the viz path. Keyed by the store's HDF5 path + mtime.
+_field_stats = {}
+
+
+def _store_key(store):
+    src = getattr(store, "source_path", None)
+    try:
+        return (os.path.abspath(src), os.path.getmtime(src)) if src else ("id", id(store))
+    except OSError:
+        return ("id", id(store))
+
+
+def _field_stats_task(store):
+    key = _store_key(store)
+    acc = {}
+    for step in range(int(store.n_snapshots)):
+        for name in store.field.keys():
+            v = np.asarray(store.get_cell(step, name), dtype=float)
+            lo, hi = float(np.nanmin(v)), float(np.nanmax(v))
+            cur = acc.get(name)
+            acc[name] = [lo, hi] if cur is None else [min(cur[0], lo), max(cur[1], hi)]
+            yield
+    _field_stats[key] = {n: {"min": r[0], "max": r[1]} for n, r in acc.items()}
+
+
+def field_stats(store=None, compute=True):
+    """``{field: {"min", "max"}}`` over all snapshots of ``store`` (default:
+    the scope store). Served from the idle-time task when it has finished;
+    otherwise computed now if ``compute``, else None."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        return None
+    key = _store_key(store)
+    if key not in _field_stats and compute:
+        for _ in _field_stats_task(store):
+            pass
+    return _field_stats.get(key)
+
+
+sys._shallowflow_scope["field_stats"] = field_stats
+sys._shallowflow_scope["scheduler_state"] = scheduler_state
+
+
+# --- WASM heap watchdog with cache shedding. --------------------------------
+# A large local run or a big downloaded store used to kill the worker with an
+# opaque out-of-memory error, losing every session. The watchdog samples
+# memory around ``process_code`` / ``run_cells`` and before
+# ``write_hdf5_bytes`` opens a download. Pressure is the live allocation
+# total: tracemalloc's when tracing is on (opt-in,
+# ``memory_watchdog(trace=True)``: precise, but a cost on every allocation),
+# else the C allocator's in-use bytes (``mallinfo``). Only when neither is
+# available does it fall back to the heap size, which is a high-water mark
+# (WASM linear memory never shrinks): then caches are shed only when the
+# heap has grown since the previous check, and nothing is refused. Past
+# ``soft`` x limit the registered engine caches are dropped in order; past
+# ``warn`` x limit a breakdown is logged; an allocation-heavy request that
+# would cross the limit is refused with a MemoryError carrying that
+# breakdown.
+_watchdog = {"limit": (2 * 2**30) if sys.platform == "emscripten" else None,
+             "soft": 0.75, "warn": 0.9}
+_caches = []   # shed order: [{"name", "size": fn() -> bytes, "clear": fn()}]
+_last_heap = [None]   # heap size at the previous check (high-water fallback)
+_mallinfo = []        # [fn() -> in-use bytes or None], resolved once
+
+
+def _register_cache(name, size, clear):
+    """Register an engine cache the watchdog may drop under pressure.
+    Registration order is shed order: cheapest to rebuild first."""
+    _caches[:] = [c for c in _caches if c["name"] != name]
+    _caches.append({"name": name, "size": size, "clear": clear})
+
+
+def _heap_bytes():
+    """Current WASM heap size under Pyodide; resident set size elsewhere."""
+    try:
+        import pyodide_js
+        return int(pyodide_js._module.HEAP8.length)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+def _malloc_bytes():
+    """Bytes the C allocator has handed out and not freed (``mallinfo2`` /
+    ``mallinfo``: ``uordblks + hblkhd``), or None where unavailable."""
+    if not _mallinfo:
+        fn = None
         try:
-            res["store_meta"] = {
-                "fields": list(s.field.keys()),
-                "n_snapshots": int(s.n_snapshots),
-                "dim": int(s.dim),
-                "n_cells": int(s.n_cells),
-            }
+            import ctypes
+            libc = ctypes.CDLL(None)
+            for name, field in (("mallinfo2", ctypes.c_size_t), ("mallinfo", ctypes.c_uint)):
+                if hasattr(libc, name):
+                    class Info(ctypes.Structure):
+                        _fields_ = [(n, field) for n in (
+                            "arena", "ordblks", "smblks", "hblks", "hblkhd", "usmblks",
+                            "fsmblks", "uordblks", "fordblks", "keepcost")]
+                    call = getattr(libc, name)
+                    call.restype = Info
+
+                    def fn(call=call):
+                        info = call()
+                        return int(info.uordblks + info.hblkhd)
+                    fn()
+                    break
         except Exception:
-            res["store_meta"] = None
+            fn = None
+        _mallinfo.append(fn)
+    try:
+        return _mallinfo[0]() if _mallinfo[0] else None
+    except Exception:
+        return None
+
+
+def memory_watchdog(limit_mb=None, trace=None, soft=None, warn=None):
+    """Configure the watchdog. ``limit_mb=0`` disables it; ``trace`` starts /
+    stops tracemalloc (off by default: a precise live-allocation total, but
+    overhead on every allocation). Returns the active settings."""
+    import tracemalloc
+    if limit_mb is not None:
+        _watchdog["limit"] = int(limit_mb * 2**20) or None
+    if soft is not None:
+        _watchdog["soft"] = float(soft)
+    if warn is not None:
+        _watchdog["warn"] = float(warn)
+    if trace is not None:
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        elif not trace and tracemalloc.is_tracing():
+            tracemalloc.stop()
+    return dict(_watchdog, trace=tracemalloc.is_tracing())
+
+
+def memory_status():
+    """``{"heap", "traced", "malloc", "used", "live", "limit", "caches":
+    {name: bytes}}``. ``used`` is the live total (traced, else malloc) when
+    ``live``, else the heap high-water mark."""
+    import tracemalloc
+    heap = _heap_bytes()
+    traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    malloc = _malloc_bytes() if traced is None else None
+    live = traced if traced is not None else malloc
+    caches = {}
+    for c in _caches:
+        try:
+            caches[c["name"]] = int(c["size"]())
+        except Exception:
+            caches[c["name"]] = None
+    return {"heap": heap, "traced": traced, "malloc": malloc,
+            "used": live if live is not None else heap, "live": live is not None,
+            "limit": _watchdog["limit"], "caches": caches}
+
+
+def _log(line):
+    """One log line: through the run's captured stdout when inside a run,
+    straight to the dashboard log otherwise (worker-called helpers)."""
+    if isinstance(sys.stdout, _LiveStdout) or not hasattr(sys, "_zoomy_display_callback"):
+        print(line)
+    else:
+        _send({"mime": "text/x-log", "content": line})
+
+
+def _memory_breakdown(status):
+    parts = [f"used {_fmt_bytes(status['used'] or 0)} of "
+             f"{_fmt_bytes(status['limit'])}"]
+    if status["heap"] is not None:
+        parts.append(f"heap {_fmt_bytes(status['heap'])}")
+    caches = {k: v for k, v in status["caches"].items() if v}
+    if caches:
+        parts.append("caches " + ", ".join(f"{k} {_fmt_bytes(v)}" for k, v in caches.items()))
+    top = scope_memory(min_bytes=2**20)[:5]
+    if top:
+        parts.append("scope " + ", ".join(f"{e['name']} {_fmt_bytes(e['bytes'])}" for e in top))
+    return "; ".join(parts)
+
+
+def _memory_check(request=0, heavy=False, what="request"):
+    """Sample memory; shed caches past ``soft``, warn past ``warn`` and, for
+    an allocation-heavy request, raise MemoryError if ``used + request``
+    would cross the limit. With only the heap high-water mark to go on,
+    shed and warn only when it grew since the last check and never refuse.
+    Returns the sampled status (None if disabled)."""
+    import gc
+    limit = _watchdog["limit"]
+    if not limit:
+        return None
+    status = memory_status()
+    if status["used"] is None:
+        return status
+    _stats.observe("memory.used_mb", status["used"] / 2**20)
+    if not status["live"]:
+        grew = _last_heap[0] is None or status["heap"] > _last_heap[0]
+        _last_heap[0] = status["heap"]
+        if not grew:
+            return status
+    if status["used"] + request > _watchdog["soft"] * limit:
+        shed = []
+        for c in _caches:
+            if status["used"] + request <= _watchdog["soft"] * limit:
+                break
+            try:
+                if not c["size"]():
+                    continue
+                c["clear"]()
+                shed.append(c["name"])
+            except Exception:
+                continue
+            gc.collect()
+            status = memory_status()
+            if not status["live"]:
+                break   # a high-water mark does not drop; one cache per growth
+        if shed:
+            _stats.incr("memory.sheds", len(shed))
+            _log(f"[memory] shed caches: {', '.join(shed)}")
+    if status["used"] + request > limit and heavy and status["live"]:
+        _stats.incr("memory.refusals")
+        raise MemoryError(
+            f"{what} refused: needs ~{_fmt_bytes(request)} more but "
+            f"{_memory_breakdown(status)}. Free scope variables "
+            f"(scope_memory()) or close other sessions first.")
+    if status["used"] + request > _watchdog["warn"] * limit:
+        _log(f"[memory] warning: {_memory_breakdown(status)}")
+    return status
+
+
+_register_cache(
+    "compiled-modules",
+    lambda: sum(sys.getsizeof(c.co_code) for c in _code_cache.values()),
+    _code_cache.clear)
+_register_cache(
+    "field-stats",
+    lambda: 64 * sum(len(v) for v in _field_stats.values()),
+    _field_stats.clear)
+
+def memory_guard(nbytes, what="request"):
+    """Worker-side gate before an allocation-heavy step (e.g. opening
+    downloaded HDF5 bytes). Raises MemoryError when refused."""
+    _memory_check(request=int(nbytes), heavy=True, what=what)
+    return True
+
+
+sys._shallowflow_scope["memory_status"] = memory_status
+sys._shallowflow_scope["memory_guard"] = memory_guard
+sys._shallowflow_scope["memory_watchdog"] = memory_watchdog
+
+
+# --- Paginated tables (DataFrame display). ----------------------------------
+# ``display(df)`` no longer renders ``df.to_html()`` — megabytes of markup
+# for a 1e5-row probe series. The frame stays here in a small LRU; the
+# cell carries the schema, the row count and the first page, encoded
+# column-wise (numeric columns as raw little-endian buffers, everything
+# else as JSON strings). The frontend pulls further pages with
+# ``table_window`` (worker cmd ``table_window``) as the user scrolls.
+TABLE_MIME = "application/vnd.zoomy.table+json"
+_TABLE_SLOTS = 32       # frames kept for paging; oldest dropped first
+_TABLE_PAGE = 100       # rows shipped with the display cell
+_TABLE_MAX_WINDOW = 10000
+_tables = {}            # id -> DataFrame, insertion order = LRU order
+_table_ids = [0]
+# numpy dtype -> wire dtype the JS side maps onto a TypedArray. 64-bit
+# integers travel as float64 (no BigInt in table cells).
+_WIRE_DTYPES = {"f4": "<f4", "f8": "<f8", "f2": "<f4", "i1": "|i1", "u1": "|u1",
+                "i2": "<i2", "u2": "<u2", "i4": "<i4", "u4": "<u4",
+                "i8": "<f8", "u8": "<f8", "b1": "|u1"}
+
+
+def _is_frame(obj):
+    return type(obj).__module__.partition(".")[0] == "pandas" and hasattr(obj, "iloc")
+
+
+def _wire_array(values, buffers):
+    """Encode an array (C order) for the wire; binary parts are appended to
+    ``buffers``, anything non-numeric goes as a list of strings."""
+    values = np.asarray(values)
+    wire = _WIRE_DTYPES.get(values.dtype.kind + str(values.dtype.itemsize))
+    if wire is None:
+        return {"values": [None if v is None else str(v)
+                           for v in values.ravel().tolist()]}
+    buffers.append(np.ascontiguousarray(values, dtype=wire).tobytes())
+    return {"buffer": len(buffers) - 1, "dtype": wire}
+
+
+def _table_window(frame, start, stop):
+    start = min(max(0, int(start)), len(frame))
+    stop = min(len(frame), int(stop), start + _TABLE_MAX_WINDOW)
+    part = frame.iloc[start:stop]
+    buffers = []
+    window = {"start": start, "stop": stop,
+              "index": _wire_array(part.index.to_numpy(), buffers),
+              "columns": [_wire_array(part.iloc[:, j].to_numpy(), buffers)
+                          for j in range(part.shape[1])]}
+    return window, buffers
+
+
+def _emit_table(obj):
+    frame = obj if hasattr(obj, "columns") else obj.to_frame()
+    _table_ids[0] += 1
+    tid = "t%d" % _table_ids[0]
+    _tables[tid] = frame
+    while len(_tables) > _TABLE_SLOTS:
+        _tables.pop(next(iter(_tables)))
+    window, buffers = _table_window(frame, 0, _TABLE_PAGE)
+    display._emit({"mime": TABLE_MIME, "content": json.dumps({
+        "table": tid, "rows": len(frame),
+        "index": {"name": None if frame.index.name is None else str(frame.index.name),
+                  "dtype": str(frame.index.dtype)},
+        "columns": [{"name": str(c), "dtype": str(t)}
+                    for c, t in zip(frame.columns, frame.dtypes)],
+        "window": window})}, buffers)
+
+
+def table_window(table, start, stop):
+    """Rows ``[start, stop)`` of displayed table ``table`` (worker-callable).
+    Returns ``(window_json, [bytes, ...])`` — the buffers the window's
+    numeric columns point into."""
+    frame = _tables.pop(table, None)
+    if frame is None:
+        raise KeyError(f"table_window: table {table!r} expired — re-run the cell")
+    _tables[table] = frame
+    window, buffers = _table_window(frame, start, stop)
+    _stats.incr("display.table_windows")
+    return json.dumps(window), buffers
+
+
+_register_cache(
+    "tables",
+    lambda: sum(int(f.memory_usage(index=True).sum()) for f in _tables.values()),
+    _tables.clear)
+
+
+# --- Array display with on-demand slicing. ---------------------------------
+# ``display(Q)`` sends shape, dtype, summary statistics, a summarised text
+# form and the leading corner as a binary preview — never the full
+# ``repr``. The array is kept (by reference) in an LRU like the tables, and
+# ``array_slice`` (worker cmd ``array_slice``) returns any numpy-style
+# slice of it as a binary buffer later.
+ARRAY_MIME = "application/vnd.zoomy.ndarray+json"
+_ARRAY_SLOTS = 32
+_ARRAY_PREVIEW = 256        # elements in the preview corner
+_ARRAY_MAX_SLICE = 1 << 22  # elements per array_slice answer
+_arrays = {}
+_array_ids = [0]
+
+
+def _array_stats(a):
+    if a.dtype.kind not in "biuf" or not a.size:
+        return None
+    import warnings
+    with warnings.catch_warnings(), np.errstate(all="ignore"):
+        warnings.simplefilter("ignore")
+        x = a.astype(np.float64) if a.dtype.kind == "b" else a
+        stats = {"min": np.nanmin(x), "max": np.nanmax(x),
+                 "mean": np.nanmean(x), "std": np.nanstd(x)}
+    # NaN / inf are not JSON: an all-NaN array or one holding inf reports
+    # null for the statistics that came out non-finite.
+    stats = {k: float(v) if np.isfinite(v) else None for k, v in stats.items()}
+    stats["nan"] = int(np.isnan(x).sum()) if a.dtype.kind == "f" else 0
+    return stats
+
+
+def _emit_array(a):
+    _array_ids[0] += 1
+    aid = "a%d" % _array_ids[0]
+    _arrays[aid] = a
+    while len(_arrays) > _ARRAY_SLOTS:
+        _arrays.pop(next(iter(_arrays)))
+    k = max(1, int(_ARRAY_PREVIEW ** (1.0 / a.ndim))) if a.ndim else 1
+    corner = np.asarray(a[(slice(0, k),) * a.ndim])
+    buffers = []
+    display._emit({"mime": ARRAY_MIME, "content": json.dumps({
+        "array": aid, "shape": list(a.shape), "dtype": str(a.dtype),
+        "nbytes": int(a.nbytes), "stats": _array_stats(a),
+        "text": np.array2string(a, threshold=200, edgeitems=3),
+        "preview": {"shape": list(corner.shape),
+                    "data": _wire_array(corner, buffers)}},
+        cls=NumpyEncoder, allow_nan=False)}, buffers)
+
+
+def _parse_index(spec):
+    """``"0:10, 3, ..., ::2"`` -> a numpy index tuple (parsed, never eval'd)."""
+    index = []
+    for part in str(spec).split(","):
+        part = part.strip()
+        if part == "...":
+            index.append(Ellipsis)
+        elif ":" in part:
+            index.append(slice(*[int(p) if p.strip() else None
+                                 for p in part.split(":")]))
+        elif part:
+            index.append(int(part))
+    return tuple(index)
+
+
+def array_slice(array, index):
+    """``array[index]`` of displayed array ``array`` (worker-callable), with
+    ``index`` in numpy slice syntax. Returns ``(json, [bytes])``: the
+    slice's shape, dtype and wire-encoded ``data``."""
+    a = _arrays.pop(array, None)
+    if a is None:
+        raise KeyError(f"array_slice: array {array!r} expired — re-run the cell")
+    _arrays[array] = a
+    part = np.asarray(a[_parse_index(index)])
+    if part.size > _ARRAY_MAX_SLICE:
+        raise ValueError(f"array_slice: {index!r} selects {part.size} elements "
+                         f"(max {_ARRAY_MAX_SLICE}); narrow the slice")
+    buffers = []
+    _stats.incr("display.array_slices")
+    return json.dumps({"shape": list(part.shape), "dtype": str(part.dtype),
+                       "data": _wire_array(part, buffers)}), buffers
+
+
+_register_cache(
+    "arrays",
+    lambda: sum(a.nbytes for a in _arrays.values()),
+    _arrays.clear)
+
+
+# --- Animation export. ------------------------------------------------------
+# ``animate(store, field)`` renders every snapshot into a GIF / APNG / MP4.
+# The figure is built once (``MatplotlibPlotter.plot`` at the first step);
+# each further frame only swaps the scalar data of the existing artists
+# (``set_array`` on the mesh collection, ``set_ydata`` on a 1-D line) and
+# the title, then rasterises and hands the frame straight to the encoder.
+# Under CPython with ``fork`` the frames are rendered by a set of processes
+# (each re-opens the store and builds its own figure once).
+_ANIM_FORMATS = {"gif": "image/gif", "apng": "image/png", "mp4": "video/mp4"}
+
+
+def _field_label(store, field):
+    """Display name of ``field`` (a name, a symbol or an index into
+    ``store.field``)."""
+    if isinstance(field, str):
+        return field
+    name = getattr(field, "name", None)
+    if isinstance(name, str):
+        return name
+    if isinstance(field, (int, np.integer)):
+        for k, v in store.field.items():
+            if int(v) == int(field):
+                return str(k)
+        return f"field[{int(field)}]"
+    return str(field)
+
+
+def _time_label(store, step):
+    """``t = ...`` for ``step``, with enough decimals to tell adjacent
+    snapshots apart; ``step N`` when the store has no times."""
+    times = store.times
+    step = int(step)
+    if times is None or not len(times):
+        return f"step {step}"
+    t = float(times[max(0, min(step, len(times) - 1))])
+    gaps = np.diff(np.asarray(times, dtype=float))
+    gap = float(np.median(gaps)) if gaps.size else 0.0
+    if gap > 0:
+        decimals = max(2, min(6, int(np.ceil(-np.log10(gap))) + 1))
+        return f"t = {t:.{decimals}f}"
+    return f"t = {t:.3f}"
+
+
+class _FrameRenderer:
+    """A store plot built once; ``update`` swaps the scalar data of its
+    artists and, unless ``vlim`` pins them, the colour limits. A structured
+    2-D grid is drawn as an image of its cells (``grid_index``). Any other
+    1-D / 2-D store with more cells than the axes have pixels is drawn at
+    screen resolution (``lod_view``) unless ``full``; ``lod_error`` then
+    holds the last step's reduction error."""
+
+    def __init__(self, store, field, first, vlim, cmap, figsize, dpi, full=False):
+        import matplotlib
+        matplotlib.use("agg")
+        import matplotlib.pyplot as plt
+        import zoomy_plotting as zp
+
+        self.store, self.field, self.vlim = store, field, vlim
+        self.plotter = zp.MatplotlibPlotter(store)
+        self.lod, self.lod_error = None, None
+        self.grid = grid_index(store)
+        kw = {} if store.dim == 1 else {"cmap": cmap, "colorbar": True, "vlim": vlim}
+        with zp.apply_style():
+            if store.dim == 3:
+                self.fig = plt.figure(figsize=figsize, dpi=dpi)
+                self.ax = self.fig.add_subplot(111, projection="3d")
+            else:
+                self.fig, self.ax = plt.subplots(figsize=figsize, dpi=dpi)
+                if not full and self.grid is None:
+                    box = self.ax.get_window_extent()
+                    self.lod_size = (box.width, box.height)
+                    self.lod = _lod_reduction(store, self.lod_size)
+            if self.grid is not None:
+                self.arts = self._plot_image(cmap, self.grid["shape"], self.grid["extent"])
+            elif self.lod is not None:
+                self.arts = self._plot_lod(cmap)
+            else:
+                self.arts = self.plotter.plot(self.ax, time_step=first, field=field, **kw)
+        self.nbytes = 0
+        if self.lod is not None or self.grid is not None:
+            return
+        if store.dim == 1:
+            self.order = np.argsort(store.cell_centers[:, 0])
+        else:
+            # Turn the per-face RGBA collection into a mapped one so later
+            # updates are a set_array, not a new PolyCollection.
+            mesh = self.arts["mesh"]
+            mesh.set_cmap(cmap)
+            mesh.set_norm(matplotlib.colors.Normalize())
+            # Boundary faces in the plotter's order (mesh_ops mirrors it).
+            self.parents = (store_geometry(store)["boundary_parents"].astype(np.intp)
+                            if store.dim == 3 else None)
+            self.nbytes = sum(p.vertices.nbytes for p in mesh.get_paths())
+
+    def _plot_lod(self, cmap):
+        """Empty artists for the screen-resolution view; ``update`` fills
+        them (the band is re-made each step, like ``fill_between`` wants)."""
+        import zoomy_plotting as zp
+        ax, label = self.ax, _field_label(self.store, self.field)
+        if self.store.dim == 1:
+            (line,) = ax.plot([], [], linewidth=zp.CONFIG.line_linewidth)
+            if zp.CONFIG.axes_grid_1d:
+                ax.grid(True, alpha=zp.CONFIG.grid_alpha)
+            ax.set_xlabel("x")
+            ax.set_ylabel(label)
+            return {"line": line, "band": None}
+        shape, bounds, _ = self.lod
+        return self._plot_image(cmap, shape, bounds)
+
+    def _plot_image(self, cmap, shape, extent):
+        """An empty ``imshow`` (row 0 at the bottom) with its colourbar."""
+        import zoomy_plotting as zp
+        from zoomy_plotting.plot.matplotlib import add_colorbar
+        ax = self.ax
+        image = ax.imshow(np.full(shape, np.nan), origin="lower", extent=extent,
+                          cmap=cmap, interpolation="nearest")
+        ax.set_aspect("equal")
+        if zp.CONFIG.axes_grid_2d3d:
+            ax.grid(True, alpha=zp.CONFIG.grid_alpha)
+        return {"mesh": image, "colorbar": add_colorbar(
+            self.fig, ax, image, label=_field_label(self.store, self.field))}
+
+    def _set_image(self, data, extent=None):
+        image = self.arts["mesh"]
+        image.set_data(data)
+        if extent is not None:
+            image.set_extent(extent)
+        image.set_clim(*(self.vlim or (np.nanmin(data), np.nanmax(data))))
+        self.arts["colorbar"].update_normal(image)
+
+    def _update_lod(self, step):
+        view = lod_view(self.store, self.field, step, self.lod_size)
+        self.lod_error = view["error"]
+        if view["kind"] == "line":
+            line = self.arts["line"]
+            line.set_data(view["x"], view["mean"])
+            if self.arts["band"] is not None:
+                self.arts["band"].remove()
+            self.arts["band"] = self.ax.fill_between(
+                view["x"], view["min"], view["max"], color=line.get_color(),
+                alpha=0.3, linewidth=0)
+            if self.vlim is not None:
+                self.ax.set_ylim(*self.vlim)
+            else:
+                self.ax.relim()
+                self.ax.autoscale_view()
+            return
+        self._set_image(view["image"], view["extent"])
+
+    def _update_cells(self, values):
+        if self.grid is not None:
+            self._set_image(values[self.grid["order"]].reshape(self.grid["shape"]))
+        elif self.store.dim == 1:
+            for name in ("line", "nodes"):
+                if name in self.arts:
+                    self.arts[name].set_ydata(values[self.order])
+            if self.vlim is not None:
+                self.ax.set_ylim(*self.vlim)
+            else:
+                self.ax.relim()
+                self.ax.autoscale_view()
+        else:
+            mesh = self.arts["mesh"]
+            mesh.set_array(values if self.parents is None else values[self.parents])
+            mesh.set_clim(*(self.vlim or (np.nanmin(values), np.nanmax(values))))
+            if "colorbar" in self.arts:
+                self.arts["colorbar"].update_normal(mesh)
+
+    def update(self, step, field=None):
+        if field is not None and field != self.field:
+            self.field = field
+            label = _field_label(self.store, field)
+            if "colorbar" in self.arts:
+                self.arts["colorbar"].set_label(label)
+            if self.store.dim == 1:
+                self.ax.set_ylabel(label)
+        if self.lod is not None:
+            self._update_lod(step)
+        else:
+            self._update_cells(np.asarray(self.store.get_cell(step, self.field), dtype=float))
+        self.ax.set_title(f"{_field_label(self.store, self.field)}  —  "
+                          f"{_time_label(self.store, step)}")
+        return self.fig
+
+    def render(self, step):
+        self.update(step)
+        self.fig.canvas.draw()
+        return np.asarray(self.fig.canvas.buffer_rgba())[:, :, :3].copy()
+
+    def close(self):
+        import matplotlib.pyplot as plt
+        plt.close(self.fig)
+
+
+class _FrameSink:
+    """Streaming encoder: frames are appended as they are rendered. GIF
+    frames are palette-quantised on arrival (1 byte / pixel held); MP4
+    goes through imageio-ffmpeg."""
+
+    def __init__(self, out, fmt, fps):
+        self.out, self.fmt, self.fps = out, fmt, fps
+        self.frames = []
+        self.writer = None
+        if fmt == "mp4":
+            import imageio.v2 as imageio
+            self.writer = imageio.get_writer(out, fps=fps)
+
+    def append(self, rgb):
+        if self.writer is not None:
+            self.writer.append_data(rgb)
+            return
+        from PIL import Image
+        img = Image.fromarray(rgb)
+        self.frames.append(img.quantize(256) if self.fmt == "gif" else img)
 
-    return json.dumps(res, cls=NumpyEncoder)
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            return
+        if not self.frames:
+            raise ValueError("animate: no frames rendered")
+        first, rest = self.frames[0], self.frames[1:]
+        first.save(self.out, format="GIF" if self.fmt == "gif" else "PNG",
+                   save_all=True, append_images=rest, loop=0,
+                   duration=int(round(1000.0 / self.fps)))
+        self.frames = []
+
+
+def _animate_worker(queue, path, field, steps, opts):
+    """Forked render process: re-open the store, build the figure once and
+    push its share of the frames (in order) into ``queue``."""
+    try:
+        import zoomy_plotting as zp
+        renderer = _FrameRenderer(zp.read_hdf5(path), field, steps[0], *opts)
+        for step in steps:
+            queue.put(renderer.render(step))
+    except BaseException as e:
+        queue.put(f"{type(e).__name__}: {e}")
+
+
+def _animate_parallel(store, field, steps, opts, processes, sink):
+    """Render ``steps`` across ``processes`` forked processes, worker k
+    taking every n-th step, and feed the sink in step order. Returns False
+    where rendering must stay serial (Pyodide, no fork, no HDF5 path, few
+    frames)."""
+    import multiprocessing
+    import queue as _queue
+    n = min(int(processes or 1), os.cpu_count() or 1)
+    if (sys.platform == "emscripten" or n < 2 or len(steps) < 8
+            or not getattr(store, "source_path", None)
+            or "fork" not in multiprocessing.get_all_start_methods()):
+        return False
+    # Build (and write the sidecar of) the geometry here, once: the forked
+    # renderers inherit the cache instead of racing on the same sidecar.
+    store_geometry(store)
+    ctx = multiprocessing.get_context("fork")
+    queues = [ctx.Queue(maxsize=4) for _ in range(n)]   # bounded: backpressure
+    procs = [ctx.Process(target=_animate_worker, daemon=True,
+                         args=(queues[k], store.source_path, field, steps[k::n], opts))
+             for k in range(n)]
+    for proc in procs:
+        proc.start()
+    try:
+        for i in range(len(steps)):
+            k = i % n
+            while True:
+                try:
+                    frame = queues[k].get(timeout=1.0)
+                    break
+                except _queue.Empty:
+                    if not procs[k].is_alive():
+                        raise RuntimeError(f"animate: render process {k} died")
+            if isinstance(frame, str):
+                raise RuntimeError(f"animate: render process {k} failed: {frame}")
+            sink.append(frame)
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+            proc.join()
+    return True
+
+
+def animate(store=None, field=None, steps=None, fmt="gif", out=None, fps=8,
+            vlim=None, cmap="viridis", figsize=(8, 6), dpi=100,
+            processes=1, show=True):
+    """Render ``field`` over ``steps`` (default: every snapshot) of ``store``
+    (default: the scope store) into an animation file and return its path.
+
+    ``fmt`` is ``"gif"``, ``"apng"`` or ``"mp4"`` (mp4 needs imageio-ffmpeg).
+    Colour limits default to the field's range over the whole run
+    (``field_stats``), so frames share one colour scale. Frames render
+    serially; ``processes`` > 1 opts into a forked CPython render pool of
+    that size. The default ``out`` is per store and field, under
+    ``/tmp/zoomy_anim``. With ``show`` the animation is also displayed."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("animate: no store — run a simulation first.")
+    if fmt not in _ANIM_FORMATS:
+        raise ValueError(f"animate: fmt must be one of {sorted(_ANIM_FORMATS)}, got {fmt!r}")
+    field = field if field is not None else next(iter(store.field.keys()))
+    steps = list(range(store.n_snapshots) if steps is None else steps)
+    if not steps:
+        raise ValueError("animate: steps is empty — nothing to animate")
+    if vlim is None:
+        name = field if isinstance(field, str) else getattr(field, "name", None)
+        rng = (field_stats(store) or {}).get(name)
+        if rng is None:   # index-addressed field: one pass over the steps
+            vals = [np.asarray(store.get_cell(s, field), dtype=float) for s in steps]
+            rng = {"min": min(np.nanmin(v) for v in vals),
+                   "max": max(np.nanmax(v) for v in vals)}
+        vlim = (float(rng["min"]), float(rng["max"]))
+    if out is None:
+        os.makedirs("/tmp/zoomy_anim", exist_ok=True)
+        tag = hashlib.blake2b(repr(_store_key(store)).encode(), digest_size=4).hexdigest()
+        out = f"/tmp/zoomy_anim/{field}-{tag}.{'png' if fmt == 'apng' else fmt}"
+
+    t0 = time.perf_counter()
+    sink = _FrameSink(out, fmt, fps)
+    opts = (vlim, cmap, figsize, dpi)
+    try:
+        if not _animate_parallel(store, field, steps, opts, processes, sink):
+            renderer = _FrameRenderer(store, field, steps[0], *opts)
+            try:
+                for step in steps:
+                    sink.append(renderer.render(step))
+            finally:
+                renderer.close()
+    finally:
+        sink.close()
+    ms = (time.perf_counter() - t0) * 1000.0
+    _stats.incr("animate.frames", len(steps))
+    _stats.observe("animate.frame_ms", ms / len(steps))
+    print(f"[animate] {len(steps)} frames of {field} -> {out} "
+          f"({_fmt_bytes(os.path.getsize(out))}, {ms / 1000.0:.1f} s)")
+    if show:
+        with open(out, "rb") as f:
+            display._emit({"mime": _ANIM_FORMATS[fmt],
+                           "content": base64.b64encode(f.read()).decode()})
+    return out
+
+
+sys._shallowflow_scope["animate"] = animate
+
+
+# --- Persistent figures for matplotlib viz cards. --------------------------
+# A viz card re-runs on every time-step / field change. Rebuilding the plot
+# each time means a fresh figure and a fresh PolyCollection of every cell —
+# for a 1e5-cell mesh nearly all of the render goes into geometry that never
+# changed. ``card_figure(card_id, ...)`` keeps one ``_FrameRenderer`` per card
+# (and session) across runs and only swaps the scalar array, colour limits,
+# colourbar label and title; a new store or different plot options rebuild
+# it. ``_exec_block`` closes every other figure between runs.
+_FIGURE_SLOTS = 8
+_figures = {}   # (session, card id) -> (signature, _FrameRenderer), LRU order
+
+
+def _close_stray_figures():
+    plt = sys.modules.get("matplotlib.pyplot")
+    if plt is None:
+        return
+    keep = {r.fig for _, r in _figures.values()}
+    for num in plt.get_fignums():
+        fig = plt.figure(num)
+        if fig not in keep:
+            plt.close(fig)
+
+
+def _drop_figure(key):
+    entry = _figures.pop(key, None)
+    if entry is not None:
+        entry[1].close()
+
+
+def card_figure(card_id, store=None, field=None, step=0, cmap="viridis",
+                figsize=None, dpi=None, vlim=None, full=False):
+    """The matplotlib figure of viz card ``card_id`` showing ``field`` at
+    ``step`` of ``store`` (default: the scope store), reusing the card's
+    figure from its previous run when store and options are unchanged.
+    ``vlim`` pins the colour limits (default: each step's own range);
+    ``full`` draws every cell even when the mesh outnumbers the pixels."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("card_figure: no store — run a simulation first.")
+    field = field if field is not None else next(iter(store.field.keys()))
+    key = (_active_session, card_id)
+    sig = (id(store), _store_key(store), cmap, figsize, dpi, bool(full))
+    entry = _figures.pop(key, None)
+    if entry is not None and entry[0] != sig:
+        entry[1].close()
+        entry = None
+    if entry is None:
+        t0 = time.perf_counter()
+        entry = (sig, _FrameRenderer(store, field, step, vlim, cmap, figsize, dpi, full))
+        _stats.observe("figures.build_ms", (time.perf_counter() - t0) * 1000.0)
+    else:
+        _stats.incr("figures.reused")
+    _figures[key] = entry
+    while len(_figures) > _FIGURE_SLOTS:
+        _drop_figure(next(iter(_figures)))
+    renderer = entry[1]
+    renderer.vlim = vlim
+    fig = renderer.update(step, field)
+    if renderer.lod_error is not None:
+        _log(_lod_note(renderer.lod_error))
+    return fig
+
+
+_register_cache(
+    "figures",
+    lambda: sum(r.nbytes for _, r in _figures.values()),
+    lambda: [_drop_figure(k) for k in list(_figures)])
+
+sys._shallowflow_scope["card_figure"] = card_figure
+
+
+# --- Raw Plotly figure dicts. -----------------------------------------------
+# ``go.Figure(go.Mesh3d(...))`` runs plotly's property validators over every
+# array and ``display`` then converts it all back with ``to_dict()``; for a
+# large mesh both passes dominate the render. These helpers build the same
+# traces as plain dicts (numpy arrays stay arrays until ``json.dumps``), and
+# ``display`` serialises a ``{"data": [...], "layout": {...}}`` dict directly
+# — a card built on them never imports ``plotly.graph_objects`` at all.
+def plotly_mesh(vertices, triangles, intensity=None, **kw):
+    """A ``mesh3d`` trace: ``vertices`` (n, 2|3) — z = 0 for 2-D — and
+    ``triangles`` (m, 3) vertex indices; ``intensity`` per vertex."""
+    v = np.asarray(vertices)
+    t = np.asarray(triangles)
+    trace = {"type": "mesh3d", "x": v[:, 0], "y": v[:, 1],
+             "z": v[:, 2] if v.shape[1] > 2 else np.zeros(len(v)),
+             "i": t[:, 0], "j": t[:, 1], "k": t[:, 2]}
+    if intensity is not None:
+        trace["intensity"] = np.asarray(intensity)
+    trace.update(kw)
+    return trace
+
+
+def plotly_line(x, y, mode="lines", **kw):
+    """A ``scatter`` trace (``mode`` "lines", "markers", "lines+markers")."""
+    return dict({"type": "scatter", "mode": mode,
+                 "x": np.asarray(x), "y": np.asarray(y)}, **kw)
+
+
+def plotly_heatmap(z, x=None, y=None, **kw):
+    """A ``heatmap`` trace of the 2-D array ``z`` (rows along y)."""
+    trace = {"type": "heatmap", "z": np.asarray(z)}
+    if x is not None:
+        trace["x"] = np.asarray(x)
+    if y is not None:
+        trace["y"] = np.asarray(y)
+    trace.update(kw)
+    return trace
+
+
+def plotly_figure(*traces, frames=None, **layout):
+    """``{"data", "layout"[, "frames"]}`` ready for ``display``."""
+    fig = {"data": list(traces), "layout": layout}
+    if frames is not None:
+        fig["frames"] = list(frames)
+    return fig
+
+
+sys._shallowflow_scope["plotly_mesh"] = plotly_mesh
+sys._shallowflow_scope["plotly_line"] = plotly_line
+sys._shallowflow_scope["plotly_heatmap"] = plotly_heatmap
+sys._shallowflow_scope["plotly_figure"] = plotly_figure
+
+
+# --- Store geometry cache (HDF5 sidecar). ---------------------------------
+# Cell centres, the triangulation, 3-D boundary faces and cell measures
+# depend only on the mesh, yet every card recomputed them on every run.
+# ``store_geometry(store)`` computes them once per mesh (``mesh_ops``) and
+# keeps them in memory; they are also written to an HDF5 sidecar on the
+# results shelf, ``/tmp/zoomy_results/.geometry/<mesh hash>.h5``, so a later
+# session opening the same result — or any run on the same mesh — loads
+# them instead. The worker syncs the shelf after a run that wrote one
+# (``geometry_sidecars_pending``). Sidecars are named by mesh content, so a
+# re-run on the same mesh reuses its file; the directory is capped at
+# ``_GEOMETRY_DISK_BYTES``, least recently used sidecars removed first (a
+# hit refreshes the file's mtime).
+_GEOMETRY_DIR = os.path.join(_RESULTS_DIR, ".geometry")
+_GEOMETRY_VERSION = 2
+_GEOMETRY_SLOTS = 8
+_GEOMETRY_DISK_BYTES = 256 * 2**20
+_geometries = {}           # store key -> geometry dict, LRU order
+_sidecar_writes = [0]
+
+
+def _mesh_hash(store):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{int(store.dim)}:{store.cell_type}:".encode())
+    for a in (store.vertices, store.cells):
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype.str}{a.shape}".encode())
+        h.update(a.view(np.uint8).ravel())
+    return h.hexdigest()
+
+
+def _compute_geometry(store):
+    from mesh_ops import (boundary_faces, cell_centers, cell_measures, fan_triangulate,
+                          structured_grid)
+    verts = np.asarray(store.vertices, dtype=float)
+    cells = np.asarray(store.cells)
+    geo = {"cell_centers": cell_centers(verts, cells),
+           "cell_measures": cell_measures(verts, cells, store.cell_type)}
+    if int(store.dim) == 3:
+        faces, parents = boundary_faces(cells, store.cell_type)
+        tris, of_face = fan_triangulate(faces)
+        geo.update(boundary_faces=faces, boundary_parents=parents,
+                   boundary_measures=cell_measures(verts, faces),
+                   triangles=tris, triangle_cells=parents[of_face])
+    elif int(store.dim) == 2:
+        geo["triangles"], geo["triangle_cells"] = fan_triangulate(cells)
+        grid = structured_grid(geo["cell_centers"], geo["cell_measures"])
+        if grid is not None:
+            geo.update(grid_order=grid["order"], grid_shape=np.asarray(grid["shape"]),
+                       grid_extent=np.asarray(grid["extent"]))
+    else:
+        geo["triangles"] = np.zeros((0, 3), dtype=np.int32)
+        geo["triangle_cells"] = np.zeros(0, dtype=np.int32)
+    return geo
+
+
+def _read_sidecar(path):
+    import h5py
+    with h5py.File(path, "r") as f:
+        if f.attrs.get("version") != _GEOMETRY_VERSION:
+            return None
+        return {name: f[name][()] for name in f}
+
+
+def _write_sidecar(path, geo):
+    import h5py
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with h5py.File(tmp, "w") as f:
+        f.attrs["version"] = _GEOMETRY_VERSION
+        for name, values in geo.items():
+            f.create_dataset(name, data=values)
+    os.replace(tmp, path)
+    _prune_sidecars(keep=path)
+
+
+def _prune_sidecars(keep=None):
+    """Remove the least recently used geometry sidecars (oldest mtime
+    first) until the directory fits ``_GEOMETRY_DISK_BYTES``; ``keep`` is
+    never removed. Returns the number of files removed."""
+    try:
+        entries = []
+        for name in os.listdir(_GEOMETRY_DIR):
+            path = os.path.join(_GEOMETRY_DIR, name)
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+    except OSError:
+        return 0
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= _GEOMETRY_DISK_BYTES:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        _stats.incr("geometry.sidecars_evicted", removed)
+    return removed
+
+
+def store_geometry(store=None):
+    """Derived mesh arrays of ``store`` (default: the scope store), computed
+    once per mesh and shared by every card — treat them as read-only:
+
+    ``cell_centers`` (n_cells, dim), ``cell_measures`` (lengths / areas /
+    volumes), ``triangles`` (m, 3) int32 with ``triangle_cells`` (the cell
+    each colours), and in 3-D the ``boundary_faces`` (-1 padded when
+    triangles and quads mix) with ``boundary_parents`` and
+    ``boundary_measures`` (face areas); ``triangles`` then cover the
+    boundary. A 2-D mesh that is a uniform rectangular grid also has
+    ``grid_order``, ``grid_shape`` and ``grid_extent`` (see ``grid_index``).
+    ``hash`` identifies the mesh."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("store_geometry: no store — run a simulation first.")
+    key = _store_key(store)
+    geo = _geometries.pop(key, None)
+    if geo is None:
+        digest = _mesh_hash(store)
+        path = os.path.join(_GEOMETRY_DIR, digest + ".h5")
+        try:
+            geo = _read_sidecar(path) if os.path.isfile(path) else None
+        except (ImportError, OSError, KeyError) as e:
+            _log(f"[geometry] unreadable sidecar {path}: {e}")
+            geo = None
+        if geo is not None:
+            _stats.incr("geometry.sidecar_hits")
+            try:
+                os.utime(path)   # most recently used: pruned last
+            except OSError:
+                pass
+        else:
+            t0 = time.perf_counter()
+            geo = _compute_geometry(store)
+            _stats.observe("geometry.build_ms", (time.perf_counter() - t0) * 1000.0)
+            try:
+                _write_sidecar(path, geo)
+                _sidecar_writes[0] += 1
+            except (ImportError, OSError) as e:
+                _log(f"[geometry] sidecar not written ({e}); kept in memory only")
+        for values in geo.values():
+            values.setflags(write=False)
+        geo["hash"] = digest
+    _geometries[key] = geo
+    while len(_geometries) > _GEOMETRY_SLOTS:
+        _geometries.pop(next(iter(_geometries)))
+    return geo
+
+
+def grid_index(store=None):
+    """The structured-grid layout of ``store`` (default: the scope store),
+    or None unless it is a 2-D uniform rectangular grid (e.g. from
+    ``BaseMesh.create_2d``): ``shape`` (ny, nx); ``order``, the cell at each
+    grid position (row 0 at the bottom); ``ij``, each cell's (column, row);
+    ``extent`` (x0, x1, y0, y1) and ``spacing`` (dx, dy). Detected once per
+    mesh with the rest of ``store_geometry``.
+    ``values[order].reshape(shape)`` is the field as an image."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None or int(store.dim) != 2:
+        return None
+    geo = store_geometry(store)
+    if "grid_order" not in geo:
+        return None
+    ny, nx = (int(n) for n in geo["grid_shape"])
+    x0, x1, y0, y1 = (float(e) for e in geo["grid_extent"])
+    order = geo["grid_order"]
+    ij = np.empty((len(order), 2), dtype=np.int64)
+    ij[order, 1], ij[order, 0] = np.divmod(np.arange(len(order)), nx)
+    return {"shape": (ny, nx), "order": order, "ij": ij,
+            "extent": (x0, x1, y0, y1), "spacing": ((x1 - x0) / nx, (y1 - y0) / ny)}
+
+
+def grid_image(values, store=None):
+    """Per-cell ``values`` of a structured-grid store as a (ny, nx) image,
+    row 0 at the bottom — one gather; None when the store is no grid."""
+    grid = grid_index(store)
+    if grid is None:
+        return None
+    return np.asarray(values)[grid["order"]].reshape(grid["shape"])
+
+
+def geometry_sidecars_pending():
+    """True once per batch of newly written sidecars — geometry, pyramid
+    or profile lift (worker-called: sync the results shelf to IndexedDB)."""
+    pending = _sidecar_writes[0] > 0
+    _sidecar_writes[0] = 0
+    return pending
+
+
+_register_cache(
+    "geometry",
+    lambda: sum(v.nbytes for g in _geometries.values() for k, v in g.items() if k != "hash"),
+    _geometries.clear)
+
+sys._shallowflow_scope["store_geometry"] = store_geometry
+sys._shallowflow_scope["grid_index"] = grid_index
+sys._shallowflow_scope["grid_image"] = grid_image
+
+
+# --- Binary mesh transport. -------------------------------------------------
+# A store's mesh never changes between snapshots, yet every viz update used
+# to re-send it (vertex coordinates and connectivity as JSON lists) just to
+# recolour it. ``display_mesh`` triangulates the store once and ships the
+# geometry once per session as raw buffers under a geometry id; every later
+# cell for that store carries only the per-vertex scalars (float32, or
+# float16 with ``half=True``) with their range. The frontend caches geometry
+# by id and asks for it again with ``mesh_geometry`` (worker cmd
+# ``mesh_geometry``) when a cell names an id it does not hold.
+MESH_MIME = "application/vnd.zoomy.mesh+json"
+_MESH_SLOTS = 8
+_meshes = {}        # store key -> _MeshGeometry, LRU order
+_mesh_sent = set()  # (session, geometry id) whose geometry went out
+_mesh_ids = [0]
+
+
+class _MeshGeometry:
+    """Renderable geometry of one store: ``positions`` (n, dim) float32 and
+    ``indices`` (m, 3) uint32 triangles (1-D: a polyline through the cell
+    centres, no triangles), plus the cell -> vertex value mapping."""
+
+    def __init__(self, store):
+        _mesh_ids[0] += 1
+        self.id = "g%d" % _mesh_ids[0]
+        self.dim = int(store.dim)
+        geo = store_geometry(store)
+        if self.dim == 1:
+            x = geo["cell_centers"][:, 0]
+            order = np.argsort(x)
+            self.positions = x[order].astype(np.float32)[:, None]
+            self.indices = np.zeros((0, 3), dtype=np.uint32)
+            self.drawn = slice(None)
+            self._values = lambda v: v[order]
+            return
+        if not len(geo["triangles"]):
+            raise RuntimeError(f"display_mesh: nothing to draw for "
+                               f"{store.n_cells} {store.cell_type!r} cells")
+        verts = np.asarray(store.vertices)
+        self.positions = np.ascontiguousarray(verts[:, :self.dim], dtype=np.float32)
+        self.indices = geo["triangles"].astype(np.uint32)
+        # Only triangle corners are drawn (3-D: the boundary); interior
+        # vertices hold 0 and must not widen the colour range.
+        self.drawn = np.unique(self.indices)
+        self._values = vertex_operator(store)
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes + self.indices.nbytes
+
+    def head(self, buffers):
+        return {"id": self.id, "dim": self.dim,
+                "positions": _wire_array(self.positions, buffers),
+                "indices": _wire_array(self.indices, buffers)}
+
+    def scalars(self, cell_values):
+        return self._values(np.asarray(cell_values, dtype=float))
+
+
+def _mesh_geometry(store):
+    key = _store_key(store)
+    geom = _meshes.pop(key, None)
+    if geom is None:
+        t0 = time.perf_counter()
+        geom = _MeshGeometry(store)
+        _stats.observe("mesh.build_ms", (time.perf_counter() - t0) * 1000.0)
+    _meshes[key] = geom
+    while len(_meshes) > _MESH_SLOTS:
+        _meshes.pop(next(iter(_meshes)))
+    return geom
+
+
+def display_mesh(store=None, field=None, step=0, half=False, vlim=None,
+                 cmap="viridis"):
+    """Show ``field`` at ``step`` of ``store`` (default: the scope store) as
+    an ``application/vnd.zoomy.mesh+json`` cell: geometry the first time
+    this session shows the store, then only the scalar buffer. ``half``
+    sends float16 scalars; ``vlim`` pins the colour range."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("display_mesh: no store — run a simulation first.")
+    field = field if field is not None else next(iter(store.field.keys()))
+    step = int(step)
+    geom = _mesh_geometry(store)
+    values = geom.scalars(store.get_cell(step, field))
+    if vlim is None:
+        drawn = values[geom.drawn]
+        drawn = drawn[np.isfinite(drawn)]
+        vlim = (drawn.min(), drawn.max()) if len(drawn) else (None, None)
+    lo, hi = (None if v is None or not np.isfinite(v) else float(v) for v in vlim)
+    buffers = []
+    cell = {"mesh": geom.id, "field": str(field), "step": step,
+            "time": None if store.times is None or not len(store.times)
+            else float(store.times[step]),
+            "range": [lo, hi], "cmap": cmap}
+    if (_active_session, geom.id) not in _mesh_sent:
+        cell["geometry"] = geom.head(buffers)
+        _mesh_sent.add((_active_session, geom.id))
+        _stats.incr("mesh.geometry_sent")
+    if half:
+        buffers.append(np.ascontiguousarray(values, dtype="<f2").tobytes())
+        cell["scalars"] = {"buffer": len(buffers) - 1, "dtype": "<f2"}
+    else:
+        cell["scalars"] = _wire_array(values.astype(np.float32), buffers)
+    display._emit({"mime": MESH_MIME, "content": json.dumps(cell, allow_nan=False)},
+                  buffers)
+
+
+def mesh_geometry(geometry):
+    """Geometry ``geometry`` again (worker-callable), for a frontend that
+    lost its copy. Returns ``(json, [bytes])`` like ``table_window``."""
+    for geom in _meshes.values():
+        if geom.id == geometry:
+            buffers = []
+            return json.dumps(geom.head(buffers)), buffers
+    raise KeyError(f"mesh_geometry: geometry {geometry!r} expired — re-run the cell")
+
+
+_register_cache(
+    "meshes",
+    lambda: sum(g.nbytes for g in _meshes.values()),
+    lambda: (_meshes.clear(), _mesh_sent.clear()))
+
+sys._shallowflow_scope["display_mesh"] = display_mesh
+
+
+# --- Cached cell -> vertex operators. ---------------------------------------
+# Vertex-coloured views (Plotly Mesh3d, display_mesh) average the cell values
+# onto the vertices. The weights depend only on the mesh, so
+# ``vertex_operator(store)`` builds a ``mesh_ops.VertexAverage`` once per
+# store — over the cells (1-D / 2-D) or the boundary faces (3-D, carrying
+# their parent cell's value) — and each snapshot is one weighted bincount.
+_VERTEX_OP_SLOTS = 8
+_vertex_ops = {}   # (store key, weighted) -> VertexAverage, LRU order
+
+
+def vertex_operator(store=None, weighted=False):
+    """Cached ``values -> vertex values`` map for ``store`` (default: the
+    scope store); call it with a per-cell array. ``weighted`` averages by
+    cell length / area (boundary-face area in 3-D) instead of plainly."""
+    from mesh_ops import VertexAverage
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("vertex_operator: no store — run a simulation first.")
+    key = (_store_key(store), bool(weighted))
+    op = _vertex_ops.pop(key, None)
+    if op is None:
+        t0 = time.perf_counter()
+        geo = store_geometry(store)
+        if int(store.dim) == 3:
+            conn, parents = geo["boundary_faces"], geo["boundary_parents"]
+            measures = geo["boundary_measures"]
+        else:
+            conn, parents, measures = np.asarray(store.cells), None, geo["cell_measures"]
+        op = VertexAverage(conn, store.n_vertices, parents,
+                           measures if weighted else None)
+        _stats.observe("mesh.vertex_op_ms", (time.perf_counter() - t0) * 1000.0)
+    _vertex_ops[key] = op
+    while len(_vertex_ops) > _VERTEX_OP_SLOTS:
+        _vertex_ops.pop(next(iter(_vertex_ops)))
+    return op
+
+
+_register_cache(
+    "vertex-ops",
+    lambda: sum(op.nbytes for op in _vertex_ops.values()),
+    _vertex_ops.clear)
+
+sys._shallowflow_scope["vertex_operator"] = vertex_operator
+
+
+# --- Screen-resolution level of detail. -------------------------------------
+# A 2-D store with more cells than the figure has pixels, or a 1-D store
+# with more cells than screen columns, was still drawn cell by cell. When a
+# store is that large for the target size, viz paths draw a reduction
+# instead: 1-D cells binned into screen columns (mean line inside a min/max
+# band), 2-D cells averaged into a pixel raster at the figure's resolution.
+# The cell -> bin map is built once per store and size; each step is a few
+# bincounts. Every reduction reports how far the cells stray from what is
+# drawn for them. ``full=True`` (cards: ``full_detail = True``) always
+# draws every cell.
+_LOD_FACTOR = 2        # reduce when cells > factor x bins
+_LOD_SLOTS = 8
+_lods = {}             # (store key, size) -> (shape, bounds, ScreenReduction) | None
+
+
+def _lod_reduction(store, size):
+    """``(shape, bounds, ScreenReduction)`` for drawing ``store`` at
+    ``size`` = (width, height) pixels, or None when full detail is cheap
+    enough (or the store is 3-D)."""
+    from mesh_ops import ScreenReduction, screen_bins
+    key = (_store_key(store), tuple(int(s) for s in size))
+    if key in _lods:
+        _lods[key] = _lods.pop(key)
+        return _lods[key]
+    dim, n = int(store.dim), int(store.n_cells)
+    width, height = max(1, key[1][0]), max(1, key[1][1])
+    entry = None
+    if dim in (1, 2):
+        centers = store_geometry(store)["cell_centers"]
+        if dim == 1:
+            shape = (width,)
+        else:
+            # Square pixels: fit the domain's aspect into the target size.
+            verts = np.asarray(store.vertices)[:, :2]
+            span = np.ptp(verts, axis=0)
+            scale = min(width / (span[0] or 1.0), height / (span[1] or 1.0))
+            shape = (max(1, int(span[1] * scale)), max(1, int(span[0] * scale)))
+        if n > _LOD_FACTOR * int(np.prod(shape)):
+            bins, bounds = screen_bins(centers[:, 0] if dim == 1 else centers, shape)
+            entry = (shape, bounds, ScreenReduction(bins, int(np.prod(shape))))
+    _lods[key] = entry
+    while len(_lods) > _LOD_SLOTS:
+        _lods.pop(next(iter(_lods)))
+    return entry
+
+
+def _lod_draw(reduction, values):
+    """The drawable reduction of ``values``: a ``line`` dict (x, mean, min,
+    max of the filled columns) or a ``raster`` dict (image, extent)."""
+    from mesh_ops import fill_holes
+    shape, bounds, red = reduction
+    mean, lo, hi = red.reduce(values)
+    error = red.error(values, mean)
+    _stats.observe("lod.rel_error", error["rel"])
+    if len(shape) == 1:
+        cols = red.filled
+        x = bounds[0] + (cols + 0.5) * (bounds[1] - bounds[0]) / shape[0]
+        return {"kind": "line", "x": x, "mean": mean[cols], "min": lo[cols],
+                "max": hi[cols], "error": error}
+    return {"kind": "raster", "image": fill_holes(mean.reshape(shape)),
+            "extent": list(bounds), "error": error}
+
+
+def lod_view(store=None, field=None, step=0, size=(800, 600), full=False):
+    """Screen-resolution reduction of ``field`` at ``step`` for a plot of
+    ``size`` = (width, height) pixels, or None when the store should be
+    drawn in full (``full``, a small store, or 3-D). See ``_lod_draw`` for
+    the dict; its ``error`` holds ``cells``, ``bins``, ``max_abs``, ``rms``
+    and ``rel`` (max_abs over the field's range at that step). A 2-D store
+    with a built pyramid is served from it (``pyramid_view``)."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("lod_view: no store — run a simulation first.")
+    if full:
+        return None
+    reduction = _lod_reduction(store, size)
+    if reduction is None:
+        return None
+    field = field if field is not None else next(iter(store.field.keys()))
+    _stats.incr("lod.views")
+    view = pyramid_view(store, field, step, size) if int(store.dim) == 2 else None
+    if view is not None:
+        return view
+    return _lod_draw(reduction, np.asarray(store.get_cell(int(step), field), dtype=float))
+
+
+def _lod_note(error):
+    return (f"[lod] {error['cells']} cells drawn as {error['bins']} screen bins; "
+            f"max |err| {error['max_abs']:.3g} ({100 * error['rel']:.1f}% of range), "
+            f"rms {error['rms']:.3g} — set full_detail = True to draw every cell")
+
+
+_register_cache(
+    "lod",
+    lambda: sum(e[2].nbytes for e in _lods.values() if e is not None),
+    _lods.clear)
+
+sys._shallowflow_scope["lod_view"] = lod_view
+
+
+# --- Multi-resolution pyramid (HDF5 sidecar). -------------------------------
+# Even a screen-resolution reduction reads every cell of the step it draws.
+# For a large 2-D result an idle task (queued by ``open_hdf5``) agglomerates
+# the cells into nested coarser levels (``mesh_ops.Pyramid``) and aggregates
+# every field of every snapshot onto each level, with the error of each
+# level against the cells. All of it goes to a sidecar on the results shelf,
+# ``/tmp/zoomy_results/.pyramid/<path hash>.h5``, chunked one snapshot per
+# chunk so a view reads only the level it draws. ``pyramid_view`` picks the
+# coarsest level fine enough for the plot size and zoom; ``lod_view`` serves
+# 2-D stores from it once it is built. ``save_result_local`` carries the
+# sidecar along with the result.
+_PYRAMID_DIR = os.path.join(_RESULTS_DIR, ".pyramid")
+_PYRAMID_VERSION = 1
+_PYRAMID_MIN_CELLS = 100_000
+_PYRAMID_SLOTS = 4
+_pyramids = {}      # store key -> (sidecar path, Pyramid), LRU order
+
+
+def _pyramid_path(source):
+    digest = hashlib.blake2b(os.path.abspath(source).encode(), digest_size=8).hexdigest()
+    return os.path.join(_PYRAMID_DIR, digest + ".h5")
+
+
+def _pyramid_stamp(source):
+    st = os.stat(source)
+    return np.asarray([st.st_size, st.st_mtime])
+
+
+def _pyramid_wanted(store):
+    return (int(store.dim) == 2 and int(store.n_cells) >= _PYRAMID_MIN_CELLS
+            and bool(getattr(store, "source_path", None)))
+
+
+def _load_pyramid(store):
+    """The store's pyramid from its sidecar when that is current, else None."""
+    import h5py
+    from mesh_ops import Pyramid
+    key = _store_key(store)
+    if key in _pyramids:
+        _pyramids[key] = _pyramids.pop(key)
+        return _pyramids[key][1]
+    path = _pyramid_path(store.source_path)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with h5py.File(path, "r") as f:
+            if (f.attrs.get("version") != _PYRAMID_VERSION or not np.array_equal(
+                    f.attrs.get("source"), _pyramid_stamp(store.source_path))):
+                return None
+            pyramid = Pyramid.from_arrays({n: f["mesh"][n][()] for n in f["mesh"]})
+    except (OSError, KeyError) as e:
+        _log(f"[pyramid] unreadable sidecar {path}: {e}")
+        return None
+    _pyramids[key] = (path, pyramid)
+    while len(_pyramids) > _PYRAMID_SLOTS:
+        _pyramids.pop(next(iter(_pyramids)))
+    return pyramid
+
+
+def _pyramid_task(store):
+    """Build the sidecar: the geometry, the levels, then one field of one
+    snapshot per slice. Scheduled with ``owner=store``: closing the store
+    cancels it and the partial sidecar is removed."""
+    import h5py
+    from mesh_ops import Pyramid
+    if _load_pyramid(store) is not None:
+        return
+    source = store.source_path
+    stamp = _pyramid_stamp(source)
+    t0 = time.perf_counter()
+    geo = store_geometry(store)
+    yield
+    pyramid = Pyramid.build(geo["cell_centers"], geo["cell_measures"])
+    yield
+    path = _pyramid_path(source)
+    tmp = path + ".tmp"
+    os.makedirs(_PYRAMID_DIR, exist_ok=True)
+    names = list(store.field.keys())
+    n_steps, done = int(store.n_snapshots), False
+    f = h5py.File(tmp, "w")
+    try:
+        f.attrs["version"] = _PYRAMID_VERSION
+        f.attrs["source"] = stamp
+        f.attrs["n_cells"] = int(store.n_cells)
+        for name, values in pyramid.arrays().items():
+            f.create_dataset(f"mesh/{name}", data=values)
+        for l, weight in enumerate(pyramid.weights):
+            for name in names:
+                f.create_dataset(f"level{l}/{name}", (n_steps, len(weight)),
+                                 dtype="f4", chunks=(1, len(weight)))
+        for name in names:
+            # Per step and level: max |cell - level value|, rms, max / range.
+            f.create_dataset(f"error/{name}", (n_steps, pyramid.n_levels, 3), dtype="f4")
+        for step in range(n_steps):
+            for name in names:
+                v = np.asarray(store.get_cell(step, name), dtype=float)
+                span = float(np.nanmax(v) - np.nanmin(v))
+                err = np.zeros((pyramid.n_levels, 3))
+                cell_map = None
+                for l, level in enumerate(pyramid.reduce(v)):
+                    f[f"level{l}/{name}"][step] = level
+                    parent = pyramid.parents[l]
+                    cell_map = parent if cell_map is None else parent[cell_map]
+                    dev = np.abs(v - level[cell_map])
+                    err[l] = (np.nanmax(dev), np.sqrt(np.nanmean(dev ** 2)),
+                              np.nanmax(dev) / span if span else 0.0)
+                f[f"error/{name}"][step] = err
+                yield
+        done = True
+    finally:
+        f.close()
+        if not done:
+            os.remove(tmp)
+    os.replace(tmp, path)
+    _sidecar_writes[0] += 1
+    _stats.observe("pyramid.build_ms", (time.perf_counter() - t0) * 1000.0)
+    _log(f"[pyramid] {store.n_cells} cells -> levels "
+         f"{[len(b) for b in pyramid.bins]} x {n_steps} snapshots in {path}")
+
+
+def _schedule_pyramid(store):
+    if _pyramid_wanted(store):
+        schedule(_pyramid_task, store, priority=30, owner=store,
+                 name=f"pyramid:{os.path.basename(store.source_path)}")
+
+
+def _copy_pyramid(source, dest):
+    """Carry ``source``'s current pyramid sidecar over to ``dest`` (a copy
+    of the same result file)."""
+    import h5py
+    import shutil
+    path = _pyramid_path(source)
+    if os.path.abspath(source) == os.path.abspath(dest) or not os.path.isfile(path):
+        return
+    try:
+        with h5py.File(path, "r") as f:
+            current = np.array_equal(f.attrs.get("source"), _pyramid_stamp(source))
+        if not current:
+            return
+        copy = _pyramid_path(dest)
+        shutil.copyfile(path, copy + ".tmp")
+        with h5py.File(copy + ".tmp", "r+") as f:
+            f.attrs["source"] = _pyramid_stamp(dest)
+        os.replace(copy + ".tmp", copy)
+        _sidecar_writes[0] += 1
+    except (ImportError, OSError) as e:
+        _log(f"[pyramid] sidecar not copied with the result: {e}")
+
+
+def pyramid_view(store=None, field=None, step=0, size=(800, 600), zoom=1.0, level=None):
+    """A raster of ``field`` at ``step`` from the store's pyramid sidecar, or
+    None when it has none (yet) or no level is fine enough.
+
+    The level is the coarsest one with at least the plot's ``size`` =
+    (width, height) pixels across the domain times ``zoom`` (how many times
+    the view is magnified); ``level`` picks one directly (-1: the coarsest,
+    e.g. for thumbnails). Same dict as ``lod_view``'s 2-D raster, plus
+    ``level``; only that level's values are read from disk."""
+    import h5py
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("pyramid_view: no store — run a simulation first.")
+    field = field if field is not None else next(iter(store.field.keys()))
+    if not _pyramid_wanted(store) or not isinstance(field, str):
+        return None
+    pyramid = _load_pyramid(store)
+    if pyramid is None:
+        return None
+    if level is None:
+        ny, nx = pyramid.shapes[0]
+        scale = min(size[0] / nx, size[1] / ny) * zoom
+        level = pyramid.level_for((int(ny * scale), int(nx * scale)))
+        if level is None:
+            return None
+    level = range(pyramid.n_levels)[level]
+    from mesh_ops import fill_holes
+    with h5py.File(_pyramids[_store_key(store)][0], "r") as f:
+        values = f[f"level{level}/{field}"][int(step)]
+        max_abs, rms, rel = (float(e) for e in f[f"error/{field}"][int(step), level])
+    _stats.incr("pyramid.views")
+    _stats.incr("pyramid.bytes_read", values.nbytes)
+    return {"kind": "raster", "level": level,
+            "image": fill_holes(pyramid.image(level, values)),
+            "extent": list(pyramid.extent(level)),
+            "error": {"cells": int(store.n_cells), "bins": len(values),
+                      "max_abs": max_abs, "rms": rms, "rel": rel}}
+
+
+_register_cache(
+    "pyramids",
+    lambda: sum(p.nbytes for _, p in _pyramids.values()),
+    _pyramids.clear)
+
+sys._shallowflow_scope["pyramid_view"] = pyramid_view
+
+
+# --- Tiled field rasters. ---------------------------------------------------
+# Zooming into a region of a large 2-D run re-rendered the whole domain
+# through matplotlib. ``field_tile(store, field, step, z, x, y)`` rasterises
+# one 256 x 256 tile instead: at zoom ``z`` the domain's bounding square is
+# split into 2^z x 2^z tiles, x to the right and y upward from its lower-left
+# corner, row 0 of a tile at its bottom. Each tile is scan-converted from the
+# store's cached triangulation (``mesh_ops.TriangleRaster``, no matplotlib).
+# Tiles are kept in an LRU keyed by (store, field, step, z, x, y), and each
+# tile's pixel -> cell plan in a second one, so a pan or zoom renders only
+# the tiles it has not seen and a new step over seen tiles is one gather per
+# tile. Worker cmd ``field_tile`` (``render_tile``) serves them to the GUI.
+_TILE = 256
+_TILE_SLOTS = 128           # float32 tiles, 256 KiB each
+_TILE_PLAN_SLOTS = 64
+_TILE_FRAME_SLOTS = 4
+_tiles = {}                 # (store key, field, step, z, x, y) -> tile, LRU order
+_tile_plans = {}            # (store key, z, x, y) -> TriangleRaster, LRU order
+_tile_frames = {}           # store key -> frame dict (with triangle boxes)
+_tile_field = [None, None]  # last (store key, field, step) read, its values
+
+
+def _lru_put(cache, key, value, slots):
+    cache[key] = value
+    while len(cache) > slots:
+        cache.pop(next(iter(cache)))
+    return value
+
+
+def _tile_frame(store):
+    key = _store_key(store)
+    frame = _tile_frames.pop(key, None)
+    if frame is None:
+        if int(store.dim) != 2:
+            raise ValueError(f"field_tile: tiles need a 2-D store, got dim={store.dim}")
+        geo = store_geometry(store)
+        verts = np.asarray(store.vertices, dtype=float)[:, :2]
+        corners = verts[geo["triangles"]]                     # (m, 3, 2)
+        lo, span = verts.min(axis=0), float(np.ptp(verts, axis=0).max()) or 1.0
+        # Deepest useful zoom: a typical cell about 8 pixels across.
+        h = float(np.sqrt(np.median(geo["cell_measures"]))) or span
+        frame = {"origin": [float(lo[0]), float(lo[1])], "size": span, "tile": _TILE,
+                 "max_zoom": max(0, int(np.ceil(np.log2(8 * span / (_TILE * h))))),
+                 "lo": corners.min(axis=1).astype(np.float32),
+                 "hi": corners.max(axis=1).astype(np.float32)}
+    return _lru_put(_tile_frames, key, frame, _TILE_FRAME_SLOTS)
+
+
+def _tile_bounds(frame, z, x, y):
+    n = 1 << z
+    if not (0 <= x < n and 0 <= y < n):
+        raise ValueError(f"field_tile: tile ({x}, {y}) outside zoom {z} (0..{n - 1})")
+    h = frame["size"] / n
+    x0, y0 = frame["origin"][0] + x * h, frame["origin"][1] + y * h
+    return (x0, x0 + h, y0, y0 + h)
+
+
+def tile_frame(store=None):
+    """The tiling of ``store`` (default: the scope store): ``origin`` and
+    ``size`` of the domain's bounding square, ``tile`` pixels a side and
+    ``max_zoom`` (about 8 pixels across a typical cell)."""
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("tile_frame: no store — run a simulation first.")
+    return {k: v for k, v in _tile_frame(store).items() if k not in ("lo", "hi")}
+
+
+def field_tile(store=None, field=None, step=0, z=0, x=0, y=0):
+    """Tile (``x``, ``y``) at zoom ``z`` of ``field`` at ``step``: a read-only
+    (256, 256) float32 image, NaN outside the mesh (see ``tile_frame``)."""
+    from mesh_ops import TriangleRaster
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("field_tile: no store — run a simulation first.")
+    field = field if field is not None else next(iter(store.field.keys()))
+    z, x, y, step = int(z), int(x), int(y), int(step)
+    skey = _store_key(store)
+    key = (skey, field, step, z, x, y)
+    tile = _tiles.pop(key, None)
+    if tile is not None:
+        _stats.incr("tiles.hits")
+        return _lru_put(_tiles, key, tile, _TILE_SLOTS)
+    t0 = time.perf_counter()
+    frame = _tile_frame(store)
+    bounds = _tile_bounds(frame, z, x, y)
+    plan = _tile_plans.pop((skey, z, x, y), None)
+    if plan is None:
+        lo, hi = frame["lo"], frame["hi"]
+        sel = np.flatnonzero((hi[:, 0] >= bounds[0]) & (lo[:, 0] <= bounds[1])
+                             & (hi[:, 1] >= bounds[2]) & (lo[:, 1] <= bounds[3]))
+        geo = store_geometry(store)
+        plan = TriangleRaster(store.vertices, geo["triangles"][sel], (_TILE, _TILE),
+                              bounds, parents=geo["triangle_cells"][sel])
+        _stats.incr("tiles.plans")
+    _lru_put(_tile_plans, (skey, z, x, y), plan, _TILE_PLAN_SLOTS)
+    if _tile_field[0] != (skey, field, step):
+        _tile_field[:] = [(skey, field, step),
+                          np.asarray(store.get_cell(step, field), dtype=float)]
+    tile = plan(_tile_field[1]).astype(np.float32)
+    tile.setflags(write=False)
+    _stats.incr("tiles.rendered")
+    _stats.observe("tiles.render_ms", (time.perf_counter() - t0) * 1000.0)
+    return _lru_put(_tiles, key, tile, _TILE_SLOTS)
+
+
+def render_tile(field, step, z, x, y):
+    """``field_tile`` of the scope store for the worker: ``(json, [bytes])``
+    with the tile's ``z``, ``x``, ``y``, ``step``, ``field``, ``extent``
+    (x0, x1, y0, y1), ``shape``, value ``min`` / ``max`` (null when the tile
+    misses the mesh) and wire-encoded ``data``."""
+    store = sys._shallowflow_scope.get("store")
+    tile = field_tile(store, field or None, step, z, x, y)
+    finite = tile[np.isfinite(tile)]
+    buffers = []
+    head = {"z": int(z), "x": int(x), "y": int(y), "step": int(step),
+            "field": field or next(iter(store.field.keys())),
+            "extent": list(_tile_bounds(_tile_frame(store), int(z), int(x), int(y))),
+            "shape": list(tile.shape),
+            "min": float(finite.min()) if len(finite) else None,
+            "max": float(finite.max()) if len(finite) else None,
+            "data": _wire_array(tile, buffers)}
+    return json.dumps(head), buffers
+
+
+def _clear_tiles():
+    _tiles.clear()
+    _tile_plans.clear()
+    _tile_frames.clear()
+    _tile_field[:] = [None, None]
+
+
+_register_cache(
+    "tiles",
+    lambda: (sum(t.nbytes for t in _tiles.values())
+             + sum(p.nbytes for p in _tile_plans.values())
+             + sum(f["lo"].nbytes + f["hi"].nbytes for f in _tile_frames.values())
+             + (_tile_field[1].nbytes if _tile_field[1] is not None else 0)),
+    _clear_tiles)
+
+sys._shallowflow_scope["field_tile"] = field_tile
+sys._shallowflow_scope["tile_frame"] = tile_frame
+
+
+# --- Fast preview rasters (no matplotlib). ----------------------------------
+# The cheapest matplotlib field card still builds a figure, its artists and
+# an SVG for every step. ``preview_png(store, field, step)`` draws a 2-D
+# field with NumPy and zlib alone: a per-store, per-size pixel -> cell plan
+# (a nearest resample of the cell image for a structured grid, otherwise
+# ``mesh_ops.TriangleRaster`` over the cached triangulation) turns the
+# field into pixels with one gather, a colour table maps them and
+# ``mesh_ops.encode_png`` writes the image, with a labelled colour bar strip
+# beside it. Tens of milliseconds a frame at 1e5 cells, once the plan is
+# built; the "Fast Preview" card uses it.
+_PREVIEW_SLOTS = 4
+_previews = {}              # (store key, size) -> _PreviewPlan, LRU order
+
+
+class _PreviewPlan:
+    """Pixel -> cell map of one store at one size; ``image(values)`` is the
+    float image (row 0 at the bottom, NaN off the mesh)."""
+
+    def __init__(self, store, size):
+        from mesh_ops import TriangleRaster
+        width, height = size
+        grid = grid_index(store)
+        if grid is not None:
+            extent = grid["extent"]
+        else:
+            verts = np.asarray(store.vertices, dtype=float)[:, :2]
+            lo, hi = verts.min(axis=0), verts.max(axis=0)
+            extent = (float(lo[0]), float(hi[0]), float(lo[1]), float(hi[1]))
+        # Square pixels: fit the domain's aspect into the target size.
+        span = (extent[1] - extent[0], extent[3] - extent[2])
+        scale = min(width / (span[0] or 1.0), height / (span[1] or 1.0))
+        self.shape = (max(1, int(span[1] * scale)), max(1, int(span[0] * scale)))
+        self.extent = extent
+        self.raster = None
+        if grid is not None:
+            (ny, nx), (h, w) = grid["shape"], self.shape
+            rows = np.minimum((np.arange(h) + 0.5) * ny / h, ny - 1).astype(np.intp)
+            cols = np.minimum((np.arange(w) + 0.5) * nx / w, nx - 1).astype(np.intp)
+            self.source = grid["order"].reshape(ny, nx)[rows[:, None], cols[None, :]]
+        else:
+            geo = store_geometry(store)
+            self.raster = TriangleRaster(verts, geo["triangles"], self.shape, extent,
+                                         parents=geo["triangle_cells"])
+
+    def image(self, values):
+        if self.raster is not None:
+            return self.raster(values)
+        return values[self.source]
+
+    @property
+    def nbytes(self):
+        return self.raster.nbytes if self.raster is not None else self.source.nbytes
+
+
+def _preview_plan(store, size):
+    key = (_store_key(store), (int(size[0]), int(size[1])))
+    plan = _previews.pop(key, None)
+    if plan is None:
+        if int(store.dim) != 2:
+            raise ValueError(f"preview_png: previews need a 2-D store, got dim={store.dim}")
+        t0 = time.perf_counter()
+        plan = _PreviewPlan(store, key[1])
+        _stats.observe("preview.plan_ms", (time.perf_counter() - t0) * 1000.0)
+    return _lru_put(_previews, key, plan, _PREVIEW_SLOTS)
+
+
+def preview_png(store=None, field=None, step=0, size=(640, 480), cmap="viridis",
+                vlim=None, colorbar=True, show=True):
+    """PNG bytes of ``field`` at ``step`` of a 2-D ``store`` (default: the
+    scope store), fitted into ``size`` = (width, height) pixels with square
+    pixels and transparent off the mesh. ``cmap`` is a name for
+    ``mesh_ops.colormap_lut``; ``vlim`` pins the colour range (default: the
+    step's); ``colorbar`` adds a labelled bar on the right. ``show`` also
+    emits the image as an ``image/png`` cell."""
+    from mesh_ops import colorbar_strip, colorize, colormap_lut, encode_png
+    store = store if store is not None else sys._shallowflow_scope.get("store")
+    if store is None:
+        raise RuntimeError("preview_png: no store — run a simulation first.")
+    field = field if field is not None else next(iter(store.field.keys()))
+    t0 = time.perf_counter()
+    plan = _preview_plan(store, size)
+    image = plan.image(np.asarray(store.get_cell(int(step), field), dtype=float))
+    finite = image[np.isfinite(image)]
+    if vlim is None:
+        vlim = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 1.0)
+    lut = colormap_lut(cmap)
+    pixels = colorize(image, lut, vlim)[::-1]
+    if colorbar:
+        strip = colorbar_strip(lut, pixels.shape[0], vlim)
+        gap = np.zeros((pixels.shape[0], 8, 4), dtype=np.uint8)
+        pixels = np.hstack([pixels, gap, strip])
+    png = encode_png(pixels)
+    _stats.incr("preview.frames")
+    _stats.observe("preview.ms", (time.perf_counter() - t0) * 1000.0)
+    if show:
+        display._emit({"mime": "image/png", "content": base64.b64encode(png).decode()})
+    return png
+
+
+_register_cache(
+    "preview",
+    lambda: sum(p.nbytes for p in _previews.values()),
+    _previews.clear)
+
+sys._shallowflow_scope["preview_png"] = preview_png
+
+
+# --- Cached symbolic profile lifts. -----------------------------------------
+# The profile card lifted the moment state to u(zeta) by sympifying every
+# ``interpolate_to_3d`` row and lambdifying one on each refresh, then called
+# the function once per station. ``profile_lift(model)`` keys the lambdified
+# row by a hash of the symbolic rows, state, aux, parameter and position
+# symbols: it is built once per model and kept in memory only — code read
+# back from the (IndexedDB-synced) results shelf is never executed.
+# Parameter values are bound per call, so changing them never rebuilds. The
+# returned lift takes the state at any number of stations and a zeta grid
+# and evaluates them in one broadcast call.
+_LIFT_SLOTS = 16
+_lifts = {}                 # hash -> lambdified function, LRU order
+
+
+class _ProfileLift:
+    """One ``interpolate_to_3d`` row of a model with its parameter values
+    bound; ``lift(Q, zeta, x, y)`` -> (stations, len(zeta)) array."""
+
+    def __init__(self, fn, n_state, n_aux, params):
+        self.fn, self.n_state, self.n_aux, self.params = fn, n_state, n_aux, params
+
+    def __call__(self, Q, zeta, x=0.0, y=0.0, aux=None):
+        """``Q`` (n_state, stations) and ``aux`` (n_aux, stations; default
+        zeros) are the cell states at the stations, ``x`` / ``y`` their
+        positions (scalars or per station)."""
+        Q = np.asarray(Q, dtype=float).reshape(self.n_state, -1)[:, :, None]
+        n = Q.shape[1]
+        aux = (np.zeros((self.n_aux, n, 1)) if aux is None
+               else np.asarray(aux, dtype=float).reshape(self.n_aux, n, 1))
+        x = np.broadcast_to(np.asarray(x, dtype=float).reshape(-1, 1), (n, 1))
+        y = np.broadcast_to(np.asarray(y, dtype=float).reshape(-1, 1), (n, 1))
+        zeta = np.asarray(zeta, dtype=float).reshape(1, -1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = self.fn(*Q, *aux, *self.params, x, y, zeta)
+        return np.array(np.broadcast_to(np.asarray(u, dtype=float), (n, zeta.shape[1])))
+
+
+def _lift_symbols(model):
+    import sympy as sp
+    state = list(model.state)
+    aux = list(getattr(model, "aux_state", None) or [])
+    params = list(model.parameters.values()) if model.parameters is not None else []
+    pos = (list(model.position.values()) if getattr(model, "position", None) is not None
+           else list(sp.symbols("x y z", real=True)))
+    return state, aux, params, pos[:3]
+
+
+def _lift_hash(rows, symbols, row):
+    import sympy as sp
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{row}:".encode())
+    for e in list(rows) + [s for group in symbols for s in group]:
+        h.update((sp.srepr(e) if isinstance(e, sp.Basic) else str(e)).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def profile_lift(model=None, row=2):
+    """The model's (default: the scope ``model``) ``interpolate_to_3d`` row
+    ``row`` (2 is ``u`` of [b, h, u, v, w, p]) as a ``_ProfileLift`` over
+    (*Q, *Qaux, *params, x, y, zeta), parameters bound to the model's
+    ``parameter_values``; None when the model defines no such rows. Same
+    lift as zoomy_prepost.steps.lift3d."""
+    import sympy as sp
+    model = model if model is not None else sys._shallowflow_scope.get("model")
+    rows = getattr(model, "interpolate_to_3d", None)
+    if rows is None:
+        return None
+    rows = list(np.asarray(rows, dtype=object).ravel())
+    symbols = _lift_symbols(model)
+    key = _lift_hash(rows, symbols, row)
+    fn = _lifts.pop(key, None)
+    if fn is None:
+        t0 = time.perf_counter()
+        fn = sp.lambdify([s for group in symbols for s in group], sp.sympify(rows[row]),
+                         "numpy", dummify=True, cse=True)
+        _stats.observe("lift.build_ms", (time.perf_counter() - t0) * 1000.0)
+    else:
+        _stats.incr("lift.hits")
+    _lru_put(_lifts, key, fn, _LIFT_SLOTS)
+    pv = getattr(model, "parameter_values", None)
+    params = ([float(v) for v in pv.values()] if pv is not None
+              else [0.0] * len(symbols[2]))
+    return _ProfileLift(fn, len(symbols[0]), len(symbols[1]), params)
+
+
+_register_cache(
+    "lifts",
+    lambda: sum(sys.getsizeof(f.__code__.co_code) for f in _lifts.values()),
+    _lifts.clear)
+
+sys._shallowflow_scope["profile_lift"] = profile_lift
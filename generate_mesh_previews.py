@@ -29,6 +29,8 @@ import matplotlib.pyplot as plt
 from matplotlib.collections import PolyCollection
 import numpy as np
 
+from mesh_ops import boundary_faces_blocks
+
 PREVIEW_DIR = os.path.join(os.path.dirname(__file__), "previews")
 GENERATED_JSON = os.path.join(os.path.dirname(__file__), "cards", "meshes", "generated.json")
 
@@ -39,14 +41,6 @@ os.makedirs(os.path.dirname(GENERATED_JSON), exist_ok=True)
 _3D_CELL_TYPES = {"tetra", "hexahedron", "wedge", "pyramid"}
 _2D_CELL_TYPES = {"triangle", "quad"}
 
-# Face definitions for extracting boundary surfaces from 3D cells
-_FACE_DEFS = {
-    "tetra": [[0,1,2], [0,1,3], [0,2,3], [1,2,3]],
-    "hexahedron": [[0,1,2,3], [4,5,6,7], [0,1,5,4], [2,3,7,6], [0,3,7,4], [1,2,6,5]],
-    "wedge": [[0,1,2], [3,4,5], [0,1,4,3], [1,2,5,4], [0,2,5,3]],
-    "pyramid": [[0,1,2,3], [0,1,4], [1,2,4], [2,3,4], [3,0,4]],
-}
-
 
 def _is_3d_mesh(mesh):
     """Check if mesh has 3D cells."""
@@ -57,30 +51,12 @@ def _is_3d_mesh(mesh):
 
 
 def _extract_surface_faces(mesh):
-    """Extract boundary faces from 3D cells (faces that appear only once)."""
-    from collections import Counter
-    face_count = Counter()
-    face_map = {}
-
-    for cell_block in mesh.cells:
-        face_defs = _FACE_DEFS.get(cell_block.type)
-        if not face_defs:
-            # 2D cells are surface faces themselves
-            if cell_block.type in _2D_CELL_TYPES:
-                for cell in cell_block.data:
-                    key = tuple(sorted(cell))
-                    face_count[key] += 1
-                    face_map[key] = cell
-            continue
-        for cell in cell_block.data:
-            for fi in face_defs:
-                face_nodes = cell[fi]
-                key = tuple(sorted(face_nodes))
-                face_count[key] += 1
-                face_map[key] = face_nodes
-
-    # Boundary faces appear exactly once
-    return [face_map[k] for k, cnt in face_count.items() if cnt == 1]
+    """Extract boundary faces from 3D cells (faces that appear only once).
+    2D cell blocks count as faces themselves."""
+    faces, _ = boundary_faces_blocks(
+        [(b.type, b.data) for b in mesh.cells
+         if b.type in _3D_CELL_TYPES or b.type in _2D_CELL_TYPES])
+    return [f[f >= 0] for f in faces]
 
 
 def plot_mesh_3d(mesh_path, output_path):
@@ -0,0 +1,810 @@
+"""Vectorized mesh primitives shared by the viz cards, the engine and the
+offline preview tools.
+
+Pure NumPy, no zoomy imports: the worker serves this file to the kernel as
+the in-memory module ``mesh_ops`` (engine ``register_module``), and the
+authoring scripts next to it import it from disk. Connectivity is the
+canonical ``(n_cells, k)`` integer array; rows of cells with fewer than
+``k`` nodes are padded with ``-1``.
+
+Run ``python mesh_ops.py`` for a benchmark against the per-cell Python
+loops these replace.
+"""
+import numpy as np
+
+
+def cell_sizes(cells, pad=-1):
+    """Node count of every row of ``cells`` (entries equal to ``pad`` are
+    padding and must trail the real nodes)."""
+    cells = np.asarray(cells)
+    if cells.ndim != 2:
+        raise ValueError(f"cells must be 2-D (n_cells, k), got shape {cells.shape}")
+    return (cells != pad).sum(axis=1)
+
+
+def _as_padded(cells, pad):
+    """A ragged list of rows (mixed triangles / quads) as one padded array."""
+    if isinstance(cells, np.ndarray):
+        return cells
+    rows = [np.asarray(r) for r in cells]
+    width = max((len(r) for r in rows), default=0)
+    out = np.full((len(rows), width), pad, dtype=np.int64)
+    for n, r in enumerate(rows):
+        out[n, :len(r)] = r
+    return out
+
+
+def fan_triangulate(cells, pad=-1):
+    """Fan-triangulate polygons: a cell ``(v0, v1, ..., vs)`` becomes
+    ``(v0, v1, v2), (v0, v2, v3), ...``.
+
+    ``cells`` is ``(n_cells, k)`` — padded with ``pad`` for mixed meshes —
+    or a ragged list of rows. Cells are grouped by node count and each group
+    is fanned with one fancy-indexing step. Returns ``(triangles, parents)``:
+    ``(m, 3)`` int32 vertex indices and the int32 cell id of each triangle,
+    in cell order. Cells with fewer than three nodes produce none."""
+    cells = _as_padded(cells, pad)
+    if cells.ndim != 2 or cells.shape[1] < 3:
+        return np.zeros((0, 3), dtype=np.int32), np.zeros(0, dtype=np.int32)
+    sizes = cell_sizes(cells, pad)
+    per_cell = np.maximum(sizes - 2, 0)
+    start = np.concatenate([[0], np.cumsum(per_cell)[:-1]])
+    tris = np.empty((int(per_cell.sum()), 3), dtype=np.int32)
+    parents = np.repeat(np.arange(len(cells), dtype=np.int32), per_cell)
+    for s in np.unique(sizes[sizes >= 3]):
+        mask = sizes == s
+        fan = np.stack([np.zeros(s - 2, dtype=np.intp),
+                        np.arange(1, s - 1), np.arange(2, s)], axis=1)
+        if mask.all():
+            tris[:] = cells[:, fan].reshape(-1, 3)
+        else:
+            # Each cell's triangles land at its slot in cell order.
+            slots = start[mask][:, None] + np.arange(s - 2)
+            tris[slots.ravel()] = cells[mask][:, fan].reshape(-1, 3)
+    return tris, parents
+
+
+# Vertex indices of each face of each 3-D cell type (gmsh / meshio node
+# order; outward winding kept as listed).
+FACE_DEFS = {
+    "tetra": [[0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3]],
+    "hexahedron": [[0, 1, 2, 3], [4, 5, 6, 7], [0, 1, 5, 4],
+                   [2, 3, 7, 6], [0, 3, 7, 4], [1, 2, 6, 5]],
+    "wedge": [[0, 1, 2], [3, 4, 5], [0, 1, 4, 3], [1, 2, 5, 4], [0, 2, 5, 3]],
+    "pyramid": [[0, 1, 2, 3], [0, 1, 4], [1, 2, 4], [2, 3, 4], [3, 0, 4]],
+}
+# Polygon cells are surface faces themselves.
+_SURFACE_TYPES = {"triangle", "quad", "polygon"}
+
+
+def _face_defs(cell_type, cells):
+    if cell_type in _SURFACE_TYPES:
+        return [list(range(cells.shape[1]))]
+    if cell_type in FACE_DEFS:
+        return FACE_DEFS[cell_type]
+    raise ValueError(f"no face template for cell type {cell_type!r}; "
+                     f"known types: {sorted(FACE_DEFS) + sorted(_SURFACE_TYPES)}")
+
+
+def _cell_faces(cells, defs, width, pad):
+    """Every face of every cell of one block, ``(n_cells * n_defs, width)``
+    padded with ``pad``, and the local cell id of each face."""
+    faces = np.full((len(cells), len(defs), width), pad, dtype=np.int64)
+    for f, d in enumerate(defs):
+        faces[:, f, :len(d)] = cells[:, d]
+    return faces.reshape(-1, width), np.repeat(np.arange(len(cells)), len(defs))
+
+
+def boundary_faces_blocks(blocks, pad=-1):
+    """Boundary faces of a mesh given as ``[(cell_type, cells), ...]`` blocks
+    (meshio style): the faces owned by exactly one cell.
+
+    All faces are stacked, their node ids sorted row-wise into a key, and
+    one ``np.lexsort`` groups equal keys to find those seen once — no
+    per-face Python objects. Returns ``(faces, parents)``: ``(m, w)`` int32
+    node ids in the cell's own winding (``-1`` padded when triangles and
+    quads mix) and the int32 parent cell id of each face, counted across
+    the blocks in order. Faces come out in cell order."""
+    blocks = [(np.asarray(c), _face_defs(t, np.asarray(c)))
+              for t, c in blocks if len(c)]
+    if not blocks:
+        return np.zeros((0, 3), dtype=np.int32), np.zeros(0, dtype=np.int32)
+    width = max(len(d) for _, defs in blocks for d in defs)
+    faces, parents, offset = [], [], 0
+    for c, defs in blocks:
+        f, p = _cell_faces(c, defs, width, pad)
+        faces.append(f)
+        parents.append(p + offset)
+        offset += len(c)
+    faces = np.concatenate(faces)
+    parents = np.concatenate(parents)
+    # Group equal keys with one lexsort (several times faster than
+    # np.unique(axis=0) on the same rows) and keep the runs of length one.
+    keys = np.sort(faces, axis=1)
+    order = np.lexsort(keys.T[::-1])
+    keys = keys[order]
+    start = np.ones(len(keys), dtype=bool)
+    start[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    runs = np.flatnonzero(start)
+    counts = np.diff(np.append(runs, len(keys)))
+    once = np.sort(order[runs[counts == 1]])
+    faces = faces[once]
+    if (faces[:, -1] == pad).all() and width > 3:
+        faces = faces[:, :-1]          # no quads survived: plain triangles
+    return faces.astype(np.int32), parents[once].astype(np.int32)
+
+
+def boundary_faces(cells, cell_type, pad=-1):
+    """Boundary faces of a single-type cell array; see
+    ``boundary_faces_blocks``."""
+    return boundary_faces_blocks([(cell_type, cells)], pad)
+
+
+def cell_centers(vertices, cells, pad=-1):
+    """Vertex mean of every cell, ``(n_cells, dim)`` float64 (padding
+    ignored)."""
+    v = np.asarray(vertices, dtype=float)
+    cells = _as_padded(cells, pad)
+    keep = cells != pad
+    if keep.all():
+        return v[cells].mean(axis=1)
+    total = np.where(keep[..., None], v[np.where(keep, cells, 0)], 0.0).sum(axis=1)
+    return total / keep.sum(axis=1)[:, None]
+
+
+def cell_measures(vertices, cells, cell_type=None, pad=-1):
+    """Length of every 2-node (line) cell, area of every polygon cell (2-D,
+    or faces in 3-D) or volume of every 3-D cell (``cell_type`` in
+    ``FACE_DEFS``), as float64.
+
+    Exact for convex cells: each is split into triangles (tetrahedra) from
+    its centroid to every edge (fan-triangulated face), so no consistent
+    winding is needed."""
+    v = np.asarray(vertices, dtype=float)
+    cells = _as_padded(cells, pad)
+    if cells.shape[1] == 2:
+        return np.linalg.norm(v[cells[:, 1]] - v[cells[:, 0]], axis=-1)
+    keep = cells != pad
+    centre = cell_centers(v, cells, pad)
+    if cell_type in FACE_DEFS:
+        faces, owner = _cell_faces(cells, FACE_DEFS[cell_type],
+                                   max(len(d) for d in FACE_DEFS[cell_type]), pad)
+        tris, parent = fan_triangulate(faces, pad)
+        a, b, c = (v[tris[:, i]] - centre[owner[parent]] for i in range(3))
+        part = np.abs(np.einsum("ij,ij->i", a, np.cross(b, c))) / 6.0
+        return np.bincount(owner[parent], weights=part, minlength=len(cells))
+    # Polygons: triangle (centre, v_i, v_i+1) per edge.
+    nxt = np.roll(cells, -1, axis=1)
+    last = keep.sum(axis=1) - 1
+    nxt[np.arange(len(cells)), last] = cells[:, 0]
+    a = v[np.where(keep, cells, 0)] - centre[:, None]
+    b = v[np.where(keep, nxt, 0)] - centre[:, None]
+    if v.shape[1] == 2:
+        part = np.abs(a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]) / 2.0
+    else:
+        part = np.linalg.norm(np.cross(a, b), axis=-1) / 2.0
+    return np.where(keep, part, 0.0).sum(axis=1)
+
+
+class VertexAverage:
+    """Cell -> vertex averaging, built once per mesh and applied per
+    snapshot as one weighted ``np.bincount``.
+
+    Each vertex gets the mean of the values of the rows of ``conn`` that
+    touch it — optionally weighted by ``weights`` per row (cell areas /
+    volumes from ``cell_measures``). ``parents`` maps rows to the cells
+    whose values they carry (boundary faces -> their 3-D cell), so the
+    operator takes the store's per-cell array directly. Vertices on no row
+    get 0."""
+
+    def __init__(self, conn, n_vertices, parents=None, weights=None, pad=-1):
+        conn = _as_padded(conn, pad)
+        rows = np.repeat(np.arange(len(conn)), conn.shape[1])
+        flat = conn.ravel()
+        keep = flat != pad
+        self.n_vertices = int(n_vertices)
+        self.index = flat[keep].astype(np.intp)
+        src = rows[keep]
+        self.source = src if parents is None else np.asarray(parents, dtype=np.intp)[src]
+        w = np.ones(len(conn)) if weights is None else np.asarray(weights, dtype=float)
+        self.weight = w[src]
+        total = np.bincount(self.index, weights=self.weight, minlength=self.n_vertices)
+        total[total == 0] = 1.0
+        self.weight = self.weight / total[self.index]
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.source.nbytes + self.weight.nbytes
+
+    def __call__(self, values):
+        """Vertex values of per-cell ``values`` (``(n_cells,)`` or
+        ``(n_cells, q)``)."""
+        values = np.asarray(values, dtype=float)
+        if values.ndim > 1:
+            return np.stack([self(values[:, j]) for j in range(values.shape[1])], axis=1)
+        return np.bincount(self.index, weights=values[self.source] * self.weight,
+                           minlength=self.n_vertices)
+
+
+# --- Structured grids. ------------------------------------------------------
+
+def _lattice(coords, tol):
+    """Sorted distinct values of ``coords``, merging those within ``tol``."""
+    u = np.unique(coords)
+    if len(u) < 2:
+        return u
+    return u[np.concatenate([[True], np.diff(u) > tol])]
+
+
+def structured_grid(centers, measures=None, rtol=1e-6):
+    """Recognise 2-D cells forming a uniform rectangular grid — the quads
+    of ``BaseMesh.create_2d`` — from their centres alone, whatever order the
+    cells come in. Returns None, or a dict with ``shape`` (ny, nx),
+    ``order`` (ny * nx cell indices, grid position -> cell, row 0 at the
+    bottom), ``ij`` (n, 2) each cell's (i, j) = (column, row), ``spacing``
+    (dx, dy) and ``extent`` (x0, x1, y0, y1) of the cell edges.
+    ``values[order].reshape(shape)`` is then the field as an image.
+    ``measures`` (cell areas), when given, must all be dx * dy."""
+    c = np.asarray(centers, dtype=float)
+    c = c.reshape(len(c), -1)[:, :2]
+    n = len(c)
+    if n < 4 or c.shape[1] < 2:
+        return None
+    span = np.ptp(c, axis=0)
+    tol = rtol * float(span.max() or 1.0)
+    xs, ys = _lattice(c[:, 0], tol), _lattice(c[:, 1], tol)
+    nx, ny = len(xs), len(ys)
+    if nx * ny != n:
+        return None
+    area = None if measures is None else np.asarray(measures, dtype=float)
+    if nx > 1 and ny > 1:
+        dx, dy = span[0] / (nx - 1), span[1] / (ny - 1)
+    elif area is not None:
+        d = span.max() / (max(nx, ny) - 1)
+        other = float(np.median(area)) / d
+        dx, dy = (d, other) if nx > 1 else (other, d)
+    else:
+        return None
+    ij = np.rint((c - c.min(axis=0)) / (dx, dy)).astype(np.int64)
+    if (np.abs(c.min(axis=0) + ij * (dx, dy) - c).max() > tol
+            or ij[:, 0].max() >= nx or ij[:, 1].max() >= ny):
+        return None
+    flat = ij[:, 1] * nx + ij[:, 0]
+    if not np.all(np.bincount(flat, minlength=n) == 1):
+        return None
+    if area is not None and not np.allclose(area, dx * dy, rtol=1e-3):
+        return None
+    order = np.empty(n, dtype=np.int64)
+    order[flat] = np.arange(n)
+    x0, y0 = c.min(axis=0) - (dx / 2, dy / 2)
+    return {"shape": (ny, nx), "order": order, "ij": ij,
+            "spacing": (float(dx), float(dy)),
+            "extent": (float(x0), float(x0 + nx * dx), float(y0), float(y0 + ny * dy))}
+
+
+# --- Screen-space level of detail. ------------------------------------------
+
+def screen_bins(points, shape, bounds=None):
+    """Screen bin of each point: ``shape`` is ``(columns,)`` for 1-D x
+    coordinates or ``(ny, nx)`` for 2-D points (row 0 at the bottom, bins
+    flattened row-major). ``bounds`` defaults to the points' extent
+    (``(x0, x1)`` or ``(x0, x1, y0, y1)``). Returns ``(bins, bounds)``."""
+    p = np.asarray(points, dtype=float)
+    p = p.reshape(len(p), -1)[:, :len(shape)]
+    if bounds is None:
+        bounds = tuple(v for j in range(p.shape[1])
+                       for v in (float(p[:, j].min()), float(p[:, j].max())))
+    idx = []
+    for j, n in enumerate(shape[::-1]):          # x first, then y
+        lo, hi = bounds[2 * j], bounds[2 * j + 1]
+        t = (p[:, j] - lo) / ((hi - lo) or 1.0)
+        idx.append(np.clip((t * n).astype(np.intp), 0, n - 1))
+    bins = idx[0] if len(idx) == 1 else idx[1] * shape[1] + idx[0]
+    return bins, bounds
+
+
+class ScreenReduction:
+    """Per-bin mean / min / max of per-cell values for a fixed cell -> bin
+    map (``screen_bins``), built once per mesh and screen size."""
+
+    def __init__(self, bins, n_bins):
+        self.bins = np.asarray(bins, dtype=np.intp)
+        self.n_bins = int(n_bins)
+        self.count = np.bincount(self.bins, minlength=self.n_bins)
+        self.order = np.argsort(self.bins, kind="stable")
+        self.filled = np.flatnonzero(self.count)
+        self.starts = np.concatenate([[0], np.cumsum(self.count[self.filled])[:-1]])
+
+    @property
+    def nbytes(self):
+        return self.bins.nbytes + self.order.nbytes + self.count.nbytes
+
+    def reduce(self, values):
+        """``(mean, lo, hi)`` per bin, NaN where a bin holds no cell."""
+        values = np.asarray(values, dtype=float)
+        mean = np.full(self.n_bins, np.nan)
+        lo, hi = mean.copy(), mean.copy()
+        if not len(self.filled):
+            return mean, lo, hi
+        mean[self.filled] = (np.bincount(self.bins, weights=values, minlength=self.n_bins)
+                             [self.filled] / self.count[self.filled])
+        ordered = values[self.order]
+        lo[self.filled] = np.minimum.reduceat(ordered, self.starts)
+        hi[self.filled] = np.maximum.reduceat(ordered, self.starts)
+        return mean, lo, hi
+
+    def error(self, values, mean):
+        """How far the cells stray from the bin value drawn for them:
+        ``max_abs``, ``rms`` and ``rel`` (max_abs over the value range)."""
+        values = np.asarray(values, dtype=float)
+        dev = np.abs(values - mean[self.bins])
+        span = float(np.nanmax(values) - np.nanmin(values)) if len(values) else 0.0
+        max_abs = float(np.nanmax(dev)) if len(dev) else 0.0
+        return {"cells": len(values), "bins": int(len(self.filled)),
+                "max_abs": max_abs, "rms": float(np.sqrt(np.nanmean(dev ** 2))) if len(dev) else 0.0,
+                "rel": max_abs / span if span else 0.0}
+
+
+def fill_holes(image):
+    """One pass of filling NaN pixels with the mean of their finite 3x3
+    neighbours — closes the pinholes that cell-centre binning leaves where
+    cells are locally coarser than a pixel."""
+    ok = np.isfinite(image)
+    val = np.pad(np.where(ok, image, 0.0), 1)
+    num = np.pad(ok.astype(float), 1)
+    ny, nx = image.shape
+    tot = sum(val[i:i + ny, j:j + nx] for i in range(3) for j in range(3))
+    cnt = sum(num[i:i + ny, j:j + nx] for i in range(3) for j in range(3))
+    out = image.copy()
+    holes = ~ok & (cnt > 0)
+    out[holes] = tot[holes] / cnt[holes]
+    return out
+
+
+# --- Triangle scan conversion. ----------------------------------------------
+
+_RASTER_CHUNK = 1 << 22      # candidate pixels tested per batch
+_RASTER_EXACT = 8            # box sides batched exactly up to this size
+
+
+class TriangleRaster:
+    """Scan conversion of ``triangles`` (m, 3) over ``points`` (n, 2) into
+    an image of ``shape`` = (ny, nx) covering ``bounds`` = (x0, x1, y0, y1),
+    row 0 at the bottom. The plan depends only on the geometry and the
+    view; calling it with per-cell values (``parents`` maps triangles to
+    cells; default one value per triangle) is then one gather.
+
+    A pixel takes the value of a triangle containing its centre. Triangles
+    too small to contain any centre are averaged into the pixel under
+    their centroid, so a coarse view has no holes. Pixels no triangle
+    reaches are NaN. Each triangle tests only the pixel centres in its
+    bounding box, batched by box size."""
+
+    def __init__(self, points, triangles, shape, bounds, parents=None):
+        ny, nx = self.shape = tuple(int(n) for n in shape)
+        self.bounds = tuple(float(b) for b in bounds)
+        x0, x1, y0, y1 = self.bounds
+        tri = np.asarray(triangles)
+        owner = np.arange(len(tri)) if parents is None else np.asarray(parents)
+        p = np.asarray(points, dtype=float).reshape(len(points), -1)[:, :2]
+        # Pixel coordinates: pixel (i, j) has its centre at (j, i). Column-
+        # wise min / max: reducing the short axis of (m, 3) is slow.
+        px = (p[:, 0] - x0) * (nx / (x1 - x0)) - 0.5
+        py = (p[:, 1] - y0) * (ny / (y1 - y0)) - 0.5
+        ax, bx, cx = px[tri[:, 0]], px[tri[:, 1]], px[tri[:, 2]]
+        ay, by, cy = py[tri[:, 0]], py[tri[:, 1]], py[tri[:, 2]]
+        j0 = np.ceil(np.minimum(np.minimum(ax, bx), cx)).astype(np.int64)
+        j1 = np.floor(np.maximum(np.maximum(ax, bx), cx)).astype(np.int64)
+        i0 = np.ceil(np.minimum(np.minimum(ay, by), cy)).astype(np.int64)
+        i1 = np.floor(np.maximum(np.maximum(ay, by), cy)).astype(np.int64)
+        covers = (j1 >= j0) & (i1 >= i0)
+
+        small = np.flatnonzero(~covers)
+        cj = np.floor((ax[small] + bx[small] + cx[small]) / 3 + 0.5).astype(np.int64)
+        ci = np.floor((ay[small] + by[small] + cy[small]) / 3 + 0.5).astype(np.int64)
+        keep = (cj >= 0) & (cj < nx) & (ci >= 0) & (ci < ny)
+        self.splat_pixel, self.splat_slot = np.unique(ci[keep] * nx + cj[keep],
+                                                      return_inverse=True)
+        self.splat_source = owner[small[keep]].astype(np.int32)
+        self.splat_count = np.bincount(self.splat_slot, minlength=len(self.splat_pixel))
+
+        index = np.full(nx * ny, -1, dtype=np.int64)
+        j0, j1 = np.maximum(j0, 0), np.minimum(j1, nx - 1)
+        i0, i1 = np.maximum(i0, 0), np.minimum(i1, ny - 1)
+        big = np.flatnonzero(covers & (j1 >= j0) & (i1 >= i0))
+        if len(big) < len(tri):
+            j0, j1, i0, i1 = j0[big], j1[big], i0[big], i1[big]
+            ax, bx, cx, ay, by, cy = (a[big] for a in (ax, bx, cx, ay, by, cy))
+        # Edge functions e(q) = A qx + B qy + C, signed so that inside is
+        # >= 0 for either winding, evaluated at the box corner (j0, i0)
+        # once; a candidate at offset (oj, oi) is then e0 + A oj + B oi.
+        sign = np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+        edges = []
+        for (ux, uy), (vx, vy) in (((ax, ay), (bx, by)), ((bx, by), (cx, cy)),
+                                   ((cx, cy), (ax, ay))):
+            A, B = (uy - vy) * sign, (vx - ux) * sign
+            edges.append((A, B, A * (j0 - ux) + B * (i0 - uy)))
+        # Batch by box size: exact up to _RASTER_EXACT pixels a side,
+        # rounded up to a power of two beyond (then masked to the box).
+        w, h = j1 - j0 + 1, i1 - i0 + 1
+        for d in (w, h):
+            wide = d > _RASTER_EXACT
+            d[wide] = 1 << np.ceil(np.log2(d[wide])).astype(np.int64)
+        key = (w << 32) | h
+        order = np.argsort(key, kind="stable")
+        for sel in np.split(order, np.flatnonzero(np.diff(key[order])) + 1):
+            if not len(sel):
+                continue
+            bw, bh = int(w[sel[0]]), int(h[sel[0]])
+            oj, oi = np.meshgrid(np.arange(bw), np.arange(bh))
+            oj, oi = oj.ravel(), oi.ravel()
+            step = max(1, _RASTER_CHUNK // (bw * bh))
+            for k in range(0, len(sel), step):
+                t = sel[k:k + step]
+                inside = None
+                if bw > _RASTER_EXACT or bh > _RASTER_EXACT:
+                    inside = ((oj <= (j1[t] - j0[t])[:, None])
+                              & (oi <= (i1[t] - i0[t])[:, None]))
+                for A, B, e0 in edges:
+                    e = e0[t, None] + A[t, None] * oj + B[t, None] * oi >= 0
+                    inside = e if inside is None else inside & e
+                rows, cols = np.nonzero(inside)
+                index[(i0[t][rows] + oi[cols]) * nx + j0[t][rows] + oj[cols]] = \
+                    owner[big[t][rows]]
+        self.pixel = np.flatnonzero(index >= 0).astype(np.int32)
+        self.source = index[self.pixel].astype(np.int32)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.pixel, self.source, self.splat_pixel,
+                                      self.splat_slot, self.splat_source, self.splat_count))
+
+    def __call__(self, values, out=None):
+        """The image of ``values`` (float64, NaN where no cell); ``out``
+        (shape ``self.shape``) is filled in place instead."""
+        values = np.asarray(values, dtype=float)
+        img = np.full(self.shape, np.nan) if out is None else out
+        if len(self.splat_pixel):
+            total = np.bincount(self.splat_slot, weights=values[self.splat_source],
+                                minlength=len(self.splat_pixel))
+            img.flat[self.splat_pixel] = total / self.splat_count
+        img.flat[self.pixel] = values[self.source]
+        return img
+
+
+def rasterize_triangles(points, triangles, values, shape, bounds):
+    """One-off ``TriangleRaster(points, triangles, shape, bounds)(values)``
+    with one value per triangle."""
+    return TriangleRaster(points, triangles, shape, bounds)(values)
+
+
+# --- Images: colour tables, colour bars and PNG. ----------------------------
+
+# Colour stops (RGB 0-255), interpolated into tables by ``colormap_lut``.
+# Viridis uses the stops of the GUI's own canvas renderer.
+_COLORMAP_STOPS = {
+    "viridis": ((68, 1, 84), (72, 40, 120), (62, 73, 137), (49, 104, 142),
+                (38, 130, 142), (31, 158, 137), (53, 183, 121), (109, 205, 89),
+                (180, 222, 44), (253, 231, 37)),
+    "gray": ((0, 0, 0), (255, 255, 255)),
+}
+
+# 3 x 5 bitmap glyphs for colour bar labels.
+_GLYPHS = {
+    "0": "111101101101111", "1": "010110010010111", "2": "111001111100111",
+    "3": "111001111001111", "4": "101101111001001", "5": "111100111001111",
+    "6": "111100111101111", "7": "111001001001001", "8": "111101111101111",
+    "9": "111101111001111", ".": "000000000000010", "-": "000000111000000",
+    "+": "000010111010000", "e": "000111111100111", " ": "000000000000000",
+}
+
+
+def colormap_lut(name="viridis", n=256):
+    """(n, 3) uint8 colour table. Built-in stops for ``viridis`` and
+    ``gray``; other names come from matplotlib, but only when it has
+    already been imported (this module never imports it)."""
+    stops = _COLORMAP_STOPS.get(name)
+    if stops is None:
+        import sys
+        mpl = sys.modules.get("matplotlib")
+        if mpl is None or name not in mpl.colormaps:
+            raise ValueError(f"colormap_lut: unknown colour map {name!r} "
+                             f"(built in: {sorted(_COLORMAP_STOPS)})")
+        rgb = mpl.colormaps[name](np.linspace(0.0, 1.0, n))[:, :3]
+        return (rgb * 255 + 0.5).astype(np.uint8)
+    s = np.asarray(stops, dtype=float)
+    x = np.linspace(0.0, len(s) - 1, n)
+    return np.stack([np.interp(x, np.arange(len(s)), s[:, k]) for k in range(3)],
+                    axis=1).round().astype(np.uint8)
+
+
+def colorize(image, lut, vlim=None):
+    """RGBA uint8 of a float ``image`` through ``lut``, linear over ``vlim``
+    (default: the image's finite range); NaN pixels are transparent."""
+    ok = np.isfinite(image)
+    if vlim is None:
+        vlim = (float(image[ok].min()), float(image[ok].max())) if ok.any() else (0.0, 1.0)
+    lo, hi = vlim
+    scale = (len(lut) - 1) / ((hi - lo) or 1.0)
+    idx = np.clip((np.where(ok, image, lo) - lo) * scale + 0.5, 0, len(lut) - 1)
+    rgba = np.empty(image.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = lut[idx.astype(np.intp)]
+    rgba[..., 3] = ok * np.uint8(255)
+    return rgba
+
+
+def text_mask(text, scale=2):
+    """Boolean pixel mask of ``text`` in the 3 x 5 glyphs (digits, ``.``,
+    ``-``, ``+``, ``e``; anything else blank), ``scale`` pixels per dot."""
+    glyphs = [np.array([c == "1" for c in _GLYPHS.get(ch, _GLYPHS[" "])]).reshape(5, 3)
+              for ch in text]
+    if not glyphs:
+        return np.zeros((5 * scale, 0), dtype=bool)
+    gap = np.zeros((5, 1), dtype=bool)
+    row = np.hstack([part for g in glyphs for part in (g, gap)][:-1])
+    return np.kron(row, np.ones((scale, scale), dtype=bool))
+
+
+def colorbar_strip(lut, height, vlim, width=14, color=(128, 128, 128), scale=2):
+    """RGBA strip (height, w): a vertical colour bar (``vlim`` high at the
+    top) with its two limits written to the right in ``color``."""
+    lo, hi = vlim
+    labels = [text_mask(f"{v:.3g}", scale) for v in (hi, lo)]
+    pad = 5 * scale
+    w = width + 4 + max(m.shape[1] for m in labels)
+    strip = np.zeros((height, w, 4), dtype=np.uint8)
+    t = np.linspace(1.0, 0.0, max(height - 2 * pad, 1))
+    strip[pad:pad + len(t), :width, :3] = lut[(t * (len(lut) - 1) + 0.5).astype(np.intp)][:, None]
+    strip[pad:pad + len(t), :width, 3] = 255
+    for mask, top in zip(labels, (0, height - pad)):
+        box = strip[top:top + pad, width + 4:width + 4 + mask.shape[1]]
+        box[mask[:len(box)]] = color + (255,)
+    return strip
+
+
+def encode_png(pixels, level=3):
+    """PNG bytes of an (h, w, 3|4) uint8 array (row 0 at the top), zlib at
+    ``level``. Every row uses the Sub filter (difference to the pixel on
+    the left), which suits smooth fields and is one vectorised subtraction."""
+    import struct
+    import zlib
+    h, w, c = pixels.shape
+    rows = np.ascontiguousarray(pixels, dtype=np.uint8).reshape(h, w * c)
+    raw = np.empty((h, 1 + w * c), dtype=np.uint8)
+    raw[:, 0] = 1
+    raw[:, 1:1 + c] = rows[:, :c]
+    raw[:, 1 + c:] = rows[:, c:] - rows[:, :-c]
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+                + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6 if c == 4 else 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), level))
+            + chunk(b"IEND", b""))
+
+
+# --- Multi-resolution agglomeration. ----------------------------------------
+
+class Pyramid:
+    """Nested agglomeration of 2-D cells into coarser levels. Level 0 groups
+    the cells by a square grid over their centres, sized so a block holds
+    about ``ratio`` cells; each further level merges 2 x 2 blocks of the
+    one below, until a level has at most ``min_cells`` blocks. Only
+    occupied blocks become coarse cells.
+
+    ``parents[l]`` maps the cells of level ``l - 1`` (for level 0, the mesh
+    cells) to level ``l``. ``bins[l]`` is each coarse cell's flat block in
+    the ``shapes[l]`` = (ny, nx) grid, row 0 at the bottom. Values
+    aggregate as ``weights``-weighted means (cell areas give the block's
+    cell average), so every level follows from the one below."""
+
+    def __init__(self, cell_weights, parents, weights, bins, shapes, origin, size):
+        self.cell_weights = cell_weights
+        self.parents, self.weights, self.bins = parents, weights, bins
+        self.shapes = [tuple(int(n) for n in s) for s in shapes]
+        self.origin, self.size = tuple(float(o) for o in origin), float(size)
+
+    @classmethod
+    def build(cls, points, weights=None, ratio=4, min_cells=256):
+        p = np.asarray(points, dtype=float).reshape(len(points), -1)[:, :2]
+        w = np.ones(len(p)) if weights is None else np.asarray(weights, dtype=float)
+        lo, span = p.min(axis=0), np.ptp(p, axis=0)
+        area = float(np.prod(np.where(span > 0, span, span.max() or 1.0)))
+        size = float(np.sqrt(area * ratio / max(len(p), 1))) or 1.0
+        shape = (max(1, int(np.ceil(span[1] / size))), max(1, int(np.ceil(span[0] / size))))
+        ij = np.minimum(((p - lo) / size).astype(np.intp), [shape[1] - 1, shape[0] - 1])
+        flat = ij[:, 1] * shape[1] + ij[:, 0]
+        parents, weights_, bins, shapes = [], [], [], []
+        below = w
+        while True:
+            bins_l, parent = np.unique(flat, return_inverse=True)
+            parents.append(parent.astype(np.int32))
+            weights_.append(np.bincount(parent, weights=below, minlength=len(bins_l)))
+            bins.append(bins_l.astype(np.int64))
+            shapes.append(shape)
+            if len(bins_l) <= min_cells or shape == (1, 1):
+                break
+            below = weights_[-1]
+            iy, ix = np.divmod(bins_l, shape[1])
+            shape = ((shape[0] + 1) // 2, (shape[1] + 1) // 2)
+            flat = (iy // 2) * shape[1] + ix // 2
+        return cls(w, parents, weights_, bins, shapes, lo, size)
+
+    @property
+    def n_levels(self):
+        return len(self.shapes)
+
+    @property
+    def nbytes(self):
+        return self.cell_weights.nbytes + sum(
+            a.nbytes for arrays in (self.parents, self.weights, self.bins) for a in arrays)
+
+    def extent(self, level):
+        """``(x0, x1, y0, y1)`` of the level's block grid."""
+        ny, nx = self.shapes[level]
+        h = self.size * 2 ** level
+        return (self.origin[0], self.origin[0] + nx * h,
+                self.origin[1], self.origin[1] + ny * h)
+
+    def cell_map(self, level):
+        """Coarse cell at ``level`` of every mesh cell."""
+        out = self.parents[0]
+        for parent in self.parents[1:level + 1]:
+            out = parent[out]
+        return out
+
+    def reduce(self, values):
+        """Weighted mean of the per-cell ``values`` on every level."""
+        out, v, w = [], np.asarray(values, dtype=float), self.cell_weights
+        for parent, weight in zip(self.parents, self.weights):
+            s = np.bincount(parent, weights=w * v, minlength=len(weight))
+            v = np.divide(s, weight, out=np.full(len(weight), np.nan), where=weight > 0)
+            out.append(v)
+            w = weight
+        return out
+
+    def image(self, level, values):
+        """Level values on the level's (ny, nx) grid, NaN where no cell."""
+        image = np.full(self.shapes[level], np.nan)
+        image.flat[self.bins[level]] = values
+        return image
+
+    def level_for(self, shape):
+        """The coarsest level with at least ``shape`` = (ny, nx) blocks, or
+        None when even level 0 is coarser than that."""
+        for level in range(self.n_levels - 1, -1, -1):
+            ny, nx = self.shapes[level]
+            if ny >= shape[0] and nx >= shape[1]:
+                return level
+        return None
+
+    def arrays(self):
+        """Flat ``{name: array}`` form (``from_arrays`` inverts it)."""
+        out = {"cell_weights": self.cell_weights,
+               "shapes": np.asarray(self.shapes, dtype=np.int64),
+               "frame": np.asarray(self.origin + (self.size,))}
+        for l in range(self.n_levels):
+            out[f"parents{l}"] = self.parents[l]
+            out[f"weights{l}"] = self.weights[l]
+            out[f"bins{l}"] = self.bins[l]
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        n = len(arrays["shapes"])
+        frame = np.asarray(arrays["frame"])
+        return cls(arrays["cell_weights"],
+                   [arrays[f"parents{l}"] for l in range(n)],
+                   [arrays[f"weights{l}"] for l in range(n)],
+                   [arrays[f"bins{l}"] for l in range(n)],
+                   arrays["shapes"], frame[:2], frame[2])
+
+
+# --- Benchmark against the per-cell loops. ----------------------------------
+
+def _fan_loop(cells):
+    """The per-cell loop ``fan_triangulate`` replaces (reference only)."""
+    ii, jj, kk = [], [], []
+    for cell in cells:
+        if len(cell) < 3:
+            continue
+        for t in range(1, len(cell) - 1):
+            ii.append(int(cell[0]))
+            jj.append(int(cell[t]))
+            kk.append(int(cell[t + 1]))
+    return ii, jj, kk
+
+
+def _boundary_loop(cells, cell_type):
+    """The ``Counter``-of-tuples scan ``boundary_faces`` replaces."""
+    from collections import Counter
+    count, fmap, parent = Counter(), {}, {}
+    for ci, cell in enumerate(cells):
+        for fd in FACE_DEFS[cell_type]:
+            nodes = [int(cell[k]) for k in fd]
+            key = tuple(sorted(nodes))
+            count[key] += 1
+            fmap[key] = nodes
+            parent[key] = ci
+    faces = [fmap[k] for k, c in count.items() if c == 1]
+    return faces, [parent[k] for k, c in count.items() if c == 1]
+
+
+def _hex_grid(n):
+    """``n``^3 hexahedra over ``(n+1)^3`` vertices."""
+    v = np.arange((n + 1) ** 3).reshape(n + 1, n + 1, n + 1)
+    c = [v[:-1, :-1, :-1], v[:-1, 1:, :-1], v[1:, 1:, :-1], v[1:, :-1, :-1],
+         v[:-1, :-1, 1:], v[:-1, 1:, 1:], v[1:, 1:, 1:], v[1:, :-1, 1:]]
+    return np.stack(c, axis=-1).reshape(-1, 8)
+
+
+def _vertex_loop(n_vert, cells, cell_values):
+    """The nested loop ``VertexAverage`` replaces."""
+    vv = np.zeros(n_vert)
+    vc = np.zeros(n_vert)
+    for ci, cell in enumerate(cells):
+        val = float(cell_values[ci])
+        for vi in cell:
+            vv[int(vi)] += val
+            vc[int(vi)] += 1
+    vc[vc == 0] = 1
+    return vv / vc
+
+
+def _quad_grid(n):
+    """``n`` x ``n`` quads over ``(n+1)^2`` vertices."""
+    v = np.arange((n + 1) * (n + 1)).reshape(n + 1, n + 1)
+    return np.stack([v[:-1, :-1], v[:-1, 1:], v[1:, 1:], v[1:, :-1]],
+                    axis=-1).reshape(-1, 4)
+
+
+def _bench(fn, *args, repeat=3):
+    import time
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def main(sizes=(100, 300, 1000)):
+    print(f"{'cells':>9}  {'case':<10} {'loop ms':>9} {'numpy ms':>9} {'speedup':>8}")
+    for n in sizes:
+        quads = _quad_grid(n)
+        mixed = quads.copy()
+        mixed[::3, 3] = -1          # every third cell a triangle
+        for case, cells in (("quad", quads), ("mixed", mixed)):
+            rows = [r[r >= 0] for r in cells] if case == "mixed" else cells
+            tris, _ = fan_triangulate(cells)
+            ref = np.stack(_fan_loop(rows), axis=1)
+            assert np.array_equal(tris, ref), "fan_triangulate disagrees with the loop"
+            loop = _bench(_fan_loop, rows)
+            vec = _bench(fan_triangulate, cells)
+            print(f"{len(cells):>9}  {case:<10} {loop:>9.1f} {vec:>9.2f} {loop / vec:>7.0f}x")
+
+    for n in (10, 30, 60):
+        hexes = _hex_grid(n)
+        faces, parents = boundary_faces(hexes, "hexahedron")
+        ref_faces, ref_parents = _boundary_loop(hexes, "hexahedron")
+        assert sorted(map(tuple, faces.tolist())) == sorted(map(tuple, ref_faces)), \
+            "boundary_faces disagrees with the loop"
+        loop = _bench(_boundary_loop, hexes, "hexahedron", repeat=1)
+        vec = _bench(boundary_faces, hexes, "hexahedron", repeat=1)
+        print(f"{len(hexes):>9}  {'hex faces':<10} {loop:>9.1f} {vec:>9.2f} {loop / vec:>7.0f}x")
+
+    for n in (100, 300, 1000):
+        quads = _quad_grid(n)
+        values = np.random.default_rng(0).random(len(quads))
+        op = VertexAverage(quads, (n + 1) ** 2)
+        assert np.allclose(op(values), _vertex_loop((n + 1) ** 2, quads, values)), \
+            "VertexAverage disagrees with the loop"
+        loop = _bench(_vertex_loop, (n + 1) ** 2, quads, values, repeat=1)
+        vec = _bench(op, values)
+        print(f"{len(quads):>9}  {'to vertex':<10} {loop:>9.1f} {vec:>9.2f} {loop / vec:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
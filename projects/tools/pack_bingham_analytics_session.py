@@ -11,10 +11,13 @@ model.py / run.py / visualize.py all import the sibling engines
 ``hb_dispersion`` (which itself imports ``hb_closure`` + ``hb_visc_analytic``),
 used module-qualified as ``HB.compute`` / ``HB.RE`` / … .  ``to_folder`` only
 materializes model/mesh/run/visualize.py + settings.json — no extra modules — so
-each card that needs them carries a BOOT preamble that re-materializes the three
-sibling .py files next to the card and puts the dir on ``sys.path``; then the
-case's own ``import hb_dispersion as HB`` resolves unchanged in BOTH forms
-(notebook: one scratch dir; folder: python run.py / visualize.py).  This is the
+each card that needs them carries a BOOT preamble that registers the three
+sibling sources with the GUI engine's in-memory module store
+(``engine.register_module``) when it runs in the worker, and otherwise
+re-materializes them as .py files next to the card with the dir on
+``sys.path``; then the case's own ``import hb_dispersion as HB`` resolves
+unchanged in every form (GUI worker; notebook: one scratch dir; folder:
+python run.py / visualize.py).  This is the
 same "GUI card format has no sibling-module slot" stopgap the transient packer
 documents — but re-materialized as files, because the ``HB.`` module-qualified
 use across three files rules out inlining bare definitions.
@@ -48,7 +51,8 @@ BOOT = (
     "import sys\n"
     "\n"
     "_CASE_DIR = " + FILE_GUARD + "\n"
-    "# Re-materialize the case sibling engines next to this card so\n"
+    "# Make the case sibling engines importable (in memory in the GUI, else\n"
+    "# re-materialized next to this card) so\n"
     "# ``import hb_dispersion`` resolves in BOTH the notebook (one scratch dir)\n"
     "# and the folder form (python run.py / visualize.py).  The GUI card format\n"
     "# has no sibling-module slot; these three modules are used module-qualified\n"
@@ -57,12 +61,18 @@ BOOT = (
     "_SIBS = {\n"
     + "".join(f"    {n!r}: {SIBS[n]!r},\n" for n in SIB_NAMES)
     + "}\n"
-    "for _n, _s in _SIBS.items():\n"
-    "    _p = os.path.join(_CASE_DIR, _n + \".py\")\n"
-    "    if not os.path.exists(_p):\n"
-    "        open(_p, \"w\").write(_s)\n"
-    "if _CASE_DIR not in sys.path:\n"
-    "    sys.path.insert(0, _CASE_DIR)\n"
+    "if \"register_module\" in globals():\n"
+    "    # GUI worker: serve them from the engine's in-memory module store —\n"
+    "    # no file writes, bytecode cached across runs by content hash.\n"
+    "    for _n, _s in _SIBS.items():\n"
+    "        register_module(_n, _s)\n"
+    "else:\n"
+    "    for _n, _s in _SIBS.items():\n"
+    "        _p = os.path.join(_CASE_DIR, _n + \".py\")\n"
+    "        if not os.path.exists(_p):\n"
+    "            open(_p, \"w\").write(_s)\n"
+    "    if _CASE_DIR not in sys.path:\n"
+    "        sys.path.insert(0, _CASE_DIR)\n"
 )
 
 # ---------------- shared settings fallback (marker = 'dispersion') --------------
@@ -33,6 +33,52 @@ async function initPyodide() {
     return py;
 }
 
+/* --- Worker-side measurements -> engine.zoomy_stats ---------------------
+   Install durations, extract_params timings and byte counts are recorded
+   into the engine's counters/histograms. Anything measured before engine.py
+   is loaded (the boot-time installs) is buffered and flushed once it is. */
+var _pendingStats = [];
+function workerStat(kind, name, value) {
+    if (!_engineReady) { _pendingStats.push([kind, name, value]); return; }
+    try {
+        py.globals.get(kind === "incr" ? "stat_incr" : "stat_observe")(name, value);
+    } catch (e) { /* stats are best-effort */ }
+}
+function flushWorkerStats() {
+    var pending = _pendingStats;
+    _pendingStats = [];
+    for (var i = 0; i < pending.length; i++) workerStat(pending[i][0], pending[i][1], pending[i][2]);
+}
+
+/* Engine helpers that return binary parts hand back a Python tuple
+   (json, [bytes, ...]). Unpack it into the parsed JSON plus one owned
+   Uint8Array per part (copied out of the WASM heap, so transferable). */
+function pyBinaryResult(res) {
+    var head = JSON.parse(res.get(0));
+    var parts = res.get(1);
+    var out = [];
+    for (var i = 0; i < parts.length; i++) {
+        var p = parts.get(i);
+        var buf = p.getBuffer("u8");
+        out.push(buf.data.slice());
+        buf.release();
+        p.destroy();
+    }
+    parts.destroy();
+    res.destroy();
+    return { head: head, buffers: out };
+}
+
+/* Time an installer body into the "install.<name>_ms" histogram. */
+async function timedInstall(name, body) {
+    var t0 = performance.now();
+    try {
+        return await body();
+    } finally {
+        workerStat("observe", "install." + name + "_ms", performance.now() - t0);
+    }
+}
+
 /* Each install phase caches its Promise so concurrent callers share the same
    in-flight work instead of racing to install the same packages twice. */
 var _paramPromise = null;
@@ -42,7 +88,7 @@ var _plotlyPromise = null;
 
 function installParam() {
     if (_paramPromise) return _paramPromise;
-    _paramPromise = (async function () {
+    _paramPromise = timedInstall("param", async function () {
         await initPyodide();
         /* h5py must load BEFORE zoomy_core is imported. zoomy_core.mesh.base_mesh
            does a try/except import of h5py at module scope and caches
@@ -59,13 +105,13 @@ function installParam() {
         await mp.install(["param", "zoomy-core"]);
         var code = await fetch("param_extract.py").then(function (r) { return r.text(); });
         await py.runPythonAsync(code);
-    })();
+    });
     return _paramPromise;
 }
 
 function installExec() {
     if (_execPromise) return _execPromise;
-    _execPromise = (async function () {
+    _execPromise = timedInstall("exec", async function () {
         await installParam();
         /* zoomy-plotting is no longer loaded here — it moved to tier 2
            (background). The engine.py function open_hdf5() imports it
@@ -73,19 +119,37 @@ function installExec() {
            installZoomyPlotting() through ensureVizDeps(). */
         var code = await fetch("engine.py").then(function (r) { return r.text(); });
         await py.runPythonAsync(code);
-
-        /* Register display callback: funnels rich output to main thread */
-        self._zoomyDisplayBridge = function (cellJson) {
-            postMessage({ type: "display", cell: cellJson });
+        /* Vectorized mesh primitives shared with the offline tools; cards
+           and the engine import them as ``mesh_ops``. */
+        var meshOps = await fetch("mesh_ops.py").then(function (r) { return r.text(); });
+        py.globals.get("register_module")("mesh_ops", meshOps);
+
+        /* Register display callback: funnels rich output to main thread.
+           Cells from a non-default session carry its id (engine._send) so
+           the adapter routes them to that session's view. Large outputs
+           arrive as begin/part/end stream cells; a binary part comes with
+           its bytes as a Uint8Array whose buffer is transferred, not
+           cloned. The cell's mime and whether it is a stream chunk ride on
+           the message itself, so the adapter never sniffs the JSON text. */
+        self._zoomyDisplayBridge = function (cellJson, session, bytes, mime, chunk) {
+            var msg = { type: "display", cell: cellJson, session: session || null,
+                        mime: mime || null, chunk: !!chunk };
+            if (bytes) { msg.buffer = bytes; postMessage(msg, [bytes.buffer]); }
+            else postMessage(msg);
         };
         await py.runPythonAsync([
             "import sys, json as _json",
             "from js import _zoomyDisplayBridge",
-            "def _zoomy_display_cb(cell):",
-            "    _zoomyDisplayBridge(_json.dumps(cell))",
+            "from pyodide.ffi import to_js as _to_js",
+            "def _zoomy_display_cb(cell, buffer=None):",
+            "    _zoomyDisplayBridge(_json.dumps(cell), cell.get('session'),",
+            "                        None if buffer is None else _to_js(buffer),",
+            "                        cell.get('mime'), 'chunk' in cell)",
             "sys._zoomy_display_callback = _zoomy_display_cb"
         ].join("\n"));
-    })();
+        _engineReady = true;
+        flushWorkerStats();
+    });
     return _execPromise;
 }
 
@@ -94,7 +158,7 @@ function installExec() {
    viz refreshes don't try to install twice. */
 function installMatplotlib() {
     if (_mplPromise) return _mplPromise;
-    _mplPromise = (async function () {
+    _mplPromise = timedInstall("matplotlib", async function () {
         postMessage({ type: "log", level: "info", msg: "installing matplotlib" });
         try {
             await py.loadPackage(["matplotlib"]);
@@ -102,13 +166,13 @@ function installMatplotlib() {
         } catch (e) {
             postMessage({ type: "log", level: "warn", msg: "matplotlib failed: " + (e.message || e) });
         }
-    })();
+    });
     return _mplPromise;
 }
 
 function installPlotly() {
     if (_plotlyPromise) return _plotlyPromise;
-    _plotlyPromise = (async function () {
+    _plotlyPromise = timedInstall("plotly", async function () {
         postMessage({ type: "log", level: "info", msg: "installing plotly" });
         try {
             var mp = py.pyimport("micropip");
@@ -117,7 +181,7 @@ function installPlotly() {
         } catch (e) {
             postMessage({ type: "log", level: "warn", msg: "plotly failed: " + (e.message || e) });
         }
-    })();
+    });
     return _plotlyPromise;
 }
 
@@ -127,7 +191,7 @@ var _meshioPromise = null;
    so we don't pay it unless someone actually touches the path. */
 function installMeshio() {
     if (_meshioPromise) return _meshioPromise;
-    _meshioPromise = (async function () {
+    _meshioPromise = timedInstall("meshio", async function () {
         postMessage({ type: "log", level: "info", msg: "installing meshio" });
         try {
             var mp = py.pyimport("micropip");
@@ -140,14 +204,14 @@ function installMeshio() {
             postMessage({ type: "log", level: "warn", msg: "meshio failed: " + (e.message || e) });
             throw e;
         }
-    })();
+    });
     return _meshioPromise;
 }
 
 var _zpPromise = null;
 function installZoomyPlotting() {
     if (_zpPromise) return _zpPromise;
-    _zpPromise = (async function () {
+    _zpPromise = timedInstall("zoomy_plotting", async function () {
         postMessage({ type: "log", level: "info", msg: "installing plotting" });
         try {
             var mp = py.pyimport("micropip");
@@ -156,7 +220,7 @@ function installZoomyPlotting() {
         } catch (e) {
             postMessage({ type: "log", level: "warn", msg: "zoomy-plotting failed: " + (e.message || e) });
         }
-    })();
+    });
     return _zpPromise;
 }
 
@@ -235,7 +299,7 @@ async function persistResultsShelf() {
 var _jediPromise = null;
 function installJedi() {
     if (_jediPromise) return _jediPromise;
-    _jediPromise = (async function () {
+    _jediPromise = timedInstall("jedi", async function () {
         postMessage({ type: "log", level: "info", msg: "installing autocomplete" });
         try {
             var mp = py.pyimport("micropip");
@@ -271,7 +335,7 @@ function installJedi() {
         /* Persist whatever parso just parsed so the NEXT visit starts warm. */
         await persistParsoCache();
         postMessage({ type: "log", level: "info", msg: "autocomplete ready" });
-    })();
+    });
     return _jediPromise;
 }
 
@@ -279,13 +343,13 @@ function installJedi() {
    installs must be awaited before run_code proceeds. Each regex maps
    to a promise-guarded installer; callers hook onto the in-flight
    promise so a snippet that arrives mid-install just waits its turn. */
-var _MPL_RE    = /\b(import\s+matplotlib|from\s+matplotlib|matplotlib\.)/;
+var _MPL_RE    = /\b(import\s+matplotlib|from\s+matplotlib|matplotlib\.|animate\()/;
 var _PLOTLY_RE = /\b(import\s+plotly|from\s+plotly)/;
 var _MESHIO_RE = /\b(import\s+meshio|from\s+meshio)/;
 /* zoomy-plotting is used via engine.open_hdf5 — every solver-template
    snippet ends with `open_hdf5(path)`, which lazy-imports zp inside
    Python. Run_code must block on the zp install if the snippet needs it. */
-var _ZP_RE     = /\b(open_hdf5|open_result|open_results|zoomy_plotting)\b/;
+var _ZP_RE     = /\b(open_hdf5|open_result|open_results|zoomy_plotting|animate)\b/;
 
 async function ensureVizDeps(code) {
     var needs = [];
@@ -298,11 +362,60 @@ async function ensureVizDeps(code) {
 
 var paramCache = {};
 
+/* --- Idle pump for engine background tasks ---------------------------
+   engine.run_idle(budget) runs prioritized task slices (field stats, …)
+   for a few ms. We only pump while no command is in flight (_busy) and
+   re-arm via setTimeout, so a message that lands during a slice is
+   dispatched before the next slice starts — the engine side also calls
+   preempt() at the top of every user command. */
+var IDLE_SLICE_MS = 8;
+var _busy = 0;
+var _engineReady = false;
+var _pumpArmed = false;
+
+function armIdlePump() {
+    if (_pumpArmed || !_engineReady || _busy) return;
+    _pumpArmed = true;
+    setTimeout(idlePump, 0);
+}
+
+function idlePump() {
+    _pumpArmed = false;
+    if (_busy) return;
+    var more = false;
+    try {
+        more = py.globals.get("run_idle")(IDLE_SLICE_MS);
+    } catch (e) {
+        postMessage({ type: "log", level: "warn", msg: "idle task failed: " + (e.message || e) });
+    }
+    if (more) armIdlePump();
+    /* A finished idle task may have written a sidecar (pyramid) to the
+       results shelf: persist it once the queue has drained. */
+    else if (py.globals.get("geometry_sidecars_pending")()) persistResultsShelf();
+}
+
+/* Activate the engine session a command targets (msg.session; absent ->
+   the default session). Every session shares this one interpreter; only
+   the exec scope (store, cell cache, display routing) is per session. */
+function useSession(msg) {
+    py.globals.get("use_session")(msg.session || null);
+}
+
 onmessage = async function (e) {
     var msg = e.data;
+    _busy++;
+    try {
+        await handleMessage(msg);
+    } finally {
+        _busy--;
+        armIdlePump();
+    }
+};
+
+async function handleMessage(msg) {
     /* Only log user-visible commands (run_code, describe_model); cache hits
        and param extraction are invisible plumbing. */
-    if (msg.cmd === "run_code" || msg.cmd === "describe_model") {
+    if (msg.cmd === "run_code" || msg.cmd === "run_cells" || msg.cmd === "describe_model") {
         postMessage({ type: "log", level: "info", msg: msg.cmd + " (id=" + msg.id + ")" });
     }
     try {
@@ -328,10 +441,12 @@ onmessage = async function (e) {
         } else if (msg.cmd === "extract_params") {
             var cacheKey = msg.class_path + "|" + JSON.stringify(msg.init || {});
             if (paramCache[cacheKey]) {
+                workerStat("incr", "params.cache.hit", 1);
                 postMessage({ type: "log", level: "info", msg: "Param cache hit for " + msg.class_path.split(".").pop() });
                 postMessage({ type: "result", id: msg.id, data: paramCache[cacheKey] });
                 return;
             }
+            workerStat("incr", "params.cache.miss", 1);
             var wt0 = performance.now();
             await installParam();
             var wt1 = performance.now();
@@ -339,6 +454,7 @@ onmessage = async function (e) {
             var wt2 = performance.now();
             paramCache[cacheKey] = result;
             postMessage({ type: "log", level: "info", msg: "Worker timing: installParam=" + (wt1-wt0).toFixed(0) + "ms, extract=" + (wt2-wt1).toFixed(0) + "ms" });
+            workerStat("observe", "params.extract_ms", wt2 - wt1);
             postMessage({ type: "result", id: msg.id, data: result });
 
         } else if (msg.cmd === "preload_params") {
@@ -360,8 +476,104 @@ onmessage = async function (e) {
                persisted results shelf mounted before it runs. */
             if (_ZP_RE.test(msg.code)) await mountResultsShelf();
             await ensureVizDeps(msg.code);
-            var result = py.globals.get("process_code")(msg.code);
+            var result = py.globals.get("process_code")(msg.code, msg.session || null);
             postMessage({ type: "result", id: msg.id, data: result });
+            /* A viz run may have cached a store's derived geometry as a
+               sidecar on the shelf (engine.store_geometry): persist it. */
+            if (py.globals.get("geometry_sidecars_pending")()) await persistResultsShelf();
+
+        } else if (msg.cmd === "run_cells") {
+            /* Incremental case run: engine.run_cells re-executes only the
+               cells whose source (or an upstream binding they read) changed
+               and reports the rest as cache hits. msg.cells is the ordered
+               [{id, role, source}] list, passed as JSON to avoid proxies. */
+            await installExec();
+            var allSrc = msg.cells.map(function (c) { return c.source || ""; }).join("\n");
+            if (_ZP_RE.test(allSrc)) await mountResultsShelf();
+            await ensureVizDeps(allSrc);
+            var cellsResult = py.globals.get("run_cells")(JSON.stringify(msg.cells), !!msg.force, msg.session || null);
+            postMessage({ type: "result", id: msg.id, data: cellsResult });
+            if (py.globals.get("geometry_sidecars_pending")()) await persistResultsShelf();
+
+        } else if (msg.cmd === "close_session") {
+            /* Drop a session's scope (closing its store); the interpreter
+               and every imported module stay warm for the others. */
+            await installExec();
+            var closed = py.globals.get("close_session")(msg.session || null);
+            postMessage({ type: "result", id: msg.id, data: closed });
+
+        } else if (msg.cmd === "list_sessions") {
+            await installExec();
+            var sessions = py.globals.get("list_sessions")();
+            var sessArr = sessions.toJs ? sessions.toJs({ dict_converter: Object.fromEntries }) : sessions;
+            if (sessions.destroy) sessions.destroy();
+            postMessage({ type: "result", id: msg.id, data: sessArr });
+
+        } else if (msg.cmd === "zoomy_stats") {
+            /* Counters/histograms snapshot of msg.session (engine.zoomy_stats);
+               msg.reset clears them afterwards. */
+            await installExec();
+            useSession(msg);
+            var st = py.globals.get("zoomy_stats")(!!msg.reset);
+            var stObj = st.toJs ? st.toJs({ dict_converter: Object.fromEntries }) : st;
+            if (st.destroy) st.destroy();
+            postMessage({ type: "result", id: msg.id, data: stObj });
+
+        } else if (msg.cmd === "memory_status") {
+            /* Heap / traced totals + per-cache sizes (engine.memory_status). */
+            await installExec();
+            var mem = py.globals.get("memory_status")();
+            var memObj = mem.toJs ? mem.toJs({ dict_converter: Object.fromEntries }) : mem;
+            if (mem.destroy) mem.destroy();
+            postMessage({ type: "result", id: msg.id, data: memObj });
+
+        } else if (msg.cmd === "scheduler_state") {
+            /* Background-task queue snapshot (engine.scheduler_state). */
+            await installExec();
+            var sched = py.globals.get("scheduler_state")();
+            var schedObj = sched.toJs ? sched.toJs({ dict_converter: Object.fromEntries }) : sched;
+            if (sched.destroy) sched.destroy();
+            postMessage({ type: "result", id: msg.id, data: schedObj });
+
+        } else if (msg.cmd === "table_window") {
+            /* Rows [start, stop) of a displayed DataFrame
+               (engine.table_window); numeric columns come back as
+               transferred buffers the window's columns index into. */
+            await installExec();
+            var tw = pyBinaryResult(py.globals.get("table_window")(msg.table, msg.start, msg.stop));
+            tw.head.buffers = tw.buffers;
+            postMessage({ type: "result", id: msg.id, data: tw.head },
+                        tw.buffers.map(function (b) { return b.buffer; }));
+
+        } else if (msg.cmd === "array_slice") {
+            /* msg.index (numpy slice syntax) of a displayed ndarray
+               (engine.array_slice), as one transferred buffer. */
+            await installExec();
+            var slc = pyBinaryResult(py.globals.get("array_slice")(msg.array, msg.index));
+            slc.head.buffers = slc.buffers;
+            postMessage({ type: "result", id: msg.id, data: slc.head },
+                        slc.buffers.map(function (b) { return b.buffer; }));
+
+        } else if (msg.cmd === "mesh_geometry") {
+            /* Cached geometry of a mesh display cell (engine.mesh_geometry),
+               for a frontend that no longer holds it. */
+            await installExec();
+            var geo = pyBinaryResult(py.globals.get("mesh_geometry")(msg.geometry));
+            geo.head.buffers = geo.buffers;
+            postMessage({ type: "result", id: msg.id, data: geo.head },
+                        geo.buffers.map(function (b) { return b.buffer; }));
+
+        } else if (msg.cmd === "field_tile") {
+            /* One 256 x 256 raster tile of the current store
+               (engine.render_tile): msg.field at msg.step, tile (msg.x,
+               msg.y) of zoom msg.z. Served from the engine's tile LRU. */
+            await installExec();
+            useSession(msg);
+            var tile = pyBinaryResult(py.globals.get("render_tile")(
+                msg.field || null, msg.step || 0, msg.z || 0, msg.x || 0, msg.y || 0));
+            tile.head.buffers = tile.buffers;
+            postMessage({ type: "result", id: msg.id, data: tile.head },
+                        tile.buffers.map(function (b) { return b.buffer; }));
 
         } else if (msg.cmd === "complete_code") {
             /* Autocomplete via jedi. First call micropip-installs jedi
@@ -383,6 +595,10 @@ onmessage = async function (e) {
                zoomy_plotting, so the install must finish first. */
             await installExec();
             await installZoomyPlotting();
+            useSession(msg);
+            /* Heap watchdog: shed caches, or refuse (MemoryError -> error
+               reply) when live memory is already over the limit. */
+            py.globals.get("memory_guard")(0, "open_hdf5");
             py.globals.get("open_hdf5")(msg.path);
             postMessage({ type: "result", id: msg.id, data: "ok" });
 
@@ -392,9 +608,15 @@ onmessage = async function (e) {
                hand the path to engine.open_hdf5 (which requires zp). */
             await installExec();
             await installZoomyPlotting();
+            /* Heap watchdog: refuse (MemoryError -> error reply) before the
+               download is written and opened if it would push live memory
+               over the limit, instead of crashing the worker mid-read. */
+            useSession(msg);
+            py.globals.get("memory_guard")(msg.bytes.byteLength, "write_hdf5_bytes");
             var dir = msg.path.replace(/\/[^\/]*$/, "");
             if (dir) py.FS.mkdirTree(dir);
             py.FS.writeFile(msg.path, new Uint8Array(msg.bytes));
+            workerStat("incr", "hdf5.bytes_written", msg.bytes.byteLength);
             py.globals.get("open_hdf5")(msg.path);
             postMessage({ type: "result", id: msg.id, data: "ok" });
 
@@ -418,6 +640,7 @@ onmessage = async function (e) {
                shelf under msg.name (local "Save result as…"). */
             await installExec();
             await mountResultsShelf();
+            useSession(msg);
             var slug = py.globals.get("save_result_local")(msg.name);
             await persistResultsShelf();
             postMessage({ type: "result", id: msg.id, data: slug });
@@ -437,9 +660,11 @@ onmessage = async function (e) {
                (Pyodide) run. engine.store_source_path() returns the VFS path
                the solver template wrote (simulation.h5); we read it back. */
             await installExec();
+            useSession(msg);
             var srcPath = py.globals.get("store_source_path")();
             if (!srcPath) throw new Error("no open store to post-process (run a simulation first)");
             var storeBytes = py.FS.readFile(srcPath);   // Uint8Array
+            workerStat("incr", "hdf5.bytes_read", storeBytes.byteLength);
             postMessage({ type: "result", id: msg.id, data: storeBytes }, [storeBytes.buffer]);
 
         } else if (msg.cmd === "write_user_mesh") {
@@ -484,7 +709,7 @@ onmessage = async function (e) {
     } catch (err) {
         postMessage({ type: "error", id: msg.id, error: err.message || String(err) });
     }
-};
+}
 
 /* Start loading everything immediately when worker is created */
 (async function () {
@@ -0,0 +1,23 @@
+"""Field on the mesh — binary transport, drawn natively by the GUI.
+
+The GUI injects ``store``, ``time_step`` (timeline slider) and ``field_name``
+(field selector). ``display_mesh`` (engine) sends the triangulated geometry
+once per store and, on every later slider move, only the field values —
+float16 when ``half`` is set — so a tick costs field-sized bytes, not
+mesh-sized. Unified 1D / 2D / 3D (boundary surface).
+"""
+import zoomy_plotting as zp
+
+if store is None:
+    raise RuntimeError("No data yet — run a simulation first.")
+if not isinstance(store, zp.SimulationStore):
+    raise TypeError(
+        f"store must be zoomy_plotting.SimulationStore, got "
+        f"{type(store).__name__}"
+    )
+
+field = field_name if ("field_name" in dir() and field_name) else next(iter(store.field.keys()))
+step = int(time_step) if "time_step" in dir() else 0
+half = False
+
+display_mesh(store, field, step, half=half)
@@ -1,7 +1,11 @@
 """Field on the mesh — matplotlib via ``zoomy_plotting.MatplotlibPlotter``.
 
 The GUI injects ``store`` (a ``zoomy_plotting.SimulationStore``), ``time_step``
-(timeline slider) and ``field_name`` (field selector). Unified 1D / 2D / 3D.
+(timeline slider), ``field_name`` (field selector) and ``card_id`` (keys the
+engine's persistent figure). Unified 1D / 2D / 3D. In the GUI a 1D / 2D mesh
+with more cells than the plot has pixels is drawn at screen resolution (the
+log reports the reduction error); set ``full_detail = True`` to draw every
+cell.
 """
 import matplotlib
 matplotlib.use("agg")            # headless worker — no GUI backend
@@ -14,14 +18,20 @@ if store is None:
 field = field_name if ("field_name" in dir() and field_name) else next(iter(store.field.keys()))
 step = int(time_step) if "time_step" in dir() else 0
 kw = {} if store.dim == 1 else {"cmap": "viridis", "colorbar": True}
+full_detail = False
 
-with zp.apply_style():
-    if store.dim == 3:
-        fig = plt.figure(); ax = fig.add_subplot(111, projection="3d")
-    else:
-        fig, ax = plt.subplots()
-    zp.MatplotlibPlotter(store).plot(ax, time_step=step, field=field, **kw)
-    if store.times is not None and len(store.times):
-        ax.set_title(f"{field} — t = {float(store.times[step]):.3f}")
+if "card_id" in dir() and "card_figure" in dir():
+    # GUI worker: the engine keeps this card's figure between renders and
+    # only swaps the field values / colour limits on a slider move.
+    fig = card_figure(card_id, store, field, step, full=full_detail)
+else:
+    with zp.apply_style():
+        if store.dim == 3:
+            fig = plt.figure(); ax = fig.add_subplot(111, projection="3d")
+        else:
+            fig, ax = plt.subplots()
+        zp.MatplotlibPlotter(store).plot(ax, time_step=step, field=field, **kw)
+        if store.times is not None and len(store.times):
+            ax.set_title(f"{field} — t = {float(store.times[step]):.3f}")
 
 display(fig)
@@ -0,0 +1,145 @@
+"""Plotly animation — every snapshot of one field, scrubbed client-side.
+
+Same 1D/2D/3D views as ``mesh_plotly.py``, but the figure carries the whole
+run: the geometry (vertices + triangulation) is emitted once as the base
+trace and each snapshot becomes one Plotly frame holding only the
+intensity / y array. Plotly's own slider and play button swap frames in the
+browser, so scrubbing never round-trips to Python and the store is read in
+a single pass. Built as a raw figure dict (the engine's ``plotly_*``
+helpers), so no array passes through ``plotly.graph_objects`` validation.
+
+The GUI injects ``field_name`` (field selector). ``max_frames`` caps the
+frame count (snapshots are strided evenly beyond it). A uniform rectangular
+grid (``grid_index``) animates as a heatmap whose frames carry only ``z``.
+"""
+import numpy as np
+
+import zoomy_plotting as zp
+
+if store is None:
+    raise RuntimeError(
+        "store is not populated — run a simulation first. The solver "
+        "template writes /tmp/zoomy_sim/sim.h5 and installs it as the store."
+    )
+if not isinstance(store, zp.SimulationStore):
+    raise TypeError(
+        f"store must be zoomy_plotting.SimulationStore, got "
+        f"{type(store).__name__}"
+    )
+
+field_name = field_name if "field_name" in dir() and field_name else next(iter(store.field.keys()))
+colormap = "Viridis"
+max_frames = 120
+
+vertices = np.asarray(store.vertices)
+dim = store.dim
+steps = np.unique(np.linspace(0, store.n_snapshots - 1,
+                              min(store.n_snapshots, max_frames)).round().astype(int))
+
+
+def _label(step):
+    if store.times is not None and len(store.times):
+        return f"t = {float(store.times[step]):.3f}"
+    return f"step {step}"
+
+
+# Shared colour range over the whole run (the engine's field_stats: served
+# from the idle-time pass when it has finished).
+rng = (field_stats(store) or {}).get(field_name) if "field_stats" in dir() else None
+if rng is None:
+    vals = [np.asarray(store.get_cell(s, field_name), dtype=float) for s in steps]
+    rng = {"min": float(min(v.min() for v in vals)), "max": float(max(v.max() for v in vals))}
+cmin, cmax = rng["min"], rng["max"]
+# Frame payloads are plain JSON lists: round to ~5 significant digits of
+# the range so each number serialises short.
+decimals = max(0, 5 - int(np.floor(np.log10(max(cmax - cmin, 1e-12)))))
+
+
+# Cell centres / triangulation / boundary faces: computed once per mesh by
+# the engine (and cached in a sidecar next to the shelved results).
+geo = store_geometry(store)
+grid = grid_index(store) if "grid_index" in dir() else None
+
+if grid is not None:
+    (ny, nx), (dx, dy) = grid["shape"], grid["spacing"]
+    x0, _, y0, _ = grid["extent"]
+    order = grid["order"]
+    base = plotly_heatmap(np.zeros((ny, nx)), x=x0 + (np.arange(nx) + 0.5) * dx,
+                          y=y0 + (np.arange(ny) + 0.5) * dy, colorscale=colormap,
+                          zmin=cmin, zmax=cmax, colorbar=dict(title=dict(text=field_name)))
+    frame_of = lambda v: {"type": "heatmap", "z": np.round(v[order].reshape(ny, nx), decimals)}
+    layout = dict(yaxis=dict(scaleanchor="x", scaleratio=1),
+                  margin=dict(l=40, r=20, t=40, b=40))
+
+elif dim == 1:
+    x = geo["cell_centers"][:, 0]
+    order = np.argsort(x)
+    base = plotly_line(x[order], None, mode="lines+markers")
+    frame_of = lambda v: {"type": "scatter", "y": np.round(v[order], decimals)}
+    layout = dict(xaxis=dict(title=dict(text="x")),
+                  yaxis=dict(title=dict(text=field_name), range=[cmin, cmax]),
+                  margin=dict(l=40, r=20, t=40, b=40))
+
+elif dim == 2:
+    to_vert = vertex_operator(store)
+    base = plotly_mesh(vertices[:, :2], geo["triangles"],
+                       colorscale=colormap, cmin=cmin, cmax=cmax, showscale=True,
+                       colorbar=dict(title=dict(text=field_name)), flatshading=False)
+    frame_of = lambda v: {"type": "mesh3d", "intensity": np.round(to_vert(v), decimals)}
+    layout = dict(scene=dict(aspectmode="data",
+                             camera=dict(eye=dict(x=0, y=0, z=2.2),
+                                         up=dict(x=0, y=1, z=0))),
+                  margin=dict(l=0, r=0, t=40, b=0))
+
+elif dim == 3:
+    if not len(geo["boundary_faces"]):
+        raise RuntimeError(
+            f"no 3-D boundary faces extracted from {store.n_cells} cells "
+            f"of type {store.cell_type!r}"
+        )
+    to_vert = vertex_operator(store)
+    base = plotly_mesh(vertices, geo["triangles"],
+                       colorscale=colormap, cmin=cmin, cmax=cmax, showscale=True,
+                       colorbar=dict(title=dict(text=field_name)), flatshading=True,
+                       lighting=dict(ambient=0.6, diffuse=0.8),
+                       lightposition=dict(x=100, y=200, z=300))
+    frame_of = lambda v: {"type": "mesh3d",
+                          "intensity": np.round(to_vert(v), decimals)}
+    layout = dict(scene=dict(aspectmode="data",
+                             camera=dict(eye=dict(x=1.5, y=1.5, z=1.2))),
+                  margin=dict(l=0, r=0, t=40, b=0))
+
+else:
+    raise ValueError(f"unsupported store.dim={dim}")
+
+# One pass over the store: each frame only replaces trace 0's data array.
+frames = []
+for s in steps:
+    v = np.asarray(store.get_cell(int(s), field_name), dtype=float)
+    frames.append({"data": [frame_of(v)], "traces": [0], "name": str(s),
+                   "layout": {"title": {"text": f"{field_name}  —  {_label(s)}"}}})
+
+base.update({k: v for k, v in frames[0]["data"][0].items() if k != "type"})
+
+still = dict(mode="immediate", frame=dict(duration=0, redraw=True),
+             transition=dict(duration=0))
+fig = plotly_figure(
+    base, frames=frames,
+    title=dict(text=f"{field_name}  —  {_label(steps[0])}"),
+    sliders=[dict(active=0, currentvalue=dict(prefix=""), pad=dict(t=30),
+                  steps=[dict(method="animate", label=_label(s),
+                              args=[[str(s)], still]) for s in steps])],
+    updatemenus=[dict(type="buttons", showactive=False, x=0, y=0,
+                      xanchor="right", yanchor="top", pad=dict(t=30, r=10),
+                      buttons=[dict(label="▶", method="animate",
+                                    args=[None, dict(still, fromcurrent=True,
+                                                     frame=dict(duration=120, redraw=True))]),
+                               dict(label="❚❚", method="animate",
+                                    args=[[None], still])])],
+    **layout,
+)
+
+print(f"[plotly-frames] {store.cell_type} dim={dim} field={field_name!r} "
+      f"frames={len(frames)} cells={store.n_cells}")
+
+display(fig)
@@ -10,7 +10,11 @@ reproduces each exactly, with no ansatz hard-coded here.
 The GUI injects ``store`` (a ``zoomy_plotting.SimulationStore``), ``time_step``
 (timeline slider) and ``field_name`` (field selector). ``model`` (the run's
 SystemModel) persists in the shared exec scope, so the profiles come straight
-from the run that produced the store.
+from the run that produced the store. The lifted row is built once per model
+(``profile_lift``, engine: cached in memory) and
+evaluated for all stations and zeta in one call. ``n_stations`` above 3
+draws one u(x, zeta) section through that many stations instead of three
+panels.
 """
 import matplotlib
 matplotlib.use("agg")            # headless worker — no GUI backend
@@ -26,37 +30,25 @@ names = list(store.field.keys())
 field = field_name if ("field_name" in dir() and field_name) else names[0]
 
 # --- cell centres, for stations and the x axis ------------------------------
-verts, cells = np.asarray(store.vertices), np.asarray(store.cells)
-centers = verts[cells].mean(axis=1)
+if "store_geometry" in dir():
+    centers = store_geometry(store)["cell_centers"]   # cached per mesh
+else:
+    centers = np.asarray(store.vertices)[np.asarray(store.cells)].mean(axis=1)
 n = store.n_inner_cells or len(centers)
 centers, x = centers[:n], centers[:n, 0]
 
-xs = np.quantile(x, [0.25, 0.50, 0.75])          # three stations across the span
-probes = [int(np.argmin(np.abs(x - xq))) for xq in xs]
-
-
-def _u_lift(M):
-    """Lambdify the model's interpolate_to_3d ``u`` row (slot 2 of
-    [b, h, u, v, w, p]) -> u(*Q, *Qaux, *params, x, y, zeta). Same lift as
-    zoomy_prepost.steps.lift3d / column_plots.read_zoomyfoam."""
-    import sympy as sp
-    rows = getattr(M, "interpolate_to_3d", None)
-    if rows is None:
-        return None
-    exprs = [sp.sympify(e) for e in np.asarray(rows, dtype=object).ravel()]
-    state = list(M.state)
-    aux = list(getattr(M, "aux_state", None) or [])
-    params = list(M.parameters.values()) if M.parameters is not None else []
-    pos = (list(M.position.values()) if getattr(M, "position", None) is not None
-           else list(sp.symbols("x y z", real=True)))
-    fn = sp.lambdify(state + aux + params + pos[:3], exprs[2], "numpy", dummify=True)
-    pv = getattr(M, "parameter_values", None)
-    pvals = [float(v) for v in pv.values()] if pv is not None else [0.0] * len(params)
-    return fn, len(state), len(aux), pvals
+n_stations = 3                   # > 3: one u(x, zeta) section instead of panels
 
+# Stations across the span; the nearest cell centre (in x) to each.
+xs = np.quantile(x, [0.25, 0.50, 0.75] if n_stations <= 3 else np.linspace(0, 1, n_stations))
+order = np.argsort(x, kind="stable")
+right = np.clip(np.searchsorted(x[order], xs), 0, n - 1)
+left = np.maximum(right - 1, 0)
+probes = order[np.where(xs - x[order][left] <= x[order][right] - xs, left, right)]
+probes = probes[np.r_[True, probes[1:] != probes[:-1]]]   # a station per cell
 
 M = globals().get("model")           # the run's SystemModel, from the shared scope
-lift = _u_lift(M) if M is not None else None
+lift = profile_lift(M) if M is not None else None
 
 with zp.apply_style():
     fig = plt.figure(figsize=(9.0, 6.4))
@@ -69,33 +61,37 @@ with zp.apply_style():
     times = getattr(store, "times", None)
     t_now = float(times[step]) if times is not None and len(times) else None
     ax0.set_title(f"{field}" + (f" — t = {t_now:.3f}" if t_now is not None else ""))
-    for k in probes:                                  # mark the stations
-        if store.dim == 1:
+    if store.dim == 1 and len(probes) <= 3:           # mark the stations
+        for k in probes:
             ax0.axvline(x[k], color="k", lw=1.0, ls="--", alpha=0.7)
-        elif store.dim == 2:
-            ax0.plot(centers[k, 0], centers[k, 1], "o", ms=7, mfc="none",
-                     mew=2, color="k")
+    elif store.dim == 2:
+        ax0.plot(centers[probes, 0], centers[probes, 1], "o", ls="none",
+                 ms=7 if len(probes) <= 3 else 2, mfc="none", mew=2, color="k")
 
     # ---- bottom: u(zeta) at each station, via interpolate_to_3d ------------
     if lift is not None:
-        fn, n_state, n_aux, pvals = lift
         zeta = np.linspace(0.0, 1.0, 60)
-        aux0 = [0.0] * n_aux            # u row is a function of the moments, not aux
-        for j, k in enumerate(probes):
-            ax = fig.add_subplot(gs[1, j])
-            Qk = [float(store.get_cell(step, i)[k]) for i in range(n_state)]
-            u = np.asarray(fn(*Qk, *aux0, *pvals,
-                              float(centers[k, 0]),
-                              float(centers[k, 1] if centers.shape[1] > 1 else 0.0),
-                              zeta), dtype=float)
-            if u.ndim == 0:
-                u = np.full_like(zeta, float(u))
-            ax.plot(u, zeta, lw=2)
-            ax.set_title(f"x = {x[k]:.3f}", fontsize=10)
-            ax.set_xlabel(r"$u(\zeta)$")
-            ax.set_ylim(0.0, 1.0)
-            if j == 0:
-                ax.set_ylabel(r"$\zeta$  (0 = bed, 1 = surface)")
+        # u row is a function of the moments, not aux: aux stays zero.
+        Q = np.stack([np.asarray(store.get_cell(step, i))[probes]
+                      for i in range(lift.n_state)])
+        u = lift(Q, zeta, centers[probes, 0],
+                 centers[probes, 1] if centers.shape[1] > 1 else 0.0)
+        if len(probes) > 3:
+            ax = fig.add_subplot(gs[1, :])
+            mesh = ax.pcolormesh(x[probes], zeta, u.T, shading="nearest", cmap="viridis")
+            fig.colorbar(mesh, ax=ax, label=r"$u(\zeta)$")
+            ax.set_title(f"u at {len(probes)} stations", fontsize=10)
+            ax.set_xlabel("x")
+            ax.set_ylabel(r"$\zeta$  (0 = bed, 1 = surface)")
+        else:
+            for j, k in enumerate(probes):
+                ax = fig.add_subplot(gs[1, j])
+                ax.plot(u[j], zeta, lw=2)
+                ax.set_title(f"x = {x[k]:.3f}", fontsize=10)
+                ax.set_xlabel(r"$u(\zeta)$")
+                ax.set_ylim(0.0, 1.0)
+                if j == 0:
+                    ax.set_ylabel(r"$\zeta$  (0 = bed, 1 = surface)")
     else:
         ax = fig.add_subplot(gs[1, :])
         ax.axis("off")
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The engine and mesh_ops are top-level modules of the repo, loaded by the
+# worker from the site root; make them importable the same way here.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
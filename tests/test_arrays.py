@@ -0,0 +1,102 @@
+import base64
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+import engine
+
+ADAPTER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "zoomy_cli", "src", "adapters", "pyodide_adapter.mjs")
+
+SAMPLES = [
+    np.linspace(-1, 1, 7),
+    np.linspace(-1, 1, 7, dtype=np.float32),
+    np.array([0.5, -2.0, 65504.0], dtype=np.float16),
+    np.arange(-3, 4, dtype=np.int8),
+    np.arange(7, dtype=np.uint8),
+    np.arange(-3, 4, dtype=np.int16),
+    np.arange(7, dtype=np.uint16),
+    np.arange(-3, 4, dtype=np.int32),
+    np.arange(7, dtype=np.uint32),
+    np.arange(-3, 4, dtype=np.int64),
+    np.arange(7, dtype=np.uint64),
+    np.array([True, False, True]),
+]
+
+
+def decode(spec, buffers):
+    if "values" in spec:
+        return spec["values"]
+    return np.frombuffer(buffers[spec["buffer"]], dtype=spec["dtype"])
+
+
+@pytest.mark.parametrize("values", SAMPLES, ids=lambda a: a.dtype.name)
+def test_wire_round_trip(values):
+    buffers = []
+    spec = engine._wire_array(values, buffers)
+    assert spec["dtype"] == engine._WIRE_DTYPES[values.dtype.kind + str(values.dtype.itemsize)]
+    assert np.array_equal(decode(spec, buffers), values.astype(spec["dtype"]))
+
+
+def test_wire_non_numeric_and_c_order():
+    buffers = []
+    assert engine._wire_array(np.array(["a", None, 3], dtype=object), buffers) == {
+        "values": ["a", None, "3"]}
+    assert buffers == []
+    a = np.arange(12.0).reshape(3, 4).T           # Fortran-ordered view
+    spec = engine._wire_array(a, buffers)
+    assert np.array_equal(decode(spec, buffers), a.ravel())
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_wire_decodes_in_the_adapter():
+    buffers = []
+    specs = [engine._wire_array(a, buffers) for a in SAMPLES]
+    specs.append(engine._wire_array(np.array(["x", None], dtype=object), buffers))
+    buffers.append(np.array([0.5, -2.0, np.inf], dtype="<f2").tobytes())
+    specs.append({"buffer": len(buffers) - 1, "dtype": "<f2"})
+    script = (
+        "const m = await import(process.argv[1]);"
+        "const msg = JSON.parse(require('fs').readFileSync(0, 'utf8'));"
+        "const bufs = msg.buffers.map((b) => new Uint8Array(Buffer.from(b, 'base64')));"
+        "console.log(JSON.stringify(msg.specs.map((s) => Array.from(m.decodeWire(s, bufs),"
+        " (v) => typeof v === 'number' && !isFinite(v) ? String(v) : v))));")
+    payload = json.dumps({"specs": specs,
+                          "buffers": [base64.b64encode(b).decode() for b in buffers]})
+    out = subprocess.run(["node", "--input-type=commonjs", "-e",
+                          f"(async () => {{ {script} }})()", ADAPTER],
+                         input=payload, capture_output=True, text=True, check=True)
+    decoded = json.loads(out.stdout)
+    for got, values in zip(decoded, SAMPLES):
+        assert np.array_equal(np.asarray(got, dtype=float), values.astype(float))
+    assert decoded[-2] == ["x", None]
+    assert decoded[-1] == [0.5, -2.0, "Infinity"]
+
+
+def test_parse_index():
+    assert engine._parse_index("0:10, 3, ..., ::2") == (
+        slice(0, 10), 3, Ellipsis, slice(None, None, 2))
+    assert engine._parse_index("-1") == (-1,)
+    with pytest.raises(ValueError):
+        engine._parse_index("__import__('os')")
+
+
+def test_array_slice(monkeypatch):
+    monkeypatch.setattr(engine.sys, "_zoomy_display_callback",
+                        lambda cell, buffer=None: None, raising=False)
+    a = np.arange(24, dtype=np.int32).reshape(2, 3, 4)
+    engine.display(a)
+    aid = "a%d" % engine._array_ids[0]
+    text, buffers = engine.array_slice(aid, "1, :, ::2")
+    part = json.loads(text)
+    assert part["shape"] == [3, 2] and part["dtype"] == "int32"
+    assert np.array_equal(decode(part["data"], buffers).reshape(part["shape"]), a[1, :, ::2])
+    monkeypatch.setattr(engine, "_ARRAY_MAX_SLICE", 5)
+    with pytest.raises(ValueError, match="narrow the slice"):
+        engine.array_slice(aid, "...")
+    with pytest.raises(KeyError, match="expired"):
+        engine.array_slice("a-missing", "0")
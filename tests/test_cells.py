@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+import engine
+
+
+@pytest.fixture
+def session():
+    yield "test-cells"
+    engine.close_session("test-cells")
+
+
+def run(cells, session):
+    res = json.loads(engine.run_cells(cells, session=session))
+    assert res["status"] == "success", res["output"]
+    return {c["id"]: c["status"] for c in res["cells"]}
+
+
+def case(tmp_path, dt="0.1", plot="'line'"):
+    out = str(tmp_path / "result.txt")
+    return [
+        {"role": "settings", "source": f"settings = {{'dt': {dt}}}"},
+        {"role": "run", "source": f"with open({out!r}, 'w') as f:\n"
+                                  f"    f.write(str(settings.get('dt')))"},
+        {"role": "visualization", "source": f"style = {plot}\n"
+                                            f"shown = open({out!r}).read()"},
+    ]
+
+
+def test_unchanged_case_is_all_cached(tmp_path, session):
+    run(case(tmp_path), session)
+    assert run(case(tmp_path), session) == {
+        "settings": "cached", "run": "cached", "visualization": "cached"}
+
+
+def test_viz_change_reruns_only_viz(tmp_path, session):
+    run(case(tmp_path), session)
+    assert run(case(tmp_path, plot="'bar'"), session) == {
+        "settings": "cached", "run": "cached", "visualization": "ran"}
+
+
+def test_rerun_of_run_cell_reruns_file_readers(tmp_path, session):
+    # viz reads no name run defines — only the file run wrote.
+    run(case(tmp_path), session)
+    assert run(case(tmp_path, dt="0.2"), session) == {
+        "settings": "ran", "run": "ran", "visualization": "ran"}
+    assert engine.sys._shallowflow_scope["shown"] == "0.2"
+
+
+def test_names():
+    defines, reads = engine._cell_names(
+        "import numpy as np\n"
+        "x = settings.get('dt')\n"
+        "v = store.get_cell(0, 'h')\n"
+        "lst.append(1)\n"
+        "cfg.dt = 0.1\n"
+        "def f(a):\n"
+        "    tmp = a + offset\n"
+        "    return tmp\n"
+        "g = lambda b: b + scale\n"
+        "s = [i for i in range(3)]\n",
+        {"np": engine.np})
+    assert defines == {"np", "x", "v", "lst", "cfg", "f", "g", "s"}
+    assert reads == {"settings", "store", "lst", "cfg", "offset", "scale", "range"}
+
+
+def test_global_in_def_defines():
+    defines, _ = engine._cell_names("def f():\n    global n\n    n = 1\n")
+    assert defines == {"f", "n"}
+
+
+def test_unparsable_cell():
+    assert engine._cell_names("def (") == (None, None)
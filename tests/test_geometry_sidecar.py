@@ -0,0 +1,22 @@
+import os
+
+import engine
+
+
+def test_prune_removes_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "_GEOMETRY_DIR", str(tmp_path))
+    monkeypatch.setattr(engine, "_GEOMETRY_DISK_BYTES", 250)
+    for i, name in enumerate("abcd"):
+        path = tmp_path / f"{name}.h5"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+    os.utime(tmp_path / "a.h5")   # a hit: a is now the newest
+    assert engine._prune_sidecars(keep=str(tmp_path / "b.h5")) == 2
+    assert sorted(os.listdir(tmp_path)) == ["a.h5", "b.h5"]
+
+
+def test_prune_within_budget_keeps_all(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "_GEOMETRY_DIR", str(tmp_path))
+    (tmp_path / "a.h5").write_bytes(b"x" * 100)
+    assert engine._prune_sidecars() == 0
+    assert os.listdir(tmp_path) == ["a.h5"]
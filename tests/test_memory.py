@@ -0,0 +1,74 @@
+import pytest
+
+import engine
+
+MB = 2**20
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    """Fake allocator: ``mem["live"]`` (None = unavailable) and
+    ``mem["heap"]``; two caches whose clearing frees their size."""
+    mem = {"live": 0, "heap": 0, "caches": {"a": 10 * MB, "b": 10 * MB}}
+
+    def cache(name):
+        def clear():
+            if mem["live"] is not None:
+                mem["live"] -= mem["caches"][name]
+            mem["caches"][name] = 0
+        return {"name": name, "size": lambda: mem["caches"][name], "clear": clear}
+
+    monkeypatch.setattr(engine, "_caches", [cache("a"), cache("b")])
+    monkeypatch.setattr(engine, "_malloc_bytes", lambda: mem["live"])
+    monkeypatch.setattr(engine, "_heap_bytes", lambda: mem["heap"])
+    monkeypatch.setattr(engine, "_last_heap", [None])
+    monkeypatch.setitem(engine._watchdog, "limit", 100 * MB)
+    monkeypatch.setattr(engine, "scope_memory", lambda min_bytes=0: [])
+    return mem
+
+
+def test_below_soft_keeps_caches(memory):
+    memory["live"] = 50 * MB
+    engine._memory_check()
+    assert memory["caches"] == {"a": 10 * MB, "b": 10 * MB}
+
+
+def test_sheds_in_order_until_below_soft(memory):
+    memory["live"] = 80 * MB
+    engine._memory_check()
+    assert memory["caches"] == {"a": 0, "b": 10 * MB}
+    assert memory["live"] == 70 * MB
+
+
+def test_heavy_refused_over_limit_then_allowed_after_free(memory):
+    memory["live"] = 95 * MB
+    with pytest.raises(MemoryError, match="store-producing run refused"):
+        engine._memory_check(request=30 * MB, heavy=True, what="store-producing run")
+    memory["live"] = 40 * MB   # the user freed scope variables
+    engine._memory_check(request=30 * MB, heavy=True)
+
+
+def test_light_check_never_refuses(memory):
+    memory["live"] = 150 * MB
+    engine._memory_check()
+
+
+def test_high_water_mark_never_refuses(memory):
+    memory["live"] = None
+    memory["heap"] = 150 * MB
+    status = engine._memory_check(request=30 * MB, heavy=True)
+    assert not status["live"]
+    # Grown past soft: one cache shed, not all of them.
+    assert memory["caches"] == {"a": 0, "b": 10 * MB}
+    # No growth since: later checks leave the remaining caches alone.
+    engine._memory_check(heavy=True)
+    assert memory["caches"] == {"a": 0, "b": 10 * MB}
+    memory["heap"] = 160 * MB
+    engine._memory_check(heavy=True)
+    assert memory["caches"] == {"a": 0, "b": 0}
+
+
+def test_disabled_without_limit(memory, monkeypatch):
+    monkeypatch.setitem(engine._watchdog, "limit", None)
+    memory["live"] = 10**12
+    assert engine._memory_check(heavy=True) is None
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from mesh_ops import (_boundary_loop, _fan_loop, _hex_grid, _quad_grid, boundary_faces,
+                      boundary_faces_blocks, fan_triangulate)
+
+
+def fan_reference(rows):
+    """The per-cell loop, plus the parent cell of each triangle."""
+    ii, jj, kk = _fan_loop(rows)
+    parents = [c for c, row in enumerate(rows) for _ in range(max(len(row) - 2, 0))]
+    return np.stack([ii, jj, kk], axis=1).reshape(-1, 3), np.asarray(parents)
+
+
+def test_fan_quads():
+    quads = _quad_grid(7)
+    tris, parents = fan_triangulate(quads)
+    ref, ref_parents = fan_reference(quads)
+    assert tris.dtype == parents.dtype == np.int32
+    assert np.array_equal(tris, ref)
+    assert np.array_equal(parents, ref_parents)
+
+
+@pytest.mark.parametrize("ragged", [False, True])
+def test_fan_mixed(ragged):
+    rng = np.random.default_rng(1)
+    sizes = rng.integers(1, 7, size=200)            # lines through hexagons
+    rows = [rng.integers(0, 1000, size=s) for s in sizes]
+    padded = np.full((len(rows), 6), -1)
+    for n, r in enumerate(rows):
+        padded[n, :len(r)] = r
+    tris, parents = fan_triangulate(rows if ragged else padded)
+    ref, ref_parents = fan_reference(rows)
+    assert np.array_equal(tris, ref)
+    assert np.array_equal(parents, ref_parents)
+
+
+def test_fan_nothing_to_triangulate():
+    for cells in (np.zeros((0, 4), dtype=int), np.array([[0, 1], [1, 2]]), []):
+        tris, parents = fan_triangulate(cells)
+        assert tris.shape == (0, 3) and parents.shape == (0,)
+
+
+def _wedges(n):
+    """Each hexahedron of an ``n``^3 grid split into two wedges."""
+    hexes = _hex_grid(n)
+    return np.concatenate([hexes[:, [0, 1, 2, 4, 5, 6]], hexes[:, [0, 2, 3, 4, 6, 7]]])
+
+
+def _tetras(n):
+    """Each hexahedron of an ``n``^3 grid split into six tetrahedra."""
+    hexes = _hex_grid(n)
+    split = [[0, 1, 2, 6], [0, 2, 3, 6], [0, 3, 7, 6], [0, 7, 4, 6], [0, 4, 5, 6], [0, 5, 1, 6]]
+    return np.concatenate([hexes[:, s] for s in split])
+
+
+@pytest.mark.parametrize("cell_type,cells", [
+    ("hexahedron", _hex_grid(4)), ("wedge", _wedges(3)), ("tetra", _tetras(3))])
+def test_boundary_faces_match_loop(cell_type, cells):
+    faces, parents = boundary_faces(cells, cell_type)
+    ref_faces, ref_parents = _boundary_loop(cells, cell_type)
+    assert faces.dtype == parents.dtype == np.int32
+
+    def rows(f):
+        return [tuple(x for x in r if x >= 0) for r in (f.tolist() if hasattr(f, "tolist") else f)]
+    # Same faces, each in its cell's winding and with its parent cell.
+    assert sorted(zip(rows(faces), parents.tolist())) == \
+        sorted(zip(rows(ref_faces), ref_parents))
+    assert np.all(np.diff(parents) >= 0)            # cell order
+
+
+def test_boundary_faces_counts():
+    n = 4
+    faces, _ = boundary_faces(_hex_grid(n), "hexahedron")
+    assert faces.shape == (6 * n * n, 4)
+    faces, _ = boundary_faces(_tetras(2), "tetra")
+    assert faces.shape[1] == 3                      # no padding column left
+
+
+def test_boundary_faces_blocks_offsets_parents():
+    hexes = _hex_grid(2)
+    faces, parents = boundary_faces_blocks([("hexahedron", hexes), ("hexahedron", hexes + 1000)])
+    one, one_parents = boundary_faces(hexes, "hexahedron")
+    assert np.array_equal(faces, np.concatenate([one, one + 1000]))
+    assert np.array_equal(parents, np.concatenate([one_parents, one_parents + len(hexes)]))
+
+
+def test_boundary_faces_unknown_type():
+    with pytest.raises(ValueError, match="no face template"):
+        boundary_faces(_hex_grid(1), "octahedron")
@@ -0,0 +1,66 @@
+import json
+
+import numpy as np
+import pytest
+
+import engine
+
+pd = pytest.importorskip("pandas")
+
+
+def decode(window, buffers, spec):
+    if "values" in spec:
+        return spec["values"]
+    return np.frombuffer(buffers[spec["buffer"]], dtype=spec["dtype"])
+
+
+@pytest.fixture
+def frame():
+    n = 1000
+    return pd.DataFrame({"t": np.linspace(0, 1, n), "n": np.arange(n, dtype=np.int64),
+                         "f": np.arange(n, dtype=np.float32), "ok": np.arange(n) % 2 == 0,
+                         "label": [f"p{i}" for i in range(n)]})
+
+
+def test_window_columns_round_trip(frame):
+    window, buffers = engine._table_window(frame, 10, 25)
+    assert (window["start"], window["stop"]) == (10, 25)
+    part = frame.iloc[10:25]
+    assert np.array_equal(decode(window, buffers, window["index"]), part.index.to_numpy())
+    t, n, f, ok, label = (decode(window, buffers, c) for c in window["columns"])
+    assert np.array_equal(t, part["t"].to_numpy())
+    assert np.array_equal(n, part["n"].to_numpy())          # int64 -> <f8
+    assert window["columns"][1]["dtype"] == "<f8"
+    assert np.array_equal(f, part["f"].to_numpy())
+    assert np.array_equal(ok, part["ok"].to_numpy().astype(np.uint8))
+    assert label == part["label"].tolist()
+
+
+def test_window_is_clamped(frame, monkeypatch):
+    window, _ = engine._table_window(frame, -5, 10**9)
+    assert (window["start"], window["stop"]) == (0, len(frame))
+    monkeypatch.setattr(engine, "_TABLE_MAX_WINDOW", 100)
+    window, _ = engine._table_window(frame, 950, 10**9)
+    assert (window["start"], window["stop"]) == (950, 1000)
+    window, _ = engine._table_window(frame, 0, 10**9)
+    assert window["stop"] == 100
+    window, _ = engine._table_window(frame, 2000, 3000)   # past the end: empty
+    assert (window["start"], window["stop"]) == (1000, 1000)
+
+
+def test_table_window_pages_a_displayed_frame(frame, monkeypatch):
+    sent = []
+    monkeypatch.setattr(engine.sys, "_zoomy_display_callback",
+                        lambda cell, buffer=None: sent.append(cell), raising=False)
+    engine.display(frame)
+    head = [c for c in sent if c.get("mime") == engine.TABLE_MIME or c.get("chunk") == "begin"]
+    assert head
+    tid = "t%d" % engine._table_ids[0]
+    text, buffers = engine.table_window(tid, 500, 510)
+    window = json.loads(text)
+    assert decode(window, buffers, window["columns"][4]) == [f"p{i}" for i in range(500, 510)]
+
+
+def test_expired_table():
+    with pytest.raises(KeyError, match="expired"):
+        engine.table_window("t-missing", 0, 10)
@@ -5,7 +5,7 @@ import { OpenerService, open } from '@theia/core/lib/browser';
 import { URI, Emitter } from '@theia/core';
 import { BinaryBuffer } from '@theia/core/lib/common/buffer';
 import { FileService } from '@theia/filesystem/lib/browser/file-service';
-import { getZoomyCli, setDisplaySink, setLogSink, ensureRenderLibs, ensureJSZip, emitCasesChanged, emitBackendsChanged, emitSimOutput, DisplayCell } from './zoomy-cli-loader';
+import { getZoomyCli, setDisplaySink, setLogSink, ensureRenderLibs, ensureJSZip, emitCasesChanged, emitBackendsChanged, emitSimOutput, DisplayCell, decodeTableWindow, decodeWire } from './zoomy-cli-loader';
 import { hasPendingProjectDeepLink } from './zoomy-deep-link';
 
 // The project root in the browser FS. A case is a folder here with a canonical
@@ -22,6 +22,9 @@ const CURRENT_CASE_KEY = 'zoomy-current-case';
  *  time-step slider does not queue a render per tick, short enough to still feel
  *  like the plot follows the control. */
 const VIZ_RERENDER_MS = 250;
+/** Rows per page of a display(df) table; further pages are fetched from the
+ *  kernel on demand, so a 1e5-row frame never lands in the DOM at once. */
+const TABLE_PAGE_ROWS = 100;
 
 declare const window: any;
 /** Render markdown via marked when available, else the minimal inline fallback. */
@@ -48,6 +51,95 @@ export function renderMathMd(md: string): string {
     return html;
 }
 
+/** Geometry of a display_mesh() cell, cached by id (MESH_GEOMETRY_SLOTS):
+ *  positions (n × dim) and uint32 triangle indices (none for a 1-D line). */
+interface MeshGeometry { id: string; dim: number; positions: Float32Array; indices: Uint32Array; }
+const MESH_W = 640, MESH_H = 400, MESH_BAR = 14;
+/** Geometries kept past this count are dropped unless a live cell shows them. */
+const MESH_GEOMETRY_SLOTS = 8;
+/** Viridis stops; colours are bucketed into MESH_LEVELS fills per draw. */
+const VIRIDIS = [[68, 1, 84], [72, 40, 120], [62, 73, 137], [49, 104, 142], [38, 130, 142],
+    [31, 158, 137], [53, 183, 121], [109, 205, 89], [180, 222, 44], [253, 231, 37]];
+const MESH_LEVELS = 64;
+function viridis(t: number): string {
+    const x = Math.max(0, Math.min(1, t)) * (VIRIDIS.length - 1);
+    const i = Math.min(VIRIDIS.length - 2, Math.floor(x)), f = x - i;
+    const c = VIRIDIS[i].map((v, k) => Math.round(v + (VIRIDIS[i + 1][k] - v) * f));
+    return `rgb(${c[0]},${c[1]},${c[2]})`;
+}
+
+/** Draw one mesh cell onto a canvas: a polyline for 1-D, otherwise the
+ *  triangles filled by their mean vertex value (3-D boundaries in a fixed
+ *  oblique view, back to front). Triangles are grouped per colour level so
+ *  a large mesh costs MESH_LEVELS fills, not one per triangle. */
+function drawMesh(canvas: HTMLCanvasElement, g: MeshGeometry, values: ArrayLike<number>, range: (number | null)[] | null): void {
+    const ctx = canvas.getContext('2d');
+    if (!ctx) { return; }
+    const w = MESH_W - MESH_BAR - 50, pad = 10;
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    // The kernel sends a null range when the field has no finite value.
+    if (!range || range[0] == null || range[1] == null) {
+        ctx.fillStyle = getComputedStyle(canvas).color || '#888'; ctx.font = '12px sans-serif';
+        ctx.fillText('No finite values to draw.', pad, pad + 12);
+        return;
+    }
+    const lo = range[0], hi = range[1], span = hi > lo ? hi - lo : 1;
+    const n = g.positions.length / g.dim;
+    const px = new Float32Array(n), py = new Float32Array(n), pz = new Float32Array(n);
+    for (let i = 0; i < n; i++) {
+        const x = g.positions[i * g.dim], y = g.dim > 1 ? g.positions[i * g.dim + 1] : values[i];
+        const z = g.dim > 2 ? g.positions[i * g.dim + 2] : 0;
+        // 3-D: rotate 35° about z, tilt 30° — depth is pz.
+        px[i] = g.dim > 2 ? 0.819 * x - 0.574 * y : x;
+        py[i] = g.dim > 2 ? 0.866 * z + 0.287 * x + 0.41 * y : y;
+        pz[i] = g.dim > 2 ? 0.5 * (0.574 * x + 0.819 * y) - 0.866 * z : 0;
+    }
+    let x0 = Infinity, x1 = -Infinity, y0 = Infinity, y1 = -Infinity;
+    for (let i = 0; i < n; i++) {
+        x0 = Math.min(x0, px[i]); x1 = Math.max(x1, px[i]);
+        y0 = Math.min(y0, py[i]); y1 = Math.max(y1, py[i]);
+    }
+    if (g.dim === 1) { y0 = lo; y1 = hi > lo ? hi : lo + 1; }
+    let sx = (w - 2 * pad) / ((x1 - x0) || 1), sy = (MESH_H - 2 * pad) / ((y1 - y0) || 1);
+    if (g.dim > 1) { sx = sy = Math.min(sx, sy); }
+    const X = (i: number) => pad + (px[i] - x0) * sx, Y = (i: number) => MESH_H - pad - (py[i] - y0) * sy;
+    if (g.dim === 1) {
+        ctx.strokeStyle = viridis(0.3); ctx.lineWidth = 1.5; ctx.beginPath();
+        for (let i = 0; i < n; i++) { if (i) { ctx.lineTo(X(i), Y(i)); } else { ctx.moveTo(X(i), Y(i)); } }
+        ctx.stroke();
+    } else {
+        const idx = g.indices, m = idx.length / 3;
+        let order: Uint32Array | undefined;
+        if (g.dim > 2) {
+            const depth = new Float32Array(m);
+            for (let t = 0; t < m; t++) { depth[t] = pz[idx[3 * t]] + pz[idx[3 * t + 1]] + pz[idx[3 * t + 2]]; }
+            order = Uint32Array.from({ length: m }, (_, t) => t).sort((a, b) => depth[b] - depth[a]);
+        }
+        const paths: Path2D[] = [];
+        // 3-D faces must paint back to front, so they go straight out;
+        // flat 2-D triangles never overlap and batch per colour level.
+        for (let k = 0; k < m; k++) {
+            const t = order ? order[k] : k;
+            const a = idx[3 * t], b = idx[3 * t + 1], c = idx[3 * t + 2];
+            const mean = (values[a] + values[b] + values[c]) / 3;
+            if (!Number.isFinite(mean)) { continue; }
+            const lv = Math.min(MESH_LEVELS - 1, Math.max(0, Math.floor((mean - lo) / span * MESH_LEVELS)));
+            const p = g.dim > 2 ? new Path2D() : (paths[lv] || (paths[lv] = new Path2D()));
+            p.moveTo(X(a), Y(a)); p.lineTo(X(b), Y(b)); p.lineTo(X(c), Y(c)); p.closePath();
+            if (g.dim > 2) { ctx.fillStyle = ctx.strokeStyle = viridis((lv + 0.5) / MESH_LEVELS); ctx.fill(p); ctx.stroke(p); }
+        }
+        paths.forEach((p, lv) => { ctx.fillStyle = ctx.strokeStyle = viridis((lv + 0.5) / MESH_LEVELS); ctx.lineWidth = 0.5; ctx.fill(p); ctx.stroke(p); });
+    }
+    // Colour bar with its range.
+    const bx = MESH_W - MESH_BAR - 40;
+    for (let r = 0; r < MESH_H - 2 * pad; r++) {
+        ctx.fillStyle = viridis(1 - r / (MESH_H - 2 * pad)); ctx.fillRect(bx, pad + r, MESH_BAR, 1);
+    }
+    ctx.fillStyle = getComputedStyle(canvas).color || '#888'; ctx.font = '10px sans-serif';
+    ctx.fillText(hi.toPrecision(4), bx + MESH_BAR + 3, pad + 8);
+    ctx.fillText(lo.toPrecision(4), bx + MESH_BAR + 3, MESH_H - pad);
+}
+
 interface CardOut { cells: DisplayCell[]; stdout: string; status: string; running: boolean; }
 interface TabDef { dir: string; label: string; }
 const TABS: TabDef[] = [
@@ -156,6 +248,8 @@ export class ZoomyModelConfigWidget extends ReactWidget {
     protected kernelStatus = '';
     protected kernelReady = false;
     protected readonly outputs = new Map<string, CardOut>();
+    /** display_mesh() geometry by id — sent once per store, reused by every later cell. */
+    protected readonly meshGeometries = new Map<string, MeshGeometry>();
     // Param editing: the active card whose parameters show in the right-hand
     // "Zoomy Parameters" panel, the loaded schemas, and the edited values.
     protected activeParamCardId: string | undefined;
@@ -944,10 +1038,127 @@ export class ZoomyModelConfigWidget extends ReactWidget {
         if (mime === 'text/x-latex' || mime === 'text/latex') { return h('div', { key, className: 'zoomy-md', dangerouslySetInnerHTML: { __html: renderMathMd('$$' + cell.content + '$$') } }); }
         if (mime === 'text/html') { return h('div', { key, className: 'zoomy-md', dangerouslySetInnerHTML: { __html: cell.content } }); }
         if (mime === 'image/svg+xml') { return h('div', { key, dangerouslySetInnerHTML: { __html: cell.content } }); }
-        if (mime === 'image/png') { return h('img', { key, src: 'data:image/png;base64,' + cell.content, style: { maxWidth: '100%' } }); }
+        if (mime === 'image/png' || mime === 'image/gif') { return h('img', { key, src: 'data:' + mime + ';base64,' + cell.content, style: { maxWidth: '100%' } }); }
+        if (mime === 'video/mp4') { return h('video', { key, src: 'data:video/mp4;base64,' + cell.content, controls: true, loop: true, style: { maxWidth: '100%' } }); }
+        if (mime === 'application/vnd.zoomy.table+json') { return this.renderTable(cell as any, key); }
+        if (mime === 'application/vnd.zoomy.ndarray+json') { return this.renderArray(cell as any, key); }
+        if (mime === 'application/vnd.zoomy.mesh+json') { return this.renderMesh(cell as any, key); }
         return h('pre', { key, style: { margin: '2px 0', whiteSpace: 'pre-wrap', fontSize: 12 } }, cell.content);
     }
 
+    /** display(df): the page held on the cell, with a pager that pulls other
+     *  row windows from the kernel (cli.tableWindow). */
+    protected renderTable(cell: DisplayCell & { table?: any; page?: any; error?: string }, key: string): React.ReactNode {
+        const h = React.createElement;
+        if (!cell.table) {
+            cell.table = JSON.parse(cell.content);
+            cell.page = decodeTableWindow(cell.table.window, cell.buffers || []);
+        }
+        const t = cell.table, page = cell.page;
+        const fmt = (v: any) => typeof v === 'number' ? (Number.isInteger(v) ? String(v) : v.toPrecision(6)) : String(v ?? '');
+        const go = async (start: number) => {
+            start = Math.max(0, Math.min(start, Math.max(0, t.rows - TABLE_PAGE_ROWS)));
+            try { cell.page = await this.cli.tableWindow(t.table, start, start + TABLE_PAGE_ROWS); this.update(); }
+            catch (e: any) { cell.error = e?.message || String(e); this.update(); }
+        };
+        const cellS: React.CSSProperties = { padding: '1px 8px', textAlign: 'right', borderBottom: '1px solid var(--theia-panel-border)' };
+        const rows: React.ReactNode[] = [];
+        for (let i = 0; i < page.stop - page.start; i++) {
+            rows.push(h('tr', { key: i },
+                h('th', { style: cellS }, fmt(page.index[i])),
+                page.columns.map((c: any, j: number) => h('td', { key: j, style: cellS }, fmt(c[i])))));
+        }
+        const btn = (label: string, start: number, disabled: boolean) =>
+            h('button', { className: 'theia-button secondary', disabled, onClick: () => go(start), style: { minWidth: 0, padding: '0 8px' } }, label);
+        return h('div', { key, style: { fontSize: 12, overflowX: 'auto' } },
+            h('table', { style: { borderCollapse: 'collapse' } },
+                h('thead', null, h('tr', null,
+                    h('th', { style: cellS }, t.index.name || ''),
+                    t.columns.map((c: any, j: number) => h('th', { key: j, style: cellS, title: c.dtype }, c.name)))),
+                h('tbody', null, rows)),
+            h('div', { style: { display: 'flex', alignItems: 'center', gap: 6, marginTop: 4 } },
+                btn('‹', page.start - TABLE_PAGE_ROWS, page.start <= 0),
+                h('span', null, 'rows ' + (t.rows ? page.start + 1 : 0) + '–' + page.stop + ' of ' + t.rows),
+                btn('›', page.stop, page.stop >= t.rows),
+                cell.error ? h('span', { style: { color: 'var(--theia-errorForeground)' } }, cell.error) : null));
+    }
+
+    /** display(ndarray): shape/dtype/stats header and the summarised text; a
+     *  slice box fetches any numpy-style slice from the kernel
+     *  (cli.arraySlice) and shows its values. */
+    protected renderArray(cell: DisplayCell & { array?: any; slice?: string; error?: string }, key: string): React.ReactNode {
+        const h = React.createElement;
+        const a = cell.array || (cell.array = JSON.parse(cell.content));
+        const st = a.stats;
+        /* Non-finite statistics (all-NaN, inf) arrive as null. */
+        const num = (v: number | null) => v == null ? '—' : v.toPrecision(4);
+        const head = '[' + a.shape.join(' × ') + '] ' + a.dtype
+            + (st ? ` · min ${num(st.min)} · max ${num(st.max)} · mean ${num(st.mean)} · std ${num(st.std)}` + (st.nan ? ` · ${st.nan} NaN` : '') : '');
+        const fetchSlice = async (index: string) => {
+            try {
+                const r = await this.cli.arraySlice(a.array, index);
+                const vals = Array.from(r.data.slice(0, 1000) as ArrayLike<any>).join(', ');
+                cell.slice = `[${r.shape.join(' × ')}] ${vals}${r.data.length > 1000 ? ', …' : ''}`;
+                cell.error = undefined;
+            } catch (e: any) { cell.error = e?.message || String(e); }
+            this.update();
+        };
+        const preS: React.CSSProperties = { margin: '2px 0', whiteSpace: 'pre-wrap', fontSize: 12 };
+        return h('div', { key, style: { fontSize: 12 } },
+            h('div', { style: { color: 'var(--theia-descriptionForeground)' } }, head),
+            h('pre', { style: preS }, a.text),
+            h('input', { type: 'text', placeholder: 'slice, e.g. 0:10, 3', className: 'theia-input', style: { width: 180, fontSize: 12 },
+                onKeyDown: (e: any) => { if (e.key === 'Enter') { void fetchSlice(e.target.value); } } }),
+            cell.error ? h('div', { style: { color: 'var(--theia-errorForeground)' } }, cell.error) : null,
+            cell.slice ? h('pre', { style: preS }, cell.slice) : null);
+    }
+
+    /** Cache a mesh geometry. Every solver re-run mints a new id, so past
+     *  MESH_GEOMETRY_SLOTS entries the ids no live output cell shows are
+     *  dropped (a cell that still needs one refetches it). */
+    protected rememberMeshGeometry(geo: MeshGeometry): void {
+        this.meshGeometries.set(geo.id, geo);
+        if (this.meshGeometries.size <= MESH_GEOMETRY_SLOTS) { return; }
+        const live = new Set<string>([geo.id]);
+        const scan = (cells: DisplayCell[]) => cells.forEach(c => { const m = (c as any).mesh; if (m?.mesh) { live.add(m.mesh); } });
+        this.outputs.forEach(out => scan(out.cells));
+        this.modelMath.forEach(entry => scan(entry.cells));
+        for (const id of Array.from(this.meshGeometries.keys())) {
+            if (!live.has(id)) { this.meshGeometries.delete(id); }
+        }
+    }
+
+    /** display_mesh(): the field drawn on the store's cached geometry. A
+     *  cell that names geometry this widget never received (e.g. after a
+     *  reload) fetches it from the kernel (cli.meshGeometry) first. */
+    protected renderMesh(cell: DisplayCell & { mesh?: any; values?: ArrayLike<number>; error?: string }, key: string): React.ReactNode {
+        const h = React.createElement;
+        if (!cell.mesh) {
+            const m = cell.mesh = JSON.parse(cell.content);
+            if (m.geometry) {
+                this.rememberMeshGeometry({ id: m.mesh, dim: m.geometry.dim,
+                    positions: decodeWire(m.geometry.positions, cell.buffers || []),
+                    indices: decodeWire(m.geometry.indices, cell.buffers || []) });
+            }
+            cell.values = decodeWire(m.scalars, cell.buffers || []);
+        }
+        const m = cell.mesh;
+        const g = this.meshGeometries.get(m.mesh);
+        if (!g && !cell.error) {
+            this.cli.meshGeometry(m.mesh).then((geo: MeshGeometry) => { this.rememberMeshGeometry(geo); this.update(); })
+                .catch((e: any) => { cell.error = e?.message || String(e); this.update(); });
+        }
+        const title = m.field + (m.time != null ? ` — t = ${Number(m.time).toFixed(3)}` : ` — step ${m.step}`);
+        return h('div', { key, style: { fontSize: 12 } },
+            h('div', { style: { color: 'var(--theia-descriptionForeground)' } }, title),
+            cell.error ? h('div', { style: { color: 'var(--theia-errorForeground)' } }, cell.error)
+                : h('canvas', { width: MESH_W, height: MESH_H, style: { maxWidth: '100%', color: 'var(--theia-foreground)' },
+                    ref: (el: HTMLCanvasElement | null) => {
+                        // Callback refs re-fire on every update; draw once per cell.
+                        if (el && g && (el as any).zoomyCell !== cell) { (el as any).zoomyCell = cell; drawMesh(el, g, cell.values!, m.range); }
+                    } }));
+    }
+
     protected renderParamForm(card: any): React.ReactNode {
         const h = React.createElement;
         const schema = this.schemas.get(card.id);
@@ -1363,11 +1574,12 @@ export class ZoomyModelConfigWidget extends ReactWidget {
         setDisplaySink(cell => { out.cells.push(cell); this.update(); });
         try {
             const snippet = await this.cli.fetchSnippet(card.snippet);
-            // Pass the card's edited field + time_step (its inline Parameters).
+            // Pass the card's edited field + time_step (its inline Parameters),
+            // and the card id the engine keys the card's persistent figure by.
             const ed = this.edited.get(card.id) || {};
             const ts = Number.isFinite(ed.time_step) ? ed.time_step : 0;
             const fld = ed.field != null && ed.field !== '' ? JSON.stringify(String(ed.field)) : 'None';
-            const code = 'time_step = ' + ts + '\nfield_name = ' + fld + '\n' + snippet;
+            const code = 'time_step = ' + ts + '\nfield_name = ' + fld + '\ncard_id = ' + JSON.stringify(String(card.id)) + '\n' + snippet;
             const res = await this.cli.runCode(code);
             out.stdout = res?.output || ''; out.status = res?.status || 'success';
         } catch (e: any) {
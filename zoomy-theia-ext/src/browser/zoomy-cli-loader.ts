@@ -8,7 +8,9 @@
  * param extraction, run/describe/complete, case compose/parse/export, remote
  * backends by URL, and the results shelf. The Theia side only renders. */
 
-export interface DisplayCell { mime: string; content: string; }
+/** `buffers` are the binary attachments of a chunked output (e.g. the
+ *  numeric columns of a table cell's first page). */
+export interface DisplayCell { mime: string; content: string; buffers?: Uint8Array[]; }
 
 // The active per-run collector for streamed display() output. runCode routes
 // each display cell to whoever is currently running.
@@ -20,6 +22,20 @@ export function setLogSink(fn: ((level: string, msg: string) => void) | undefine
 
 let cliPromise: Promise<any> | undefined;
 
+// zoomy_cli's decodeTableWindow, captured when the brain is imported.
+let decodeWindow: ((w: any, buffers: Uint8Array[]) => any) | undefined;
+/** A table cell window (+ its buffers) as {start, stop, index, columns}. */
+export function decodeTableWindow(w: any, buffers: Uint8Array[]): any {
+    return decodeWindow ? decodeWindow(w, buffers || []) : { start: w.start, stop: w.start, index: [], columns: [] };
+}
+
+// zoomy_cli's decodeWire, likewise.
+let decodeWireFn: ((c: any, buffers: Uint8Array[]) => any) | undefined;
+/** One engine wire-encoded array ({buffer, dtype} or {values}) as a flat TypedArray. */
+export function decodeWire(c: any, buffers: Uint8Array[]): any {
+    return decodeWireFn ? decodeWireFn(c, buffers || []) : [];
+}
+
 function loadScript(src: string): Promise<void> {
     return new Promise((res, rej) => {
         const s = document.createElement('script'); s.src = src;
@@ -108,15 +124,17 @@ export function getZoomyCli(): Promise<any> {
             const dynImport = new Function('u', 'return import(u)') as (u: string) => Promise<any>;
             const mod = await dynImport(base + 'zoomy_cli/browser.mjs');
             const { ZoomyCLI, PyodideAdapter, FetchStorage, IdbStorage } = mod;
+            decodeWindow = mod.decodeTableWindow;
+            decodeWireFn = mod.decodeWire;
             const pyodide = new PyodideAdapter({
                 workerUrl: base + 'pyodide-worker.js',
                 // The adapter calls onLog with the whole {level,msg} message object.
                 onLog: (m: any) => { logSink && logSink(m?.level || 'info', m?.msg ?? String(m)); },
-                // The worker posts display cells as a JSON string (json.dumps(cell)).
-                onDisplay: (cell: any) => {
-                    let c = cell;
-                    if (typeof cell === 'string') { try { c = JSON.parse(cell); } catch { c = { mime: 'text/plain', content: cell }; } }
-                    displaySink && displaySink(c);
+                // Every display cell arrives parsed, with its binary buffers
+                // ([] unless it came as a chunked stream).
+                onDisplay: (cell: any, buffers: Uint8Array[]) => {
+                    if (buffers.length) { cell.buffers = buffers; }
+                    displaySink && displaySink(cell);
                 },
             });
             let overlay: any = null;
@@ -11,7 +11,7 @@
  */
 
 export { ZoomyCLI } from "./src/cli.mjs";
-export { PyodideAdapter, NotSupportedError } from "./src/adapters/pyodide_adapter.mjs";
+export { PyodideAdapter, PyodideSession, NotSupportedError, decodeTableWindow, decodeWire } from "./src/adapters/pyodide_adapter.mjs";
 export { HttpAdapter } from "./src/adapters/http_adapter.mjs";
 export { FetchStorage } from "./src/storage.mjs";
 export { IdbStorage } from "./src/adapters/idb_storage.mjs";
@@ -32,6 +32,7 @@ import { IdbStorage } from "./src/adapters/idb_storage.mjs";
  * @param {SharedArrayBuffer} [options.interruptBuffer]
  * @param {function} [options.onLog]
  * @param {function} [options.onDisplay]
+ * @param {function} [options.onDisplayProgress]
  * @param {function} [options.onReady]
  * @returns {ZoomyCLI}
  */
@@ -43,6 +44,7 @@ export function createBrowserCLI(options) {
         interruptBuffer: options.interruptBuffer,
         onLog: options.onLog,
         onDisplay: options.onDisplay,
+        onDisplayProgress: options.onDisplayProgress,
         onReady: options.onReady,
     });
     // IndexedDB should be available in every target browser, but guard
@@ -19,10 +19,73 @@
  *
  * The adapter is intentionally quiet on the log channel — callers can
  * subscribe to `onLog(msg)` to receive the worker's `{type:"log"}`
- * messages. `onDisplay(cell)` receives `{type:"display"}` messages so
- * the GUI can route them to the right card.
+ * messages. `onDisplay(cell, buffers)` receives `{type:"display"}`
+ * messages so the GUI can route them to the right card: `cell` is always
+ * the parsed cell object and `buffers` its binary attachments as
+ * Uint8Arrays (`[]` for a plain cell). Metrics cells (engine
+ * zoomy_stats snapshots, mime application/vnd.zoomy.metrics+json) go to
+ * `onMetrics(snapshot)` instead of the card output.
+ *
+ * Large outputs arrive as a chunked stream (engine `_send`: a begin cell,
+ * sequenced parts — text slices or transferred binary slices — and an
+ * end cell). The adapter reassembles them, reporting
+ * `onDisplayProgress({stream, mime, received, total})` per part, and then
+ * calls `onDisplay(cell, buffers)` once with the parsed cell object and
+ * its binary attachments as Uint8Arrays.
+ *
+ * Sessions: `openSession(id)` returns a PyodideSession — the same adapter
+ * surface bound to a named exec scope in THIS worker (own store, cell
+ * cache and display routing; shared interpreter and imported modules).
+ * A second GUI session therefore costs a Python dict, not a Pyodide boot.
  */
 
+const METRICS_MIME = "application/vnd.zoomy.metrics+json";
+
+/* Wire dtypes of binary table columns / array slices (engine _WIRE_DTYPES). */
+const TYPED_ARRAYS = {
+    "<f8": Float64Array, "<f4": Float32Array, "|i1": Int8Array, "|u1": Uint8Array,
+    "<i2": Int16Array, "<u2": Uint16Array, "<i4": Int32Array, "<u4": Uint32Array,
+};
+
+/* IEEE half floats (mesh scalars sent with half=True) widened to float32. */
+function halfToFloat(bits) {
+    const out = new Float32Array(bits.length);
+    for (let i = 0; i < bits.length; i++) {
+        const h = bits[i], e = (h >> 10) & 0x1f, m = h & 0x3ff;
+        const v = e === 0 ? m * 5.960464477539063e-8
+            : e === 31 ? (m ? NaN : Infinity)
+            : (1 + m / 1024) * Math.pow(2, e - 15);
+        out[i] = h & 0x8000 ? -v : v;
+    }
+    return out;
+}
+
+/**
+ * Decode one table window (the `window` of an
+ * application/vnd.zoomy.table+json cell, or a tableWindow() result) into
+ * { start, stop, index, columns } — each column a TypedArray view over
+ * its buffer or a plain array of strings.
+ */
+export function decodeTableWindow(window, buffers) {
+    const col = (c) => decodeWire(c, buffers);
+    return { start: window.start, stop: window.stop,
+             index: col(window.index), columns: window.columns.map(col) };
+}
+
+/**
+ * One engine wire-encoded array ({buffer, dtype} or {values}) as a flat,
+ * C-ordered TypedArray view (or array of strings).
+ */
+export function decodeWire(c, buffers) {
+    if (c.values) return c.values;
+    const u8 = buffers[c.buffer];
+    if (c.dtype === "<f2") {
+        return halfToFloat(new Uint16Array(u8.buffer, u8.byteOffset, u8.byteLength / 2));
+    }
+    const T = TYPED_ARRAYS[c.dtype];
+    return new T(u8.buffer, u8.byteOffset, u8.byteLength / T.BYTES_PER_ELEMENT);
+}
+
 export class NotSupportedError extends Error {
     constructor(method) {
         super("PyodideAdapter: method '" + method + "' not implemented");
@@ -37,7 +100,11 @@ export class PyodideAdapter {
      * @param {string} [options.workerUrl]    Path to pyodide-worker.js
      *                                        (used only when no worker given).
      * @param {function} [options.onLog]      cb({level, msg}) — optional.
-     * @param {function} [options.onDisplay]  cb(cell) — optional.
+     * @param {function} [options.onDisplay]  cb(cell, buffers) — optional.
+     * @param {function} [options.onDisplayProgress]
+     *          cb({stream, mime, received, total}) while a chunked output
+     *          is arriving — optional.
+     * @param {function} [options.onMetrics]  cb(statsSnapshot) — optional.
      * @param {function} [options.onReady]    cb() when worker posts fully_ready.
      * @param {function} [options.onBackgroundReady]
      *          cb() when all tier-2 (matplotlib / jedi / zoomy_plotting)
@@ -51,12 +118,16 @@ export class PyodideAdapter {
         this.workerUrl = options.workerUrl || "pyodide-worker.js";
         this.onLog = options.onLog || function () {};
         this.onDisplay = options.onDisplay || function () {};
+        this.onMetrics = options.onMetrics || function () {};
+        this.onDisplayProgress = options.onDisplayProgress || function () {};
         this.onReady = options.onReady || function () {};
         this.onBackgroundReady = options.onBackgroundReady || function () {};
         this._interruptBuffer = options.interruptBuffer || null;
         this._interruptView = this._interruptBuffer ? new Uint8Array(this._interruptBuffer) : null;
 
         this._pending = new Map();
+        this._sessions = new Map();
+        this._streams = new Map();
         this._msgId = 0;
         this._worker = options.worker || null;
         if (this._worker) this._wire(this._worker);
@@ -78,7 +149,25 @@ export class PyodideAdapter {
             if (msg.type === "fully_ready")       { this.onReady(); return; }
             if (msg.type === "background_ready")  { this.onBackgroundReady(); return; }
             if (msg.type === "log")     { this.onLog(msg); return; }
-            if (msg.type === "display") { this.onDisplay(msg.cell); return; }
+            if (msg.type === "display") {
+                const view = (msg.session ? this._sessions.get(msg.session) : null) || this;
+                /* The worker tags each display message with the cell's mime
+                   and whether it is a stream chunk; the cell JSON is parsed
+                   once, here. */
+                let cell;
+                try { cell = JSON.parse(msg.cell); }
+                catch (e) { cell = { mime: "text/plain", content: String(msg.cell) }; }
+                if (msg.chunk) {
+                    this._chunk(view, cell, msg.buffer);
+                    return;
+                }
+                if (msg.mime === METRICS_MIME) {
+                    try { view.onMetrics(JSON.parse(cell.content)); } catch (e) {}
+                    return;
+                }
+                view.onDisplay(cell, []);
+                return;
+            }
             const cb = this._pending.get(msg.id);
             if (!cb) return;
             this._pending.delete(msg.id);
@@ -87,6 +176,36 @@ export class PyodideAdapter {
         };
     }
 
+    /** Reassemble one chunked display stream (see class comment). */
+    _chunk(view, part, bytes) {
+        const s = this._streams.get(part.stream);
+        if (part.chunk === "begin") {
+            const cell = Object.assign({}, part);
+            for (const k of ["chunk", "stream", "chars", "buffers", "total"]) delete cell[k];
+            this._streams.set(part.stream, {
+                cell, text: [], received: 0, total: part.total,
+                buffers: part.buffers.map((n) => new Uint8Array(n)),
+            });
+            view.onDisplayProgress({ stream: part.stream, mime: cell.mime, received: 0, total: part.total });
+            return;
+        }
+        if (!s) return;
+        if (part.chunk === "part") {
+            if (part.buffer !== undefined) {
+                s.buffers[part.buffer].set(bytes, part.offset);
+                s.received += bytes.length;
+            } else {
+                s.text.push(part.content);
+                s.received += part.content.length;
+            }
+            view.onDisplayProgress({ stream: part.stream, mime: s.cell.mime, received: s.received, total: s.total });
+            return;
+        }
+        this._streams.delete(part.stream);
+        if (s.text.length) s.cell.content = s.text.join("");
+        view.onDisplay(s.cell, s.buffers);
+    }
+
     /** Ensure we have a worker; returns it. */
     _ensureWorker() {
         if (!this._worker) this._worker = this._createWorker();
@@ -135,6 +254,16 @@ export class PyodideAdapter {
         return await this._postCmd({ cmd: "run_code", code });
     }
 
+    /**
+     * Run an ordered list of case cells ([{id, role, source}]) through
+     * engine.run_cells: only cells whose source changed (or that read a
+     * name a re-run cell rebinds) execute; the rest are cache hits.
+     * `force` re-runs every cell.
+     */
+    async runCells(cells, force) {
+        return await this._postCmd({ cmd: "run_cells", cells, force: !!force });
+    }
+
     async extractParams(classPath, init) {
         return await this._postCmd({ cmd: "extract_params", class_path: classPath, init: init || {} });
     }
@@ -213,6 +342,7 @@ export class PyodideAdapter {
         try { this._worker.terminate(); } catch (e) {}
         for (const [, cb] of this._pending) { try { cb.reject(new Error("interrupted")); } catch (e) {} }
         this._pending.clear();
+        this._streams.clear();
         this._ready = false;
         this._worker = null;
         this._ensureWorker();                // fresh worker boots lazily
@@ -224,6 +354,101 @@ export class PyodideAdapter {
         if (this._interruptView) this._interruptView[0] = 0;
     }
 
+    /**
+     * A view of this worker bound to the named engine session `id`.
+     * Re-opening an id returns the existing view (callbacks updated).
+     * @param {string} id
+     * @param {object} [options]  { onDisplay, onDisplayProgress, onLog, onMetrics }
+     *                            for this session.
+     */
+    openSession(id, options) {
+        let view = this._sessions.get(id);
+        if (!view) {
+            view = new PyodideSession(this, id, options);
+            this._sessions.set(id, view);
+        } else if (options) {
+            if (options.onDisplay) view.onDisplay = options.onDisplay;
+            if (options.onMetrics) view.onMetrics = options.onMetrics;
+            if (options.onDisplayProgress) view.onDisplayProgress = options.onDisplayProgress;
+            if (options.onLog) view.onLog = options.onLog;
+        }
+        return view;
+    }
+
+    /**
+     * Performance counters / histograms of the engine session
+     * (engine.zoomy_stats). `reset` clears them after the snapshot.
+     */
+    async stats(reset) {
+        return await this._postCmd({ cmd: "zoomy_stats", reset: !!reset });
+    }
+
+    /**
+     * Engine heap watchdog sample: { heap, traced, used, limit, caches }
+     * (bytes; caches maps each sheddable engine cache to its size).
+     */
+    async memoryStatus() {
+        return await this._postCmd({ cmd: "memory_status" });
+    }
+
+    /**
+     * Engine background-task queue: { pending, preempted, tasks: [{id,
+     * name, priority, session, state, slices, ms, error}] }.
+     */
+    async schedulerState() {
+        return await this._postCmd({ cmd: "scheduler_state" });
+    }
+
+    /**
+     * Rows [start, stop) of a displayed DataFrame (the `table` id of an
+     * application/vnd.zoomy.table+json cell), decoded as in
+     * decodeTableWindow. Throws once the table has dropped out of the
+     * engine's table LRU.
+     */
+    async tableWindow(table, start, stop) {
+        const w = await this._postCmd({ cmd: "table_window", table, start, stop });
+        return decodeTableWindow(w, w.buffers);
+    }
+
+    /**
+     * `index` (numpy slice syntax, e.g. "0:10, 3") of a displayed ndarray
+     * (the `array` id of an application/vnd.zoomy.ndarray+json cell):
+     * { shape, dtype, data } with data a flat C-ordered TypedArray.
+     */
+    async arraySlice(array, index) {
+        const r = await this._postCmd({ cmd: "array_slice", array, index });
+        return { shape: r.shape, dtype: r.dtype, data: decodeWire(r.data, r.buffers) };
+    }
+
+    /**
+     * The geometry of a mesh display cell (the `mesh` id of an
+     * application/vnd.zoomy.mesh+json cell) when the frontend no longer
+     * holds it: { id, dim, positions, indices } as TypedArrays.
+     */
+    async meshGeometry(geometry) {
+        const g = await this._postCmd({ cmd: "mesh_geometry", geometry });
+        return { id: g.id, dim: g.dim, positions: decodeWire(g.positions, g.buffers),
+                 indices: decodeWire(g.indices, g.buffers) };
+    }
+
+    /**
+     * Raster tile (x, y) at zoom z of `field` at `step` of the current
+     * store: { z, x, y, step, field, extent: [x0, x1, y0, y1], shape,
+     * min, max, data } with data a Float32Array, row 0 at the bottom and
+     * NaN outside the mesh. At zoom z the domain's bounding square is
+     * split into 2^z x 2^z tiles, y counting upward.
+     */
+    async fieldTile(field, step, z, x, y) {
+        const t = await this._postCmd({ cmd: "field_tile", field, step, z, x, y });
+        return { z: t.z, x: t.x, y: t.y, step: t.step, field: t.field, extent: t.extent,
+                 shape: t.shape, min: t.min, max: t.max, data: decodeWire(t.data, t.buffers) };
+    }
+
+    /** Ids of the engine sessions open in the worker. */
+    async listSessions() {
+        return await this._postCmd({ cmd: "list_sessions" });
+    }
+
     // -------------------------------------------------------------------
     // HTTP-side methods that don't make sense here. Keep a consistent
     // surface with HttpAdapter by declaring them; they simply throw so
@@ -234,3 +459,39 @@ export class PyodideAdapter {
     listRegistry() { throw new NotSupportedError("listRegistry"); }
     health()       { throw new NotSupportedError("health"); }
 }
+
+/**
+ * PyodideSession — the PyodideAdapter surface scoped to one named engine
+ * session inside a parent adapter's worker. Every command is tagged with
+ * `session`; engine.py swaps in that session's exec scope before running.
+ * Lifecycle calls (connect / interrupt) go to the shared worker;
+ * `disconnect()` only closes this session's scope.
+ */
+export class PyodideSession extends PyodideAdapter {
+    constructor(parent, sessionId, options) {
+        super(options);           // no worker of its own
+        this.parent = parent;
+        this.sessionId = sessionId;
+        this.tag = parent.tag;
+    }
+
+    _ensureWorker() { return this.parent._ensureWorker(); }
+
+    _postCmd(msg) {
+        msg.session = this.sessionId;
+        return this.parent._postCmd(msg);
+    }
+
+    async connect() { await this.parent.connect(); }
+
+    disconnect() {
+        this.parent._sessions.delete(this.sessionId);
+        this._postCmd({ cmd: "close_session" }).catch(() => {});
+    }
+
+    openSession(id, options) { return this.parent.openSession(id, options); }
+
+    interrupt() { return this.parent.interrupt(); }
+
+    resetInterrupt() { this.parent.resetInterrupt(); }
+}
@@ -33,17 +33,29 @@ export class ZoomyCLI {
         if (!options.pyodide) throw new Error("ZoomyCLI: options.pyodide is required");
         if (!options.storage) throw new Error("ZoomyCLI: options.storage is required");
         this.storage = options.storage;
-        /* Mutable — app.js swaps this to a per-session PyodideAdapter
+        /* Mutable — app.js swaps this to the active session's adapter
            when a session becomes active. At construction it points at
            the boot-time adapter; the first session to run code
            "claims" that adapter (no cold-boot tax for the first
-           session); later sessions spawn their own. */
+           session); later sessions take a PyodideSession view of the
+           same worker (see openSession) — a named engine scope, not a
+           second Pyodide boot. */
         this.pyodide = options.pyodide;
         this.http = options.httpAdapters instanceof Map
             ? options.httpAdapters
             : new Map();
     }
 
+    /**
+     * A PyodideSession for `id` on the boot-time worker: separate store,
+     * cell cache and display routing, shared interpreter. Assign it to
+     * `this.pyodide` to make the session active.
+     */
+    openSession(id, options) {
+        const root = this.pyodide.parent || this.pyodide;
+        return root.openSession(id, options);
+    }
+
     // ------------------------------------------------------------------
     // Adapter registry — lets callers register HTTP backends at runtime.
     // ------------------------------------------------------------------
@@ -376,6 +388,28 @@ export class ZoomyCLI {
         return r;
     }
 
+    /**
+     * Incremental execution of a composed case. `cells` is the ordered
+     * [{id, role, source}] list; resolves to the runCode result plus
+     * `cells` ([{id, role, status: ran|cached|error|skipped}]) and
+     * `cached` (ids skipped as cache hits).
+     */
+    async runCells(cells, options) {
+        options = options || {};
+        const r = await this.pyodide.runCells(cells, options.force);
+        if (typeof r === "string") { try { return JSON.parse(r); } catch { return r; } }
+        return r;
+    }
+
+    /** runCells over the code cells of a resolved case spec (same cells
+     *  composeCase emits), keyed by role so edits map to stable ids. */
+    async runCaseCells(spec, options) {
+        const cells = this._caseCells(spec)
+            .filter((c) => c.type === "code")
+            .map((c) => ({ id: c.meta.role, role: c.meta.role, source: c.source }));
+        return await this.runCells(cells, options);
+    }
+
     async extractParams(classPath, init) {
         return await this.pyodide.extractParams(classPath, init);
     }
@@ -514,6 +548,30 @@ export class ZoomyCLI {
         return await this.pyodide.readStoreBytes();
     }
 
+    /** Rows [start, stop) of a table display cell (display(df)), for
+     *  virtualized scrolling: { start, stop, index, columns }. */
+    async tableWindow(table, start, stop) {
+        return await this.pyodide.tableWindow(table, start, stop);
+    }
+
+    /** A numpy-style slice of an ndarray display cell (display(Q)):
+     *  { shape, dtype, data }. */
+    async arraySlice(array, index) {
+        return await this.pyodide.arraySlice(array, index);
+    }
+
+    /** The cached geometry of a mesh display cell (display_mesh), when
+     *  the frontend lost its copy: { id, dim, positions, indices }. */
+    async meshGeometry(geometry) {
+        return await this.pyodide.meshGeometry(geometry);
+    }
+
+    /** One raster tile of the current store's field (the tile renderer):
+     *  { z, x, y, step, field, extent, shape, min, max, data }. */
+    async fieldTile(field, step, z, x, y) {
+        return await this.pyodide.fieldTile(field, step, z, x, y);
+    }
+
     // ------------------------------------------------------------------
     // Named result stores — the RESULTS SHELF.
     //